@@ -0,0 +1,105 @@
+import threading
+import time
+import traceback
+
+from sys import stderr
+
+
+class BatchWriter:
+	"""
+	Queues items from the event loop and writes them in batches on a background thread, so nothing waits on disk.
+	A batch that fails is logged and put back in front of newer items, to be tried again after flush_interval.
+	"""
+	def __init__(self, name, write_batch, flush_interval=1.0, max_pending=None, on_stop=None):
+		self.name = name
+		# Called on the writer thread with a dict of key -> item, oldest first
+		self.write_batch = write_batch
+		self.flush_interval = flush_interval
+		# Most items to hold while writes are failing. Past this, the oldest are dropped.
+		self.max_pending = max_pending
+		# Called on the writer thread as it stops, to close anything write_batch opened
+		self.on_stop = on_stop
+
+		self.pending = {}
+		self.pending_lock = threading.Lock()
+		self.num_dropped = 0
+		self.wake = threading.Event()
+		self.closing = False
+		self.thread = None
+
+	@property
+	def is_running(self):
+		return self.thread is not None
+
+	def start(self):
+		self.closing = False
+		self.thread = threading.Thread(target=self.run, name=f"{self.name} writer", daemon=True)
+		self.thread.start()
+
+	def stop(self):
+		""" Writes anything pending, trying once more if that fails, and stops the writer thread. """
+		if not self.is_running:
+			return
+		self.closing = True
+		self.wake.set()
+		self.thread.join()
+		self.thread = None
+
+	def add(self, item, key=None):
+		""" Queues an item. One with a key replaces any pending item with the same key, and items without one are all kept. """
+		if key is None:
+			key = object()
+		with self.pending_lock:
+			self.pending[key] = item
+			self.drop_excess()
+		self.wake.set()
+
+	def drop_excess(self):
+		if self.max_pending is None:
+			return
+		while len(self.pending) > self.max_pending:
+			del self.pending[next(iter(self.pending))]
+			self.num_dropped += 1
+
+	def run(self):
+		try:
+			while True:
+				self.wake.wait()
+				if not self.closing:
+					# Let more items pile up so they go out together.
+					time.sleep(self.flush_interval)
+				self.wake.clear()
+				written = self.flush()
+				if self.closing:
+					self.flush()
+					if self.pending:
+						print(f"{self.name}: gave up on writing {len(self.pending)} queued items", file=stderr)
+					return
+				if not written:
+					self.wake.set()
+		finally:
+			if self.on_stop is not None:
+				self.on_stop()
+
+	def flush(self):
+		""" Writes everything pending as one batch. Returns whether that worked. """
+		with self.pending_lock:
+			batch, self.pending = self.pending, {}
+			num_dropped, self.num_dropped = self.num_dropped, 0
+		if num_dropped:
+			print(f"{self.name}: dropped {num_dropped} queued items while writes were failing", file=stderr)
+		if not batch:
+			return True
+
+		try:
+			self.write_batch(batch)
+			return True
+		except Exception:
+			print(f"{self.name}: failed to write {len(batch)} queued items, will retry:", file=stderr)
+			traceback.print_exc()
+			with self.pending_lock:
+				# Items queued since keep their place after the batch, and replace its items with the same key.
+				batch.update(self.pending)
+				self.pending = batch
+				self.drop_excess()
+			return False
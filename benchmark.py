@@ -0,0 +1,188 @@
+import argparse
+import json
+import platform
+import random
+import sys
+import timeit
+from datetime import datetime
+
+from message_utils import command_starts, might_be_command, preprocess_command_content
+from room import Room, team_guess_size_for
+from serialization import state_to_json
+from shibboleth import Shibboleth
+
+DEFAULT_PLAYER_COUNTS = [3, 6, 12, 50, 200]
+MAX_GUESS = 3
+
+# Typical chatter in a game channel: mostly clues, a few commands, and the odd parenthetical aside.
+SAMPLE_MESSAGES = [
+	"it's something you'd find in a kitchen",
+	"definitely not a clue (nac) but brb",
+	"!gw banana",
+	"(nac) !gt @Alice @Bob",
+	"hmm, I think we're on the same page here?",
+	"!!!",
+	"!status",
+]
+
+
+class BenchPlayer:
+	""" Stand-in for a discord.Member with just the attributes the game code reads. """
+	__slots__ = ("id", "name", "display_name", "bot")
+
+	def __init__(self, user_id):
+		self.id = user_id
+		self.name = f"player{user_id}"
+		self.display_name = f"Player {user_id}"
+		self.bot = False
+
+	@property
+	def mention(self):
+		return f"<@{self.id}>"
+
+	def __repr__(self):
+		return self.display_name
+
+def bench_players(num_players):
+	return [BenchPlayer(user_id) for user_id in range(num_players)]
+
+def make_room(num_players):
+	room = Room("bench", None, None)
+	for player in bench_players(num_players):
+		room.add_player(player)
+	return room
+
+def bench_cases(num_players):
+	""" Returns (name, setup) for each benchmark at this player count. Setup runs once and returns the statement to time. """
+	def shibboleth_init():
+		players = bench_players(num_players)
+		team_guess_size = team_guess_size_for(num_players, MAX_GUESS)
+		return lambda: Shibboleth(players, 14, team_guess_size=team_guess_size)
+
+	def make_game():
+		random.seed(num_players)
+		return make_room(num_players).make_game()
+
+	def check_team_guess():
+		game = make_game()
+		guesser = game.players[0]
+		team = game.players_with_word(game.get_secret_word(guesser))
+		guess_size = game.valid_team_guess_sizes[0]
+		guessed_team = [guesser] + [player for player in team if player != guesser][:guess_size - 1]
+		return lambda: game.check_team_guess(guesser, guessed_team)
+
+	def check_word_guess():
+		game = make_game()
+		guesser = game.players[0]
+		opposing_word = game.opposing_word(game.get_secret_word(guesser))
+		return lambda: game.check_word_guess(guesser, opposing_word)
+
+	def word_list_string_columns():
+		game = make_game()
+		return lambda: game.word_list_string_columns()
+
+	def status_string():
+		room = make_room(num_players)
+		room.start_round()
+		return lambda: room.status_string
+
+	def room_snapshot():
+		room = make_room(num_players)
+		room.start_round()
+		return lambda: state_to_json(room.to_state())
+
+	def on_message_preprocessing():
+		starts = command_starts("!")
+		return lambda: [preprocess_command_content(message) for message in SAMPLE_MESSAGES if might_be_command(message, starts)]
+
+	def on_message_prefilter():
+		starts = command_starts("!")
+		message = SAMPLE_MESSAGES[0]
+		return lambda: might_be_command(message, starts)
+
+	return [
+		("Shibboleth.__init__", shibboleth_init),
+		("Shibboleth.check_team_guess", check_team_guess),
+		("Shibboleth.check_word_guess", check_word_guess),
+		("Shibboleth.word_list_string_columns", word_list_string_columns),
+		("Room.status_string", status_string),
+		("Room snapshot", room_snapshot),
+		(f"MyBot.on_message preprocessing ({len(SAMPLE_MESSAGES)} messages)", on_message_preprocessing),
+		("MyBot.on_message prefilter (1 clue)", on_message_prefilter),
+	]
+
+def time_statement(statement, min_time, repeat):
+	""" Returns the best time per call in seconds, over several repeats of enough calls to take at least min_time. """
+	timer = timeit.Timer(statement)
+	number = 1
+	while timer.timeit(number) < min_time:
+		number *= 10
+	return min(timer.repeat(repeat=repeat, number=number)) / number
+
+def run_benchmarks(player_counts, min_time=0.05, repeat=5, name_filter=None):
+	results = []
+	for num_players in player_counts:
+		for (name, setup) in bench_cases(num_players):
+			if (name_filter is not None) and (name_filter not in name):
+				continue
+			seconds = time_statement(setup(), min_time, repeat)
+			results.append({"name": name, "num_players": num_players, "seconds_per_call": seconds})
+	return results
+
+def result_key(result):
+	return f"{result['name']} [{result['num_players']} players]"
+
+def compare(results, baseline_results, threshold):
+	""" Prints each benchmark's ratio to the baseline, returning the keys that got slower by more than the threshold. """
+	baseline = {result_key(result): result["seconds_per_call"] for result in baseline_results}
+	regressions = []
+
+	for result in results:
+		key = result_key(result)
+		if key not in baseline:
+			print(f"{key:<72} (new)")
+			continue
+
+		ratio = result["seconds_per_call"] / baseline[key]
+		flag = ""
+		if ratio > 1 + threshold:
+			flag = "  REGRESSION"
+			regressions.append(key)
+		print(f"{key:<72} {ratio:6.2f}x{flag}")
+
+	return regressions
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Time the game engine and command hot paths.")
+	parser.add_argument("--players", type=int, nargs="+", default=DEFAULT_PLAYER_COUNTS,
+		help=f"player counts to benchmark (default: {' '.join(map(str, DEFAULT_PLAYER_COUNTS))})")
+	parser.add_argument("--filter", dest="name_filter", default=None, help="only run benchmarks whose name contains this string")
+	parser.add_argument("--min-time", dest="min_time", type=float, default=0.05, help="minimum seconds per timing run (default: 0.05)")
+	parser.add_argument("--repeat", type=int, default=5, help="timing runs per benchmark, of which the fastest counts (default: 5)")
+	parser.add_argument("--output", default=None, help="write JSON results to this file instead of standard output")
+	parser.add_argument("--compare", default=None, help="JSON results from an earlier run to compare against")
+	parser.add_argument("--threshold", type=float, default=0.2,
+		help="with --compare, fraction slower than the baseline that counts as a regression (default: 0.2)")
+	args = parser.parse_args()
+
+	results = run_benchmarks(args.players, min_time=args.min_time, repeat=args.repeat, name_filter=args.name_filter)
+	report = {
+		"timestamp": datetime.now().isoformat(timespec="seconds"),
+		"python": platform.python_version(),
+		"platform": platform.platform(),
+		"results": results,
+	}
+
+	if args.output is not None:
+		with open(args.output, "w") as f:
+			json.dump(report, f, indent=2)
+	elif args.compare is None:
+		print(json.dumps(report, indent=2))
+
+	if args.compare is not None:
+		with open(args.compare, "r") as f:
+			baseline_report = json.load(f)
+		regressions = compare(results, baseline_report["results"], args.threshold)
+		if regressions:
+			print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}", file=sys.stderr)
+			sys.exit(1)
@@ -28,7 +28,7 @@ def during_round():
 
 
 def is_by_player(ctx):
-	return round_ongoing(ctx) and (ctx.author in here(ctx).game.players)
+	return round_ongoing(ctx) and (ctx.author in here(ctx).game.player_set)
 
 async def by_player_predicate(ctx):
 	if not is_by_player(ctx):
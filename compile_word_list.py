@@ -0,0 +1,19 @@
+import argparse
+
+from corpus import COMPILED_SUFFIX, compile_word_list
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Compile a text word list (one word per line) into a memory-mappable binary word list.")
+	parser.add_argument("word_list", help="text word list to compile, e.g. wordlists/wordlist2000.txt")
+	parser.add_argument("output", nargs="?", default=None,
+		help=f"path of the compiled word list, which must end in {COMPILED_SUFFIX} (default: the input path with its extension replaced)")
+	args = parser.parse_args()
+
+	output = args.output
+	if output is None:
+		output = args.word_list.rsplit(".", 1)[0] + COMPILED_SUFFIX
+	if not output.endswith(COMPILED_SUFFIX):
+		parser.error(f"Output path must end in {COMPILED_SUFFIX}")
+
+	num_words = compile_word_list(args.word_list, output)
+	print(f"Compiled {num_words} words from {args.word_list} to {output}")
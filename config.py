@@ -4,6 +4,24 @@ import yaml
 bot_prefix = "!"
 
 word_list_path = "wordlists/wordlist2000.txt"
+
+# SQLite database where room state is saved to survive restarts, or None to not save it
+state_db_path = "data/rooms.sqlite3"
+
+# Directory for the log of round events, or None to not log them
+event_log_directory = "data/events"
+
+# Size in bytes at which the event log starts a new segment file
+event_log_segment_size = 16 * 1024 * 1024
+
+# Most event log segment files to keep, at least 1, or None to keep them all. Past this, the oldest are deleted.
+event_log_max_segments = 64
+
+# Rooms with nothing going on for this many seconds are shrunk down to their options until their channel is used again
+idle_room_timeout = 3600
+
+# Most idle rooms to keep options for. Past this, the least recently used are forgotten and go back to default options.
+max_idle_rooms = 100000
 config_data = {}
 
 def init(config=None):
@@ -0,0 +1,163 @@
+import mmap
+import os
+import struct
+from collections.abc import Sequence
+
+from util import Singleton
+
+
+# Compiled word lists have a fixed header, then an offset table of (count + 1) little-endian uint64s, then the UTF-8 words back to back.
+COMPILED_SUFFIX = ".wlc"
+COMPILED_MAGIC = b"SHIBWLC1"
+HEADER_FORMAT = "<8sQ"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+OFFSET_FORMAT = "<Q"
+OFFSET_SIZE = struct.calcsize(OFFSET_FORMAT)
+
+
+class CorpusFormatError(Exception):
+	pass
+
+class Corpus(Sequence):
+	""" An immutable, deduplicated word list loaded from a file. """
+	def __init__(self, path, words, mtime):
+		self.path = path
+		self.words = tuple(words)
+		self.word_set = frozenset(self.words)
+		self.mtime = mtime
+
+	def __len__(self):
+		return len(self.words)
+
+	def __contains__(self, word):
+		return word in self.word_set
+
+	def __getitem__(self, index):
+		return self.words[index]
+
+	def close(self):
+		pass
+
+	def __repr__(self):
+		return f"Corpus({self.path!r}, {len(self.words)} words)"
+
+class MappedCorpus(Sequence):
+	"""
+	A compiled word list that is memory-mapped rather than read into memory.
+	Words are decoded one at a time on access, so sampling a few words from a huge list is cheap, and the pages are shared between processes.
+	"""
+	def __init__(self, path, mtime):
+		self.path = path
+		self.mtime = mtime
+
+		with open(path, "rb") as f:
+			# mmap refuses empty files, so check the size first.
+			if os.fstat(f.fileno()).st_size < HEADER_SIZE:
+				raise CorpusFormatError(f"{path} is too short to be a compiled word list")
+			self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+		try:
+			magic, self.count = struct.unpack_from(HEADER_FORMAT, self.buffer, 0)
+			if magic != COMPILED_MAGIC:
+				raise CorpusFormatError(f"{path} is not a compiled word list")
+
+			self.data_start = HEADER_SIZE + (self.count + 1) * OFFSET_SIZE
+			if (len(self.buffer) < self.data_start) or (len(self.buffer) < self.data_start + self.offset(self.count)):
+				raise CorpusFormatError(f"{path} is truncated")
+		except CorpusFormatError:
+			self.close()
+			raise
+
+	def offset(self, index):
+		(offset,) = struct.unpack_from(OFFSET_FORMAT, self.buffer, HEADER_SIZE + index * OFFSET_SIZE)
+		return offset
+
+	def __len__(self):
+		return self.count
+
+	def __getitem__(self, index):
+		if isinstance(index, slice):
+			return [self[i] for i in range(*index.indices(self.count))]
+		if index < 0:
+			index += self.count
+		if not (0 <= index < self.count):
+			raise IndexError("Corpus index out of range")
+
+		start = self.data_start + self.offset(index)
+		end = self.data_start + self.offset(index + 1)
+		return self.buffer[start:end].decode("utf-8")
+
+	def __contains__(self, word):
+		""" Scans the whole list, comparing bytes without decoding. Nothing in the bot needs this, since it's O(n). """
+		encoded_word = word.encode("utf-8")
+		start = self.data_start
+		for index in range(self.count):
+			end = self.data_start + self.offset(index + 1)
+			if (end - start == len(encoded_word)) and (self.buffer[start:end] == encoded_word):
+				return True
+			start = end
+		return False
+
+	@property
+	def words(self):
+		return self
+
+	def close(self):
+		""" Unmaps the file. Words can't be read after this. """
+		self.buffer.close()
+
+	def __repr__(self):
+		return f"MappedCorpus({self.path!r}, {self.count} words)"
+
+def read_word_list(path):
+	""" Reads a word list file with one word per line, skipping blank lines and dropping repeats while keeping the original order. """
+	with open(path, "r", encoding="utf-8") as f:
+		words = (line.strip() for line in f)
+		return tuple(dict.fromkeys(word for word in words if word))
+
+def compile_word_list(text_path, output_path):
+	""" Compiles a text word list into the binary format read by MappedCorpus. Returns the number of words written. """
+	encoded_words = [word.encode("utf-8") for word in read_word_list(text_path)]
+
+	offsets = [0]
+	for encoded_word in encoded_words:
+		offsets.append(offsets[-1] + len(encoded_word))
+
+	# Write to a temporary file and swap it in, so running bots never map a half-written file.
+	temp_path = output_path + ".tmp"
+	with open(temp_path, "wb") as f:
+		f.write(struct.pack(HEADER_FORMAT, COMPILED_MAGIC, len(encoded_words)))
+		f.write(struct.pack(f"<{len(offsets)}Q", *offsets))
+		f.writelines(encoded_words)
+	os.replace(temp_path, output_path)
+
+	return len(encoded_words)
+
+def load_corpus(path, mtime):
+	if path.endswith(COMPILED_SUFFIX):
+		return MappedCorpus(path, mtime)
+	else:
+		return Corpus(path, read_word_list(path), mtime)
+
+@Singleton
+class CorpusStore:
+	""" Process-wide cache of word lists, so each file is loaded once and only loaded again if it changes on disk. """
+	def __init__(self):
+		self.corpora = {}
+
+	def get_corpus(self, path):
+		mtime = os.stat(path).st_mtime_ns
+		corpus = self.corpora.get(path)
+
+		if (corpus is None) or (corpus.mtime != mtime):
+			# Games only read words from their corpus when they're made, so the old one can be closed right away.
+			old_corpus = corpus
+			corpus = load_corpus(path, mtime)
+			self.corpora[path] = corpus
+			if old_corpus is not None:
+				old_corpus.close()
+
+		return corpus
+
+	def clear(self):
+		self.corpora = {}
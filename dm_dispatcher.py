@@ -0,0 +1,48 @@
+import asyncio
+
+import aiohttp
+import discord
+
+
+class DMDispatcher:
+	"""
+	Sends direct messages to many members at once, with a cap on how many are in flight.
+	discord.py already waits out each route's rate limit bucket and the global limit, so the cap just keeps a big round
+	from queueing more requests than the limits let through. Server errors are retried with backoff.
+	"""
+	def __init__(self, max_concurrency=8, max_attempts=3, retry_delay=1.0):
+		self.max_attempts = max_attempts
+		self.retry_delay = retry_delay
+		# Shared by all rooms, since rate limits are per bot
+		self.semaphore = asyncio.Semaphore(max_concurrency)
+
+	async def send_all(self, messages):
+		"""
+		Sends each (member, content) pair concurrently. Returns (closed, failed): members who don't accept DMs from the bot,
+		and members whose messages couldn't be sent for any other reason.
+		"""
+		outcomes = await asyncio.gather(*(self.send(member, content) for (member, content) in messages))
+
+		closed = [member for ((member, _), outcome) in zip(messages, outcomes) if outcome == "closed"]
+		failed = [member for ((member, _), outcome) in zip(messages, outcomes) if outcome == "failed"]
+		return (closed, failed)
+
+	async def send(self, member, content):
+		""" Sends one message, retrying server errors. Returns "sent", "closed" or "failed". """
+		for attempt in range(self.max_attempts):
+			try:
+				async with self.semaphore:
+					await member.send(content)
+				return "sent"
+			except discord.Forbidden:
+				# DMs are closed, or the member blocked the bot. Retrying won't help.
+				return "closed"
+			except discord.DiscordServerError:
+				# Discord answered with a 5xx, so the message wasn't posted.
+				if attempt + 1 < self.max_attempts:
+					await asyncio.sleep(self.retry_delay * 2 ** attempt)
+			except (discord.HTTPException, asyncio.TimeoutError, aiohttp.ClientError):
+				# A timeout or dropped connection might come after the message was posted, so retrying could send it twice.
+				return "failed"
+
+		return "failed"
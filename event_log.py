@@ -0,0 +1,252 @@
+import argparse
+import json
+import os
+import time
+
+from batch_writer import BatchWriter
+from util import Singleton
+
+
+SEGMENT_PREFIX = "events-"
+SEGMENT_SUFFIX = ".jsonl"
+INDEX_SUFFIX = ".idx.json"
+
+
+def segment_path(directory, number):
+	return os.path.join(directory, f"{SEGMENT_PREFIX}{number:06d}{SEGMENT_SUFFIX}")
+
+def index_path(segment):
+	return segment[:-len(SEGMENT_SUFFIX)] + INDEX_SUFFIX
+
+def segment_paths(directory):
+	""" Returns the directory's segment files, oldest first. """
+	if not os.path.isdir(directory):
+		return []
+	names = sorted(name for name in os.listdir(directory) if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX))
+	return [os.path.join(directory, name) for name in names]
+
+def encode_event(event):
+	return (json.dumps(event, separators=(",", ":"), ensure_ascii=False) + "\n").encode("utf-8")
+
+class SegmentIndex:
+	"""
+	Byte offsets of the events in one segment, by room and by player, saved next to the segment when it's finished.
+	Also keeps how many bytes of the segment it covers, to tell when it's behind.
+	"""
+	def __init__(self, rooms=None, players=None, size=0):
+		self.rooms = rooms if (rooms is not None) else {}
+		self.players = players if (players is not None) else {}
+		self.size = size
+
+	def add(self, event, offset, length):
+		self.size = offset + length
+		self.rooms.setdefault(str(event["room"]), []).append(offset)
+		for player_id in event.get("players", ()):
+			self.players.setdefault(str(player_id), []).append(offset)
+
+	def offsets(self, room_id=None, player_id=None):
+		""" Returns the offsets of events matching both filters, in order, or None if there are no filters. """
+		matches = []
+		if room_id is not None:
+			matches.append(set(self.rooms.get(str(room_id), ())))
+		if player_id is not None:
+			matches.append(set(self.players.get(str(player_id), ())))
+		if not matches:
+			return None
+		return sorted(set.intersection(*matches))
+
+	def save(self, path):
+		temp_path = path + ".tmp"
+		with open(temp_path, "w") as f:
+			json.dump({"rooms": self.rooms, "players": self.players, "size": self.size}, f, separators=(",", ":"))
+		os.replace(temp_path, path)
+
+	@classmethod
+	def load(cls, path):
+		with open(path, "r") as f:
+			data = json.load(f)
+		return cls(data["rooms"], data["players"], data["size"])
+
+	@classmethod
+	def build(cls, segment):
+		""" Indexes a segment by reading it, for one whose index is missing or behind. """
+		index = cls()
+		offset = 0
+		with open(segment, "rb") as f:
+			for line in f:
+				if not line.endswith(b"\n"):
+					# Cut off partway through a write
+					break
+				index.add(json.loads(line), offset, len(line))
+				offset += len(line)
+		return index
+
+@Singleton
+class EventLog:
+	"""
+	Append-only log of round events as compact JSON lines, split into numbered segment files that each have an index by room and player.
+	Recording just queues the event. A background thread writes queued events in batches, starting a new segment
+	once the current one reaches segment_size bytes, and deleting the oldest segments past max_segments.
+	"""
+	def __init__(self):
+		self.directory = None
+		self.segment_size = None
+		self.max_segments = None
+		self.writer = None
+
+		# Only used on the writer thread once it's started
+		self.segment_number = None
+		self.segment_file = None
+		self.segment_index = None
+
+	@property
+	def is_open(self):
+		return self.writer is not None
+
+	def open(self, directory, segment_size=16 * 1024 * 1024, flush_interval=1.0, max_segments=None, max_pending=100000):
+		self.directory = directory
+		self.segment_size = segment_size
+		self.max_segments = max_segments
+		os.makedirs(directory, exist_ok=True)
+
+		self.resume_segment()
+		self.delete_old_segments()
+
+		self.writer = BatchWriter("EventLog", self.write_batch, flush_interval=flush_interval, max_pending=max_pending)
+		self.writer.start()
+
+	def resume_segment(self):
+		"""
+		Carries on appending to the newest segment, reindexing it in case the last run stopped before saving its index,
+		and dropping any event it was partway through writing.
+		"""
+		segments = segment_paths(self.directory)
+		if segments:
+			self.segment_number = int(os.path.basename(segments[-1])[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+			index = SegmentIndex.build(segments[-1])
+			os.truncate(segments[-1], index.size)
+			self.open_segment(index)
+		else:
+			self.segment_number = 0
+			self.open_segment(SegmentIndex())
+
+	def open_segment(self, index):
+		self.segment_file = open(segment_path(self.directory, self.segment_number), "ab")
+		self.segment_index = index
+
+	def close(self):
+		""" Writes the queued events and saves the current segment's index. """
+		if not self.is_open:
+			return
+		self.writer.stop()
+		self.writer = None
+		if self.segment_file is not None:
+			self.finish_segment()
+			self.segment_file = None
+
+	def record(self, event_type, room_id, player_ids=(), **fields):
+		""" Queues an event in a room, involving the players with these user IDs. Does nothing if the log isn't open. """
+		if not self.is_open:
+			return
+		event = {"time": round(time.time(), 3), "type": event_type, "room": room_id, "players": list(player_ids)}
+		event.update(fields)
+		self.writer.add(event)
+
+	def write_batch(self, pending):
+		# After a failed write, start again from what actually reached the file. Events from the failed batch that
+		# made it there are written again with the retry.
+		if self.segment_file is None:
+			self.resume_segment()
+		try:
+			self.write_events(pending.values())
+		except OSError:
+			try:
+				self.segment_file.close()
+			except OSError:
+				pass
+			self.segment_file = None
+			raise
+
+	def write_events(self, events):
+		offset = self.segment_file.tell()
+		chunks = []
+		for event in events:
+			if offset >= self.segment_size:
+				self.write_chunks(chunks)
+				chunks = []
+				self.rotate()
+				offset = 0
+			encoded = encode_event(event)
+			self.segment_index.add(event, offset, len(encoded))
+			chunks.append(encoded)
+			offset += len(encoded)
+
+		self.write_chunks(chunks)
+
+	def write_chunks(self, chunks):
+		self.segment_file.write(b"".join(chunks))
+		self.segment_file.flush()
+
+	def finish_segment(self):
+		self.segment_file.close()
+		self.segment_index.save(index_path(self.segment_file.name))
+
+	def rotate(self):
+		self.finish_segment()
+		self.segment_number += 1
+		self.open_segment(SegmentIndex())
+		self.delete_old_segments()
+
+	def delete_old_segments(self):
+		if self.max_segments is None:
+			return
+		for segment in segment_paths(self.directory)[:-self.max_segments]:
+			# Index first, so a segment is never left behind without one to be found and deleted next time.
+			for path in (index_path(segment), segment):
+				try:
+					os.remove(path)
+				except FileNotFoundError:
+					pass
+
+def load_index(segment):
+	# The segment being written to has no index yet, or one from before it was reopened.
+	try:
+		index = SegmentIndex.load(index_path(segment))
+		if index.size == os.path.getsize(segment):
+			return index
+	except (OSError, ValueError, KeyError):
+		pass
+	return SegmentIndex.build(segment)
+
+def read_events(directory, room_id=None, player_id=None):
+	""" Yields logged events oldest first, only those in the room and involving the player if given, reading just those events from each segment. """
+	for segment in segment_paths(directory):
+		try:
+			index = load_index(segment)
+			f = open(segment, "rb")
+		except FileNotFoundError:
+			# Deleted for being old since it was listed
+			continue
+
+		offsets = index.offsets(room_id, player_id)
+		with f:
+			if offsets is None:
+				for line in f:
+					if not line.endswith(b"\n"):
+						break
+					yield json.loads(line)
+				continue
+
+			for offset in offsets:
+				f.seek(offset)
+				yield json.loads(f.readline())
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Print logged round events as JSON lines, oldest first.")
+	parser.add_argument("directory", help="event log directory, like data/events")
+	parser.add_argument("--room", type=int, default=None, help="only events in the room with this channel ID")
+	parser.add_argument("--player", type=int, default=None, help="only events involving the player with this user ID")
+	args = parser.parse_args()
+
+	for event in read_events(args.directory, room_id=args.room, player_id=args.player):
+		print(json.dumps(event, ensure_ascii=False))
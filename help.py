@@ -2,6 +2,7 @@ import discord
 from discord.ext import commands
 
 from help_command import show_help_page, show_command_help
+from outbox import post
 from rooms import here
 
 class Help(commands.Cog):
@@ -26,7 +27,7 @@ class Help(commands.Cog):
 	)
 	async def howguess(self, ctx):
 		guess_message = "Use `!gw word` to guess the opposing team's word.\nUse `!gt [teammates]` to guess your team. Write their names space-separated; you can use `@` to autocomplete. You can omit yourself."
-		await ctx.send(guess_message)
+		post(ctx.channel, guess_message)
 
 		# If not in DM and round is ongoing, display additional info
 		if not isinstance(ctx.channel, discord.channel.DMChannel) and here(ctx).in_round:
@@ -43,4 +44,4 @@ class Help(commands.Cog):
 		lines.append("`Ctrl + E`: Open emoji (reactions) menu")
 		lines.append("`Ctrl + F`: Search recent messages")
 		lines.append("Compact view is recommended to see more clues at once (`User Settings > App Settings > Appearance`)")
-		await ctx.send("\n".join(lines))
+		post(ctx.channel, "\n".join(lines))
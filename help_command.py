@@ -1,3 +1,5 @@
+from outbox import post
+
 class CommandError(Exception):
 	pass
 
@@ -24,7 +26,7 @@ async def show_help_page(ctx):
 
 	message = "\n".join(message_lines)
 	boxed_message = prefix + "\n" + f"```{message}```"
-	await ctx.send(boxed_message)
+	post(ctx.channel, boxed_message)
 
 async def show_command_help(ctx, command_name):
 	command_name = command_name.lstrip("!")
@@ -41,4 +43,4 @@ async def show_command_help(ctx, command_name):
 	desc = command.description
 	command_signature_string = " " + command.signature if command.signature else ""
 
-	await ctx.send(f"`!{name}{command_signature_string}`: {desc} `{short_command}` for short.")
+	post(ctx.channel, f"`!{name}{command_signature_string}`: {desc} `{short_command}` for short.")
@@ -1,10 +1,15 @@
+import functools
 import typing
 
 import discord
 from discord.ext import commands
 
 from check import no_dm_predicate
-from rooms import here, Rooms
+import mailbox
+from outbox import post
+from player_index import PlayerIndex
+from room_store import RoomStore
+from rooms import here
 
 
 class Lobby(commands.Cog):
@@ -29,27 +34,28 @@ class Lobby(commands.Cog):
 			current_players = room.room_players
 
 			if member.bot:
-				await ctx.send(f"{ctx.author.mention} {member.display_name} is a bot.")
+				post(ctx.channel, f"{ctx.author.mention} {member.display_name} is a bot.")
 			elif room.in_round and (member in room.queued_leavers):
 				room.remove_member_from_leaver_queue(member)
-				await ctx.send(f"{member.mention} will no longer leave after this round.")
+				post(ctx.channel, f"{member.mention} will no longer leave after this round.")
 			elif member in current_players:
-				await ctx.send(f"{ctx.author.mention} {member.display_name} was already playing.")
+				post(ctx.channel, f"{ctx.author.mention} {member.display_name} was already playing.")
 			elif room.in_round:
-				await ctx.send(f"{member.mention} will join and be pinged after this round ends.")
+				post(ctx.channel, f"{member.mention} will join and be pinged after this round ends.")
 				room.add_member_to_joiner_queue(member)
 			else:
 				room.add_player(member)
+				room.schedule_next_round_preparation()
 				if room.playing_role is not None:
 					try:
 						await member.add_roles(room.playing_role)
 					except discord.errors.Forbidden:
 						pass
-				await ctx.send(f"{member.mention} is now playing")
+				post(ctx.channel, f"{member.mention} is now playing")
 
 				# Automatically unjoin other channels one is joined in or queued in.
 				# Currently a player can join another channel while in an ongoing game, and only be queued to leave. Maybe should change to disallow joining in that circumstance.
-				await self.unjoin_other_rooms_in_server(member, ctx)
+				await self.unjoin_other_rooms_in_server(member, room)
 
 	@commands.command(
 		brief="Mark yourself or others as not playing",
@@ -60,24 +66,26 @@ class Lobby(commands.Cog):
 		if not members:
 			members = (ctx.author,)
 
-		playing_role = here(ctx).playing_role
+		room = here(ctx)
+		playing_role = room.playing_role
 
 		for member_or_role in members:
 			if isinstance(member_or_role, discord.Role):
 				if member_or_role == playing_role:
-					players_here = list(here(ctx).room_players)
+					players_here = list(room.room_players)
 					for player in players_here:
-						await self.remove_player(ctx, player)
+						await self.remove_player(room, player, ctx.author)
 				else:
 					raise commands.CheckFailure(f"Cannot remove `{member_or_role.name}`. Must be the current room's player role `{playing_role.name}`.")
 			elif isinstance(member_or_role, discord.Member):
-				await self.remove_player(ctx, member_or_role)
+				await self.remove_player(room, member_or_role, ctx.author)
 			else:
 				raise commands.CheckFailure(f"`{member_or_role}` is neither a member not a role.")
 
-	async def remove_player(self, ctx, member, reason=None):
-		room = here(ctx)
-		playing_role = here(ctx).playing_role
+	async def remove_player(self, room, member, author, reason=None):
+		""" Removes the member from the room, or queues them to leave if they're in the round, posting the outcome in the room's channel. """
+		channel = room.channel
+		playing_role = room.playing_role
 
 		if reason is not None:
 			reason_str = f" ({reason})"
@@ -85,14 +93,15 @@ class Lobby(commands.Cog):
 			reason_str = ""
 
 		if room.in_round and (member in room.game.players):
-			await ctx.send(f"{member.display_name} will leave after this round finishes{reason_str}.")
+			post(channel, f"{member.display_name} will leave after this round finishes{reason_str}.")
 			room.add_member_to_leaver_queue(member)
 		elif room.in_round and (member in room.queued_joiners):
 			room.remove_member_from_joiner_queue(member)
-			await ctx.send(f"{member.display_name} will no longer join after this round{reason_str}.")
+			post(channel, f"{member.display_name} will no longer join after this round{reason_str}.")
 		elif member in room.room_players:
 			room.remove_player(member)
-			await ctx.send(f"{member.display_name} is no longer playing{reason_str}.")
+			room.schedule_next_round_preparation()
+			post(channel, f"{member.display_name} is no longer playing{reason_str}.")
 
 			if playing_role:
 				try:
@@ -100,26 +109,21 @@ class Lobby(commands.Cog):
 				except discord.errors.Forbidden:
 					pass
 		else:
-			await ctx.send(f"{ctx.author.mention} {member.display_name} was already not playing.")
+			post(channel, f"{author.mention} {member.display_name} was already not playing.")
 
-	async def unjoin_other_rooms_in_server(self, player, ctx):
-		my_channel = ctx.channel
-		my_guild = ctx.guild
-
-		for channel in my_guild.channels:
-			if channel == my_channel:
+	async def unjoin_other_rooms_in_server(self, player, room):
+		# Only the rooms the player is actually in, rather than every channel in the server
+		for other_room in PlayerIndex.get().rooms_of(room.guild_id, player.id):
+			if other_room is room:
 				continue
 
-			try:
-				other_room = Rooms.get().get_channel(channel)
-			except KeyError:
-				continue
+			# Queue this in the other room rather than waiting on it, since that room could be waiting on this one.
+			mailbox.submit(other_room.channel.id, functools.partial(self.unjoin_other_room, other_room, player, room))
 
-			other_channel = other_room.channel
-			if (player in other_room.room_players) or (player in other_room.queued_joiners):
-				# Mutating ctx, be careful
-				ctx.channel = other_channel
-				await self.remove_player(ctx, player, f"joined {my_channel.mention}")
+	async def unjoin_other_room(self, other_room, player, joined_room):
+		await self.remove_player(other_room, player, player, f"joined {joined_room.channel.mention}")
+		# Commands only save their own room, so save this one here.
+		RoomStore.get().record(other_room)
 
 	@commands.command(
 		brief="Start a new round with the joined players",
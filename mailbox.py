@@ -0,0 +1,90 @@
+import asyncio
+import traceback
+from collections import deque
+
+from sys import stderr
+
+
+class Mailbox:
+	"""
+	Runs jobs for one room one at a time, in the order they were submitted, so a job never sees another job's changes half done.
+	Jobs are coroutine functions taking no arguments. A worker task runs while there are jobs and stops when it runs out.
+	"""
+	__slots__ = ("key", "jobs", "worker", "running")
+
+	def __init__(self, key):
+		self.key = key
+		# (job, future) pairs waiting to run
+		self.jobs = deque()
+		self.worker = None
+		self.running = False
+
+	@property
+	def depth(self):
+		""" Number of jobs queued, counting any that's running. """
+		return len(self.jobs) + int(self.running)
+
+	def submit(self, job):
+		""" Queues the job and returns a future for its result. """
+		loop = asyncio.get_running_loop()
+		future = loop.create_future()
+		self.jobs.append((job, future))
+		if self.worker is None:
+			self.worker = loop.create_task(self.work())
+		return future
+
+	async def work(self):
+		try:
+			while self.jobs:
+				job, future = self.jobs.popleft()
+				self.running = True
+				try:
+					result = await job()
+				except Exception as e:
+					if not future.cancelled():
+						future.set_exception(e)
+				else:
+					if not future.cancelled():
+						future.set_result(result)
+				finally:
+					self.running = False
+		finally:
+			self.worker = None
+			if not self.jobs:
+				mailboxes.pop(self.key, None)
+
+# Room key -> mailbox, only for rooms with jobs queued or running
+mailboxes = {}
+
+
+def mailbox_for(key):
+	mailbox = mailboxes.get(key)
+	if mailbox is None:
+		mailbox = mailboxes[key] = Mailbox(key)
+	return mailbox
+
+async def run_serially(key, job):
+	""" Runs the job once every job submitted before it for this key has finished, and returns its result. """
+	return await mailbox_for(key).submit(job)
+
+def submit(key, job):
+	"""
+	Queues the job without waiting for it, logging any error it raises.
+	For changing another room from inside a job, where waiting on that room could deadlock if it's waiting on this one.
+	"""
+	future = mailbox_for(key).submit(job)
+	future.add_done_callback(log_failure)
+
+def log_failure(future):
+	if (not future.cancelled()) and (future.exception() is not None):
+		exception = future.exception()
+		print("Queued room job failed:", file=stderr)
+		traceback.print_exception(type(exception), exception, exception.__traceback__)
+
+def queue_depth(key):
+	mailbox = mailboxes.get(key)
+	return mailbox.depth if (mailbox is not None) else 0
+
+def queue_depths():
+	""" Maps each room key with jobs queued or running to how many there are. """
+	return {key: mailbox.depth for (key, mailbox) in mailboxes.items()}
@@ -0,0 +1,31 @@
+import re
+
+PARENTHETICAL_ASIDE = re.compile(r'\([^\)]*\)')
+
+
+def command_starts(prefix):
+	""" Returns what a message has to start with to possibly be a command: the prefix, a mention of the bot, or a parenthetical aside before either. """
+	return (prefix, "<@", "(")
+
+def might_be_command(content, starts):
+	"""
+	Cheaply rules out messages that can't be commands, given command_starts(prefix), before any regex work.
+	Only looks at the start of the message, skipping leading whitespace.
+	"""
+	if content[:1].isspace():
+		content = content.lstrip()
+	return content.startswith(starts)
+
+def remove_parenthetical_asides(text):
+	"""Remove parts inside parens, including the parens themselves, matching minimally. For example, 'a(bc)de(f)g' goes to 'adeg'. Then, remove leading and trailing whitespace."""
+	return PARENTHETICAL_ASIDE.sub('', text).strip()
+
+def preprocess_command_content(content):
+	""" Returns the message content to scan for commands, or None if the message should be ignored. """
+	content = remove_parenthetical_asides(content)
+
+	# Ignore commands that consist solely of exclamation or contain a question mark
+	if (set(content) <= {"!"}) or ("?" in content):
+		return None
+
+	return content
@@ -0,0 +1,75 @@
+from collections import deque
+
+from util import Singleton
+
+
+class Timing:
+	""" Running count, total and extremes of a duration in seconds, plus a window of recent values for percentiles. """
+	__slots__ = ("count", "total", "minimum", "maximum", "recent")
+
+	def __init__(self, window=1000):
+		self.count = 0
+		self.total = 0.0
+		self.minimum = None
+		self.maximum = None
+		self.recent = deque(maxlen=window)
+
+	def record(self, seconds):
+		self.count += 1
+		self.total += seconds
+		self.minimum = seconds if (self.minimum is None) else min(self.minimum, seconds)
+		self.maximum = seconds if (self.maximum is None) else max(self.maximum, seconds)
+		self.recent.append(seconds)
+
+	def percentile(self, fraction):
+		""" Returns the value at this fraction of the way through the recent values, or None if there are none. """
+		if not self.recent:
+			return None
+		ordered = sorted(self.recent)
+		return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+	def summary(self):
+		return {
+			"count": self.count,
+			"mean": (self.total / self.count) if self.count else None,
+			"min": self.minimum,
+			"p50": self.percentile(0.5),
+			"p95": self.percentile(0.95),
+			"max": self.maximum,
+		}
+
+@Singleton
+class Metrics:
+	""" Process-wide named timings and counters. """
+	def __init__(self):
+		self.timings = {}
+		self.counters = {}
+
+	def record_time(self, name, seconds):
+		timing = self.timings.get(name)
+		if timing is None:
+			timing = self.timings[name] = Timing()
+		timing.record(seconds)
+
+	def increment(self, name, amount=1):
+		self.counters[name] = self.counters.get(name, 0) + amount
+
+	def summary(self):
+		return {
+			"timings": {name: timing.summary() for (name, timing) in self.timings.items()},
+			"counters": dict(self.counters),
+		}
+
+	def summary_string(self):
+		""" Returns the timings and counters as lines of text. """
+		lines = []
+		for (name, timing) in self.timings.items():
+			if timing.count:
+				lines.append(f"{name}: {timing.count} times, mean {timing.total / timing.count:.3f}s, p50 {timing.percentile(0.5):.3f}s, p95 {timing.percentile(0.95):.3f}s, max {timing.maximum:.3f}s")
+		for (name, count) in self.counters.items():
+			lines.append(f"{name}: {count}")
+		return "\n".join(lines) if lines else "No metrics recorded yet."
+
+	def clear(self):
+		self.timings = {}
+		self.counters = {}
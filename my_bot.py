@@ -1,15 +1,24 @@
-import re
+import asyncio
+import time
 import traceback
 
 import discord
 from discord.ext.commands import Bot
 
 import config
+import mailbox
+from corpus import CorpusStore
 from help import Help
 from help_command import CommandError
 from lobby import Lobby
+from message_utils import command_starts, might_be_command, preprocess_command_content
+from metrics import Metrics
 from options import Options
+from outbox import post
+from player_index import PlayerIndex
+from role_cache import RoleCache
 from room import RoomError
+from room_store import RoomStore
 from rooms import MissingChannelError, Rooms
 from round import Round
 from server import Server
@@ -20,11 +29,20 @@ from datetime import datetime
 
 from sys import stderr
 
+# Seconds between heartbeats when running as a shard
+HEARTBEAT_INTERVAL = 15
+
+# Seconds between checks for idle rooms to evict
+IDLE_ROOM_CHECK_INTERVAL = 300
+
+# Commands that change a room's game or roster, which run one at a time per room
+SERIALIZED_COMMANDS = {"start", "guessword", "guessteam", "abandon", "join", "unjoin", "pause", "unpause"}
+
 class MyBot(Bot):
 	"""
 	Creates a custom bot (client) with custom event listeners.
 	"""
-	def __init__(self):
+	def __init__(self, shard_id=None, shard_count=None, heartbeat=None):
 		command_prefix = discord.ext.commands.when_mentioned_or(config.bot_prefix)
 		activity = discord.Game(name="Shibboleth (!h for help)")
 
@@ -33,15 +51,54 @@ class MyBot(Bot):
 		# Be able to read messages to process commands
 		intents.message_content = True
 
-		# The members intent is used solely in sync_players when the bot starts to mark everyone with the playing role as playing. This is useful is the bot restarts in the middle of some games.
+		# The members intent is used solely to mark everyone with the playing role as playing when a room is first used. This is useful is the bot restarts in the middle of some games.
 		intents.members = True
 
-		Bot.__init__(self, command_prefix=command_prefix, help_command=None, activity=activity, case_insensitive=True, intents=intents)
+		# When sharded, this process only gets events for the guilds on its shard, so its rooms never overlap with another shard's.
+		Bot.__init__(self, command_prefix=command_prefix, help_command=None, activity=activity, case_insensitive=True, intents=intents,
+			shard_id=shard_id, shard_count=shard_count)
+
+		# What a message must start with to be worth scanning for commands
+		self.command_starts = command_starts(config.bot_prefix)
+
+		# Shared value the shard supervisor watches to tell this shard is still healthy
+		self.heartbeat = heartbeat
 
 		# Make all commands not silently truncate up to the last valid argument
 		for command in self.walk_commands():
 			command.ignore_extra = False
 
+	async def setup_hook(self):
+		if self.heartbeat is not None:
+			self.loop.create_task(self.send_heartbeats())
+		self.loop.create_task(self.evict_idle_rooms())
+
+	async def send_heartbeats(self):
+		# Only beat while connected, so a shard that stays disconnected or has a stuck event loop gets restarted.
+		while not self.is_closed():
+			if self.is_ready():
+				self.heartbeat.value = time.time()
+			await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+	async def evict_idle_rooms(self):
+		while not self.is_closed():
+			await asyncio.sleep(IDLE_ROOM_CHECK_INTERVAL)
+			num_evicted = Rooms.get().evict_idle_rooms()
+			if num_evicted:
+				print(f"Evicted {num_evicted} idle rooms")
+
+	async def invoke(self, ctx):
+		# A room restored mid-veto gets its deadline back with its first command, which is when rooms are made.
+		if (ctx.command is not None) and (ctx.guild is not None):
+			self.get_cog("Round").resume_restored_veto(ctx)
+
+		# Queue state-changing commands behind any others in the same room, checks included, so they never interleave.
+		# Rooms don't wait on each other, and other commands skip the queue.
+		if (ctx.command is not None) and (ctx.command.name in SERIALIZED_COMMANDS) and (ctx.guild is not None):
+			await mailbox.run_serially(ctx.channel.id, lambda: Bot.invoke(self, ctx))
+		else:
+			await Bot.invoke(self, ctx)
+
 	# Logs commands for debugging. TODO: actually log.
 	async def on_command(self, ctx):
 		now = datetime.now()
@@ -54,8 +111,20 @@ class MyBot(Bot):
 		message = f"{dt_string}: Command \"{ctx.command}\" run in guild {guild_name}, channel {channel_name} by {author_name} (message: {ctx.message.content})."
 		print(message)
 
+	# Save the room after every command in it, since most commands change its state.
+	# Unknown commands, like ones meant for other bots, don't make a room just to save it.
+	def save_room(self, ctx):
+		room = Rooms.get().rooms.get(ctx.channel.id)
+		if (ctx.command is not None) and (ctx.guild is not None) and (room is not None):
+			RoomStore.get().record(room)
+
+	async def on_command_completion(self, ctx):
+		self.save_room(ctx)
+
 	# When a command fails, display information about the error in the Discord channel
 	async def on_command_error(self, ctx, exception):
+		self.save_room(ctx)
+
 		orig_exception = exception.__cause__
 		message = ctx.message.content
 
@@ -73,7 +142,7 @@ class MyBot(Bot):
 		else:
 			error_message = f"{ctx.author.mention} Failed{command_info}: {exception}"
 
-		await ctx.send(error_message)
+		post(ctx.channel, error_message)
 
 		if (orig_exception is not None) and not isinstance(orig_exception, (GameActionError, RoomError, GameInitializationError)):
 			extended_error_message = f"{ctx.author.name} in guild {ctx.guild.name}, channel {ctx.channel.name}\nFailed{command_info}: {exception}"
@@ -81,7 +150,11 @@ class MyBot(Bot):
 			traceback.print_exception(type(orig_exception), orig_exception, orig_exception.__traceback__)
 
 	# Make the bot pick up on commands in edited messages
-	async def on_message_edit(self, _before, after):
+	async def on_message_edit(self, before, after):
+		# Discord also sends edits when a link's embed loads, which don't change the text.
+		# The cached message's content was already preprocessed by on_message if it looked like a command.
+		if before.content in (after.content, preprocess_command_content(after.content)):
+			return
 		await self.on_message(after)
 
 	# Do additional processing on messages before scanning them for commands
@@ -90,16 +163,17 @@ class MyBot(Bot):
 		if message.author.bot:
 			return
 
-		def remove_parenthetical_asides(text):
-			"""Remove parts inside parens, including the parens themselves, matching minimally. For example, 'a(bc)de(f)g' goes to 'adeg'. Then, remove leading and trailing whitespace."""
-			return re.sub(r'\([^\)]*\)', '', text).strip()
-
-		message.content = remove_parenthetical_asides(message.content)
+		# Most messages are clues, so turn them away before doing anything more expensive.
+		if not might_be_command(message.content, self.command_starts):
+			Metrics.get().increment("messages skipped")
+			return
+		Metrics.get().increment("messages processed")
 
-		# Ignore commands that consist solely of exclamation or contain a question mark
-		if (set(message.content) <= {"!"}) or ("?" in message.content):
+		content = preprocess_command_content(message.content)
+		if content is None:
 			return
 
+		message.content = content
 		await self.process_commands(message)
 
 	async def on_ready(self):
@@ -107,21 +181,48 @@ class MyBot(Bot):
 		for cog_class in [Lobby, Round, Help, Status, Options, Server]:
 			await self.add_cog(cog_class(self))
 
-		await self.initialize_all_channels()
+		# Load the word list up front so the first round doesn't have to read it from disk.
+		CorpusStore.get().get_corpus(config.word_list_path)
+
+		# Index roles by name now so commands never scan a guild's roles.
+		for guild in self.guilds:
+			RoleCache.get().index_guild(guild)
+
+		# Rooms are made when their channel gets its first command, rather than for every channel up front.
 		print("\nInitialization complete\n")
 
-	async def initialize_channels_in_guild(self, guild):
-		for channel in guild.text_channels:
-			# Skip over any channel the bot can't read, since we're getting these channels too
-			if not channel.permissions_for(channel.guild.me).read_messages:
-				continue
+	# Cached strings with names go stale when someone's display name changes, but only in rooms they're in
+	async def on_member_update(self, before, after):
+		if before.display_name != after.display_name:
+			for room in PlayerIndex.get().rooms_of(after.guild.id, after.id):
+				room.names_changed()
+		if before.roles != after.roles:
+			Rooms.get().member_roles_changed(before, after)
 
-			Rooms.get().add_channel(channel)
+	async def on_member_remove(self, member):
+		Rooms.get().member_removed(member)
 
-	async def initialize_all_channels(self):
-		for guild in self.guilds:
-			print(f"Initializing {guild.name} ({guild.id})")
-			await self.initialize_channels_in_guild(guild)
+	async def on_user_update(self, before, after):
+		if before.display_name != after.display_name:
+			for guild in after.mutual_guilds:
+				for room in PlayerIndex.get().rooms_of(guild.id, after.id):
+					room.names_changed()
+
+	async def on_guild_join(self, guild):
+		RoleCache.get().index_guild(guild)
+
+	async def on_guild_remove(self, guild):
+		RoleCache.get().remove_guild(guild)
+
+	async def on_guild_role_create(self, role):
+		RoleCache.get().roles_changed(role.guild)
+
+	async def on_guild_role_update(self, before, after):
+		if before.name != after.name:
+			RoleCache.get().roles_changed(after.guild)
+
+	async def on_guild_role_delete(self, role):
+		RoleCache.get().roles_changed(role.guild)
 
 	async def on_guild_channel_delete(self, channel):
 		Rooms.get().remove_channel(channel)
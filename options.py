@@ -1,6 +1,7 @@
 from discord.ext import commands
 
 from check import no_dm_predicate
+from outbox import post
 from rooms import here
 
 
@@ -11,9 +12,11 @@ class Options(commands.Cog):
 	def cog_check(self, ctx):
 		return no_dm_predicate(ctx)
 
-	async def message_in_round(self, ctx):
-		if here(ctx).in_round:
-			await ctx.send("(This change will take effect next round.)")
+	async def option_changed(self, ctx):
+		room = here(ctx)
+		room.schedule_next_round_preparation()
+		if room.in_round:
+			post(ctx.channel, "(This change will take effect next round.)")
 
 	@commands.command(
 		brief="Set or show number of words (0 for default by player count)",
@@ -25,14 +28,14 @@ class Options(commands.Cog):
 			if not ((2 <= num <= 100) or (num == 0)):
 				raise commands.CheckFailure(f"Invalid number of words {num}.")
 			here(ctx).num_words = num
-			await self.message_in_round(ctx)
+			await self.option_changed(ctx)
 
 		num = here(ctx).num_words
 
 		if num == 0:
-			await ctx.send(f"Number of words: 0 (automatically double the number of players)")
+			post(ctx.channel, f"Number of words: 0 (automatically double the number of players)")
 		else:
-			await ctx.send(f"Number of words: {num}")
+			post(ctx.channel, f"Number of words: {num}")
 
 	@commands.command(
 		brief="Set or show team guess size for large games",
@@ -44,10 +47,10 @@ class Options(commands.Cog):
 			if not 1 <= size <= 99:
 				raise commands.CheckFailure(f"Invalid team guess size {size}.")
 			here(ctx).max_guess = size
-			await self.message_in_round(ctx)
+			await self.option_changed(ctx)
 
 		size = here(ctx).max_guess
-		await ctx.send(f"Guess team subset of size {size} (counting yourself) in games with {2*size + 1}+ players.")
+		post(ctx.channel, f"Guess team subset of size {size} (counting yourself) in games with {2*size + 1}+ players.")
 
 	@commands.command(
 		brief="Set or show veto round duration",
@@ -59,7 +62,7 @@ class Options(commands.Cog):
 			if not 0 <= duration <= 999:
 				raise commands.CheckFailure(f"Invalid duration {duration}.")
 			here(ctx).veto_duration = duration
-			await self.message_in_round(ctx)
+			await self.option_changed(ctx)
 
 		duration = here(ctx).veto_duration
 
@@ -68,7 +71,7 @@ class Options(commands.Cog):
 		else:
 			description = f"{duration} seconds"
 
-		await ctx.send(f"Veto duration: {description}")
+		post(ctx.channel, f"Veto duration: {description}")
 
 	@commands.command(
 		brief="Set or show chance of more uneven teams",
@@ -80,7 +83,7 @@ class Options(commands.Cog):
 			if not 0.0 <= skew_chance <= 1.0:
 				raise commands.CheckFailure(f"Invalid chance {skew_chance}.")
 			here(ctx).skew_chance = skew_chance
-			await self.message_in_round(ctx)
+			await self.option_changed(ctx)
 
 		skew_chance = here(ctx).skew_chance
 
@@ -91,4 +94,25 @@ class Options(commands.Cog):
 		else:
 			description = f"{skew_chance:.1%}"
 
-		await ctx.send(f"Skew chance: {description}")
+		post(ctx.channel, f"Skew chance: {description}")
+
+	@commands.command(
+		brief="Set or show rounds before words can repeat",
+		description="Set or show how many recent rounds' words are kept off the word list, so the same words don't come up again soon. Zero allows words from any round. Call without a number to show the current value.",
+		aliases=["nr"],
+	)
+	async def norepeat(self, ctx, *, num_rounds: int = None):
+		if num_rounds is not None:
+			if not 0 <= num_rounds <= 50:
+				raise commands.CheckFailure(f"Invalid number of rounds {num_rounds}.")
+			here(ctx).recent_rounds = num_rounds
+			await self.option_changed(ctx)
+
+		num_rounds = here(ctx).recent_rounds
+
+		if num_rounds == 0:
+			description = "0 (words may repeat from any round)"
+		else:
+			description = f"{num_rounds}"
+
+		post(ctx.channel, f"Recent rounds without repeated words: {description}")
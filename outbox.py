@@ -0,0 +1,102 @@
+import asyncio
+import traceback
+from collections import deque
+
+from word_layout import MESSAGE_LENGTH_LIMIT
+
+from sys import stderr
+
+
+class Outbox:
+	"""
+	Queue of outgoing messages for one channel, sent in order by a single worker task.
+	Consecutive posted messages are joined with newlines into as few sends as fit under the message length limit,
+	so a burst like a round's intro goes out in one request, and anything posted while a send is in flight joins the next one.
+	"""
+	__slots__ = ("channel", "queue", "worker")
+
+	def __init__(self, channel):
+		self.channel = channel
+		# Each entry is (content, future), where future is None for posts and set with the sent message for standalone sends.
+		self.queue = deque()
+		self.worker = None
+
+	def post(self, content):
+		""" Queues a message to be sent soon, possibly joined with the ones around it. Doesn't wait for it to be sent. """
+		self.queue.append((content, None))
+		self.start_worker()
+
+	async def send(self, content):
+		""" Sends a message on its own once everything queued before it is sent, and returns it, like channel.send. """
+		future = asyncio.get_running_loop().create_future()
+		self.queue.append((content, future))
+		self.start_worker()
+		return await future
+
+	def start_worker(self):
+		if self.worker is None:
+			self.worker = asyncio.get_running_loop().create_task(self.work())
+
+	def take_batch(self):
+		""" Removes and returns the next message to send, joining as many consecutive posts as fit, along with its future. """
+		content, future = self.queue.popleft()
+		if future is not None:
+			return (content, future)
+
+		parts = [content]
+		length = len(content)
+		while self.queue:
+			next_content, next_future = self.queue[0]
+			if (next_future is not None) or (length + 1 + len(next_content) > MESSAGE_LENGTH_LIMIT):
+				break
+			self.queue.popleft()
+			parts.append(next_content)
+			length += 1 + len(next_content)
+
+		return ("\n".join(parts), None)
+
+	async def work(self):
+		try:
+			# Let the command that posted keep running until it waits on something, so its other messages are batched too.
+			await asyncio.sleep(0)
+			while self.queue:
+				content, future = self.take_batch()
+				try:
+					message = await self.channel.send(content)
+				except Exception as e:
+					if future is not None:
+						future.set_exception(e)
+					else:
+						print(f"Failed to send message in {self.channel}:", file=stderr)
+						traceback.print_exc()
+				else:
+					if future is not None:
+						future.set_result(message)
+		finally:
+			self.worker = None
+			if not self.queue:
+				outboxes.pop(self.channel.id, None)
+
+# Channel id -> outbox, only for channels with messages waiting to be sent
+outboxes = {}
+
+
+def outbox_for(channel):
+	outbox = outboxes.get(channel.id)
+	if outbox is None:
+		outbox = outboxes[channel.id] = Outbox(channel)
+	return outbox
+
+def post(channel, content):
+	""" Queues a message in the channel, to be sent soon joined with adjacent messages. Doesn't wait for it to be sent. """
+	outbox_for(channel).post(content)
+
+async def send(channel, content):
+	""" Sends a message in the channel on its own after any queued ones, and returns the sent message. """
+	return await outbox_for(channel).send(content)
+
+async def flush(channel):
+	""" Waits until every message queued in the channel so far is sent. """
+	outbox = outboxes.get(channel.id)
+	if (outbox is not None) and (outbox.worker is not None):
+		await asyncio.shield(outbox.worker)
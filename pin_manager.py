@@ -0,0 +1,58 @@
+import asyncio
+
+import discord
+
+
+class PinManager:
+	"""
+	Pins each round's word list, remembering the pinned message's ID in its room so the last one can be unpinned directly.
+	Unpinning happens in the background, off the round start. Only when there's no remembered ID,
+	like a room's first round, does it fetch the channel's pins and unpin every one the bot made.
+	"""
+	def __init__(self, bot):
+		self.bot = bot
+		# Keep references to background tasks so they aren't garbage collected before they finish
+		self.tasks = set()
+
+	async def pin_word_list(self, room, message):
+		previous_id = room.pinned_word_list_id
+		room.pinned_word_list_id = None
+
+		self.run_in_background(self.unpin_previous(room.channel, previous_id, message.id))
+
+		# Pin the message, but if we can't due to not having permissions, don't do anything.
+		try:
+			await message.pin()
+		except discord.errors.Forbidden:
+			return
+		room.pinned_word_list_id = message.id
+
+	def run_in_background(self, coroutine):
+		task = asyncio.get_running_loop().create_task(coroutine)
+		self.tasks.add(task)
+		task.add_done_callback(self.tasks.discard)
+
+	async def unpin_previous(self, channel, previous_id, keep_id):
+		if previous_id is None:
+			await self.unpin_all(channel, keep_id)
+			return
+
+		try:
+			await channel.get_partial_message(previous_id).unpin()
+		except (discord.errors.NotFound, discord.errors.Forbidden):
+			# Already deleted or unpinned by someone, or we can't manage pins here.
+			pass
+
+	async def unpin_all(self, channel, keep_id):
+		""" Unpins every message the bot pinned in the channel except the one with keep_id. """
+		try:
+			pinned_messages = await channel.pins()
+		except discord.errors.Forbidden:
+			return
+
+		for pinned_message in pinned_messages:
+			if (pinned_message.author == self.bot.user) and (pinned_message.id != keep_id):
+				try:
+					await pinned_message.unpin()
+				except (discord.errors.NotFound, discord.errors.Forbidden):
+					pass
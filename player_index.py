@@ -0,0 +1,41 @@
+from util import Singleton
+
+
+@Singleton
+class PlayerIndex:
+	"""
+	Maps (guild ID, user ID) to the rooms where that member is playing or queued to join,
+	so finding a member's other rooms doesn't mean checking every channel in the guild. Rooms keep it up to date as their rosters change.
+	"""
+	def __init__(self):
+		self.rooms_by_member = {}
+
+	def update(self, room, member):
+		""" Records whether the member is now in the room, as a player or queued joiner. """
+		key = (room.guild_id, member.id)
+		if (member in room.room_players) or (member in room.queued_joiners):
+			# Dicts rather than sets so rooms come back in the order the member joined them
+			self.rooms_by_member.setdefault(key, {})[room] = None
+			return
+
+		rooms = self.rooms_by_member.get(key)
+		if rooms is not None:
+			rooms.pop(room, None)
+			if not rooms:
+				del self.rooms_by_member[key]
+
+	def remove_room(self, room):
+		for member_id in {member.id for member in room.room_players} | {member.id for member in room.queued_joiners}:
+			key = (room.guild_id, member_id)
+			rooms = self.rooms_by_member.get(key)
+			if rooms is not None:
+				rooms.pop(room, None)
+				if not rooms:
+					del self.rooms_by_member[key]
+
+	def rooms_of(self, guild_id, member_id):
+		""" Returns a list of the rooms in the guild where the member is playing or queued to join. """
+		return list(self.rooms_by_member.get((guild_id, member_id), ()))
+
+	def clear(self):
+		self.rooms_by_member.clear()
@@ -0,0 +1,26 @@
+class RenderCache:
+	"""
+	Caches rendered text fragments by name. Each fragment is stored with a key built from the state it depends on,
+	and is only rendered again when that key changes.
+	"""
+	__slots__ = ("fragments", "names_version")
+
+	def __init__(self):
+		self.fragments = {}
+		# Bumped when the display name of someone whose name might be in a fragment changes, for keys of fragments with names
+		self.names_version = 0
+
+	def names_changed(self):
+		self.names_version += 1
+
+	def get(self, name, key, render):
+		cached = self.fragments.get(name)
+		if (cached is not None) and (cached[0] == key):
+			return cached[1]
+
+		text = render()
+		self.fragments[name] = (key, text)
+		return text
+
+	def clear(self):
+		self.fragments.clear()
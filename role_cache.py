@@ -0,0 +1,54 @@
+import functools
+import re
+
+import config
+from util import Singleton
+
+
+# Splits a channel name like "shibboleth-game2" into its prefix and numerical suffix.
+CHANNEL_NAME_PATTERN = re.compile(r"(?P<prefix>[^0-9]*)(?P<suffix>.*)$")
+
+
+@functools.lru_cache(maxsize=None)
+def playing_role_name(channel_name):
+	""" Returns the name of the playing role for a channel with this name, or None if none is configured. """
+	channel_name_split = CHANNEL_NAME_PATTERN.match(channel_name)
+
+	channel_name_prefix = channel_name_split.group('prefix')
+	suffix = channel_name_split.group('suffix')
+
+	role_prefix = config.playing_roles_in_channels.get(channel_name_prefix, config.misc_playing_role)
+	return (role_prefix + suffix) if role_prefix else None
+
+@Singleton
+class RoleCache:
+	"""
+	Per-guild map of role name to role, so looking up a role by name doesn't scan the guild's roles.
+	Each guild's map is built once and rebuilt whenever one of its roles is created, renamed or deleted.
+	"""
+	def __init__(self):
+		self.roles_by_name = {}
+
+	def index_guild(self, guild):
+		roles_by_name = {}
+		for role in guild.roles:
+			# Keep the first role with each name, like discord.utils.get
+			roles_by_name.setdefault(role.name, role)
+		self.roles_by_name[guild.id] = roles_by_name
+		return roles_by_name
+
+	def get_role(self, guild, name):
+		""" Returns the guild's role with this name, or None if there isn't one. """
+		if name is None:
+			return None
+
+		roles_by_name = self.roles_by_name.get(guild.id)
+		if roles_by_name is None:
+			roles_by_name = self.index_guild(guild)
+		return roles_by_name.get(name)
+
+	def roles_changed(self, guild):
+		self.index_guild(guild)
+
+	def remove_guild(self, guild):
+		self.roles_by_name.pop(guild.id, None)
@@ -1,19 +1,42 @@
-from name_utils import names_string
-from shibboleth import Shibboleth
+import asyncio
+import time
+
+from name_utils import names_string, names_string_formatted
+from player_index import PlayerIndex
+from render_cache import RenderCache
+from roster import Roster
+from scheduler import Scheduler
+from serialization import STATE_FORMAT_VERSION, StateFormatError
+from shibboleth import GameInitializationError, Shibboleth
+from word_history import WordHistory
 
 
 class RoomError(Exception):
 	pass
 
+def team_guess_size_for(num_players, max_guess):
+	""" Returns the size of partial team guesses for a game of this many players, or None if players guess their whole team. """
+	if num_players <= 2 * max_guess:
+		return None
+	else:
+		return max_guess
+
 class Room:
+	__slots__ = (
+		"room_name", "playing_role", "channel", "room_players", "queued_joiners", "queued_leavers", "round_num",
+		"num_words", "max_guess", "veto_duration", "skew_chance", "word_history", "game", "paused",
+		"prepared_game", "prepared_game_settings", "preparation_scheduled", "render_cache", "timers",
+		"pinned_word_list_id", "restored_veto_deadline", "paused_veto_time_left",
+	)
+
 	def __init__(self, room_name, playing_role, channel):
 		self.room_name = room_name
 		self.playing_role = playing_role
 		self.channel = channel
 
-		self.room_players = []
-		self.queued_joiners = []
-		self.queued_leavers = []
+		self.room_players = Roster()
+		self.queued_joiners = Roster()
+		self.queued_leavers = Roster()
 
 		self.round_num = 1
 
@@ -21,34 +44,223 @@ class Room:
 		self.max_guess = 3
 		self.veto_duration = 45
 		self.skew_chance = 0.0
+		self.word_history = WordHistory(5)
 
 		self.game = None
 		self.paused = False
 
+		# The next round's game, made ahead of time along with the settings it was made for
+		self.prepared_game = None
+		self.prepared_game_settings = None
+		self.preparation_scheduled = False
+
+		self.render_cache = RenderCache()
+
+		# Name -> pending Timer for this round, like the veto deadline
+		self.timers = {}
+
+		# ID of the word list message the bot last pinned here, if known
+		self.pinned_word_list_id = None
+
+		# Wall-clock time a restored round's veto phase ends, until its deadline timer is scheduled again
+		self.restored_veto_deadline = None
+
+		# Seconds that were left in the veto phase when the round was paused, until it's unpaused
+		self.paused_veto_time_left = None
+
 	def __repr__(self):
 		return self.status_string
 
+	@property
+	def guild_id(self):
+		return self.channel.guild.id if (self.channel is not None) else None
+
+	@property
+	def recent_rounds(self):
+		""" Number of recent rounds whose words are kept off the word list """
+		return self.word_history.num_rounds
+
+	@recent_rounds.setter
+	def recent_rounds(self, num_rounds):
+		self.word_history.set_num_rounds(num_rounds)
+
+	@property
+	def options(self):
+		return (self.num_words, self.max_guess, self.veto_duration, self.skew_chance, self.recent_rounds)
+
+	@property
+	def is_idle(self):
+		""" Whether the room has nothing going on besides its options: no round, players or queued joiners or leavers. """
+		return not (self.in_round or self.room_players or self.queued_joiners or self.queued_leavers)
+
+	def to_state(self):
+		""" Returns the room's options, roster and any ongoing game as plain data for serialization, with members as user IDs. """
+		return {
+			"version": STATE_FORMAT_VERSION,
+			"round_num": self.round_num,
+			"num_words": self.num_words,
+			"max_guess": self.max_guess,
+			"veto_duration": self.veto_duration,
+			"skew_chance": self.skew_chance,
+			"recent_rounds": self.recent_rounds,
+			"paused": self.paused,
+			"players": [member.id for member in self.room_players],
+			"queued_joiners": [member.id for member in self.queued_joiners],
+			"queued_leavers": [member.id for member in self.queued_leavers],
+			"game": self.game.to_state() if self.in_round else None,
+			"pinned_word_list_id": self.pinned_word_list_id,
+			"veto_deadline": self.veto_deadline,
+			"paused_veto_time_left": self.paused_veto_time_left,
+		}
+
+	@property
+	def veto_deadline(self):
+		""" Wall-clock time the ongoing veto phase ends, or None if there's no veto phase with a deadline. """
+		timer = self.timers.get("veto deadline")
+		if (timer is not None) and timer.pending:
+			return time.time() + timer.remaining()
+		return self.restored_veto_deadline
+
+	def restore_state(self, state, get_member):
+		"""
+		Loads to_state() data into this room, looking up members by user ID with get_member, which returns None for anyone who can't be found.
+		Members who can't be found are dropped, and so is the game if any of its players are gone.
+		"""
+		if (not isinstance(state, dict)) or (state.get("version") != STATE_FORMAT_VERSION):
+			raise StateFormatError(f"Unsupported room state version {state.get('version') if isinstance(state, dict) else None}")
+
+		def get_members(member_ids):
+			members = (get_member(member_id) for member_id in member_ids)
+			return [member for member in members if member is not None]
+
+		# Read everything before changing the room, so a malformed state leaves it as it was.
+		try:
+			options = (state["round_num"], state["num_words"], state["max_guess"], state["veto_duration"], state["skew_chance"], state["recent_rounds"])
+			players = Roster(get_members(state["players"]))
+			queued_joiners = Roster(get_members(state["queued_joiners"]))
+			queued_leavers = Roster(get_members(state["queued_leavers"]))
+			game = None
+			paused = False
+			veto_deadline = None
+			paused_veto_time_left = None
+			if state["game"] is not None:
+				try:
+					game = Shibboleth.from_state(state["game"], get_member)
+					paused = bool(state["paused"])
+				except GameInitializationError:
+					pass
+
+			# Timers don't survive a restart, so the veto deadline has to be scheduled again, with take_restored_veto_deadline
+			# or take_paused_veto_time_left when the round is unpaused. States saved before these were kept resolve the veto right away.
+			if (game is not None) and game.in_veto_phase:
+				if paused:
+					paused_veto_time_left = float(state.get("paused_veto_time_left") or 0.0)
+				else:
+					veto_deadline = state.get("veto_deadline")
+					veto_deadline = float(veto_deadline) if (veto_deadline is not None) else time.time()
+		except (KeyError, IndexError, TypeError, ValueError, AttributeError) as e:
+			raise StateFormatError(f"Malformed room state: {e!r}")
+
+		(self.round_num, self.num_words, self.max_guess, self.veto_duration, self.skew_chance, self.recent_rounds) = options
+		# Missing from states saved before pins were tracked
+		self.pinned_word_list_id = state.get("pinned_word_list_id")
+
+		previous_members = list(self.room_players) + list(self.queued_joiners)
+		self.room_players = players
+		self.queued_joiners = queued_joiners
+		self.queued_leavers = queued_leavers
+		for member in previous_members + list(self.room_players) + list(self.queued_joiners):
+			PlayerIndex.get().update(self, member)
+
+		self.cancel_timers()
+		self.game = game
+		self.paused = paused
+		self.restored_veto_deadline = veto_deadline
+		self.paused_veto_time_left = paused_veto_time_left
+
+	def take_paused_veto_time_left(self):
+		""" Returns seconds that were left in the veto phase when the round was paused, or None if there's no deadline to schedule again. """
+		time_left = self.paused_veto_time_left
+		self.paused_veto_time_left = None
+		return time_left
+
+	def take_restored_veto_deadline(self):
+		""" Returns seconds left in a restored round's veto phase, at least 0, or None if there's no deadline to schedule again. """
+		deadline = self.restored_veto_deadline
+		if deadline is None:
+			return None
+		self.restored_veto_deadline = None
+		return max(deadline - time.time(), 0.0)
+
 	def make_game(self):
 		include_veto_phase = self.veto_duration > 0
 		num_players = len(self.room_players)
-		if num_players <= 2 * self.max_guess:
-			team_guess_size = None
-		else:
-			team_guess_size = self.max_guess
+		team_guess_size = team_guess_size_for(num_players, self.max_guess)
 
 		if self.num_words == 0:
 			num_words = min(max(2 * num_players, 10), 14) 
 		else:
 			num_words = self.num_words
 
-		return Shibboleth(self.room_players, num_words, include_veto_phase=include_veto_phase, team_guess_size=team_guess_size, skew_chance=self.skew_chance)
+		word_history = self.word_history if (self.recent_rounds > 0) else None
+		return Shibboleth(list(self.room_players), num_words, include_veto_phase=include_veto_phase, team_guess_size=team_guess_size, skew_chance=self.skew_chance, word_history=word_history)
+
+	@property
+	def game_settings(self):
+		""" Everything make_game depends on, to tell whether a prepared game is still valid. """
+		return (tuple(self.room_players), self.num_words, self.max_guess, self.veto_duration, self.skew_chance, self.recent_rounds)
+
+	def prepare_next_round(self):
+		""" Makes the next round's game ahead of time, including rendering its word list, so starting the round only has to commit it. """
+		self.preparation_scheduled = False
+		if self.in_round:
+			return
+
+		settings = self.game_settings
+		if (self.prepared_game is not None) and (self.prepared_game_settings == settings):
+			return
+
+		self.discard_prepared_game()
+		try:
+			game = self.make_game()
+		except GameInitializationError:
+			# Let start_round hit the error again and report it.
+			return
+
+		# Render the word list now rather than when the round starts.
+		_ = game.word_list_code_block
+
+		self.prepared_game = game
+		self.prepared_game_settings = settings
+
+	def schedule_next_round_preparation(self):
+		""" Prepares the next round soon, once the current command has yielded to the event loop. """
+		if not self.preparation_scheduled:
+			self.preparation_scheduled = True
+			asyncio.get_running_loop().call_soon(self.prepare_next_round)
+
+	def discard_prepared_game(self):
+		self.prepared_game = None
+		self.prepared_game_settings = None
+
+	def take_prepared_game(self):
+		""" Returns the prepared game if it matches the current settings, or a newly made one otherwise. """
+		game = self.prepared_game
+		if (game is None) or (self.prepared_game_settings != self.game_settings):
+			game = self.make_game()
+
+		self.discard_prepared_game()
+		return game
 
 	def start_round(self):
 		if self.in_round:
 			raise RoomError("Round already started.")
-		self.game = self.make_game()
+		self.game = self.take_prepared_game()
 		self.paused = False
 
+		if self.game.word_indices is not None:
+			self.word_history.record(self.game.corpus, self.game.word_indices)
+
 	@property
 	def in_round(self):
 		return self.game is not None
@@ -56,63 +268,115 @@ class Room:
 	def end_round(self):
 		if not self.in_round:
 			raise RoomError("No round ongoing")
+		self.cancel_timers()
+		self.restored_veto_deadline = None
+		self.paused_veto_time_left = None
 		self.game = None
 		self.paused = False
 		self.round_num += 1
 
+	def set_timer(self, name, delay, callback):
+		""" Schedules callback in delay seconds, replacing any timer of the same name. Timers are cancelled when the round ends. """
+		self.cancel_timer(name)
+		self.timers[name] = Scheduler.get().schedule(delay, callback, name=f"{self.room_name}: {name}")
+
+	def cancel_timer(self, name):
+		timer = self.timers.pop(name, None)
+		if timer is not None:
+			Scheduler.get().cancel(timer)
+
+	def cancel_timers(self):
+		for timer in self.timers.values():
+			Scheduler.get().cancel(timer)
+		self.timers.clear()
+
 	def add_player(self, player):
 		if self.in_round:
 			raise RoomError("Can't add player while round is ongoing.")
-		if player not in self.room_players:
-			self.room_players.append(player)
+		if self.room_players.add(player):
 			self.remove_member_from_joiner_queue(player)
+			self.discard_prepared_game()
+			PlayerIndex.get().update(self, player)
+
+	def add_players(self, players):
+		for player in players:
+			self.add_player(player)
 
 	def remove_player(self, player):
 		if self.in_round:
 			raise RoomError("Can't remove player while round is ongoing.")
-		if player in self.room_players:
-			self.room_players.remove(player)
+		if self.room_players.discard(player):
 			self.remove_member_from_leaver_queue(player)
+			self.discard_prepared_game()
+			PlayerIndex.get().update(self, player)
+
+	def remove_players(self, players):
+		for player in players:
+			self.remove_player(player)
 
 	def remove_all_players(self):
 		if self.in_round:
 			raise RoomError("Can't remove players while round is ongoing.")
-		self.room_players = []
+		previous_players = list(self.room_players)
+		self.room_players.clear()
+		self.discard_prepared_game()
+		for player in previous_players:
+			PlayerIndex.get().update(self, player)
 
 	def add_member_to_joiner_queue(self, member):
-		if (member not in self.queued_joiners) and (member not in self.room_players):
-			self.queued_joiners.append(member)
+		if (member not in self.room_players) and self.queued_joiners.add(member):
+			PlayerIndex.get().update(self, member)
 
 	def remove_member_from_joiner_queue(self, member):
-		if member in self.queued_joiners:
-			self.queued_joiners.remove(member)
+		if self.queued_joiners.discard(member):
+			PlayerIndex.get().update(self, member)
 
 	def add_member_to_leaver_queue(self, member):
-		if (member not in self.queued_leavers) and (member not in self.queued_leavers):
-			self.queued_leavers.append(member)
+		self.queued_leavers.add(member)
 
 	def remove_member_from_leaver_queue(self, member):
-		if member in self.queued_leavers:
-			self.queued_leavers.remove(member)
+		self.queued_leavers.discard(member)
 
-	def sync_players(self):
+	def sync_players(self, role_members):
+		""" Makes the players everyone with the playing role who can see the channel, given the members with the playing role. """
 		self.remove_all_players()
 
 		if self.playing_role is None:
 			return
 
-		# Enumerating the users in the channel with the playing roles requires the members intent
-		for member in self.channel.members:
-			if self.playing_role in member.roles:
-				self.add_player(member)
+		self.add_players(member for member in role_members if self.channel.permissions_for(member).read_messages)
+
+	def names_changed(self):
+		""" Called when someone in the room changes their display name, so cached strings with names are rendered again. """
+		self.render_cache.names_changed()
+		for game in (self.game, self.prepared_game):
+			if game is not None:
+				game.render_cache.names_changed()
 
 	@property
 	def player_name_string(self):
-		player_names = names_string(self.room_players)
-		return f"Players in room ({len(self.room_players)}): {player_names}"
+		key = (self.room_players.version, self.render_cache.names_version)
+		return self.render_cache.get("player names", key, lambda: f"Players in room ({len(self.room_players)}): {names_string(self.room_players)}")
+
+	@property
+	def formatted_player_names(self):
+		key = (self.room_players.version, self.render_cache.names_version)
+		return self.render_cache.get("formatted player names", key, lambda: names_string_formatted(self.room_players))
+
+	@property
+	def queued_joiner_names(self):
+		key = (self.queued_joiners.version, self.render_cache.names_version)
+		return self.render_cache.get("queued joiner names", key, lambda: names_string(self.queued_joiners))
 
 	@property
 	def status_string(self):
+		# Each fragment is cached separately too, so a change to one field only re-renders that field's fragment.
+		playing_role_name = self.playing_role.name if self.playing_role else "None"
+		game_key = (self.game, self.game.phase) if self.in_round else None
+		key = (self.room_name, playing_role_name, self.round_num, self.room_players.version, self.queued_joiners.version, self.render_cache.names_version, game_key, self.paused)
+		return self.render_cache.get("status", key, self.render_status_string)
+
+	def render_status_string(self):
 		info_strings = []
 
 		info_strings.append(f"Room: {self.room_name}")
@@ -121,8 +385,7 @@ class Room:
 		info_strings.append(f"Round {self.round_num}")
 		info_strings.append(self.player_name_string)
 		if bool(self.queued_joiners):
-			queued_joiner_names = names_string(self.queued_joiners)
-			info_strings.append(f"Joining next round: {queued_joiner_names}")
+			info_strings.append(f"Joining next round: {self.queued_joiner_names}")
 
 		if self.in_round:
 			info_strings.extend(self.game.info_strings)
@@ -134,6 +397,14 @@ class Room:
 			raise RoomError("Already paused.")
 		self.paused = True
 
+		# The veto deadline waits out the pause, picking up with take_paused_veto_time_left once unpaused.
+		veto_deadline = self.veto_deadline
+		if veto_deadline is not None:
+			self.paused_veto_time_left = max(veto_deadline - time.time(), 0.0)
+			self.restored_veto_deadline = None
+			self.cancel_timer("veto warning")
+			self.cancel_timer("veto deadline")
+
 	def unpause(self):
 		if not self.paused:
 			raise RoomError("Already unpaused.")
@@ -0,0 +1,114 @@
+import os
+import sqlite3
+import time
+
+from batch_writer import BatchWriter
+from serialization import state_from_json, state_to_json
+from util import Singleton
+
+
+@Singleton
+class RoomStore:
+	"""
+	Journals room state to a SQLite database so rooms survive a restart.
+	Snapshots are taken on the event loop, which only takes microseconds, and written in batches by a background thread,
+	so commands never wait on disk. Saved rooms are loaded once at startup and handed out as their rooms are created.
+	"""
+	def __init__(self):
+		self.path = None
+		self.saved_states = {}
+
+		# Queues channel id -> (guild id, state JSON), or None to delete. Only the latest change per channel is kept.
+		self.writer = None
+		# Only used on the writer thread
+		self.connection = None
+
+	@property
+	def is_open(self):
+		return self.writer is not None
+
+	def open(self, path, flush_interval=1.0, shard_id=None, shard_count=None):
+		"""
+		Opens the database and loads the saved rooms. When sharded, only rooms in guilds on this shard are loaded,
+		so each shard's process restores just the rooms it will serve while all of them share one database.
+		"""
+		self.path = path
+
+		directory = os.path.dirname(path)
+		if directory:
+			os.makedirs(directory, exist_ok=True)
+
+		connection = self.connect()
+		try:
+			connection.execute("CREATE TABLE IF NOT EXISTS rooms (channel_id INTEGER PRIMARY KEY, guild_id INTEGER NOT NULL, state TEXT NOT NULL, updated_at REAL NOT NULL)")
+			connection.commit()
+			if shard_count is None:
+				rows = connection.execute("SELECT channel_id, state FROM rooms")
+			else:
+				# Same as sharding.shard_for_guild
+				rows = connection.execute("SELECT channel_id, state FROM rooms WHERE (guild_id >> 22) % ? = ?", (shard_count, shard_id))
+			self.saved_states = dict(rows)
+		finally:
+			connection.close()
+
+		self.writer = BatchWriter("RoomStore", self.write_batch, flush_interval=flush_interval, on_stop=self.close_connection)
+		self.writer.start()
+
+	def connect(self):
+		# Shards write to the same database, so wait out each other's locks rather than failing.
+		connection = sqlite3.connect(self.path, timeout=30.0)
+		connection.execute("PRAGMA journal_mode=WAL")
+		connection.execute("PRAGMA synchronous=NORMAL")
+		return connection
+
+	def close(self):
+		""" Writes anything pending and stops the writer thread. """
+		if not self.is_open:
+			return
+		self.writer.stop()
+		self.writer = None
+
+	def record(self, room):
+		""" Queues a snapshot of the room to be written. Does nothing if the store isn't open. """
+		if not self.is_open:
+			return
+		channel = room.channel
+		self.writer.add((channel.guild.id, state_to_json(room.to_state())), key=channel.id)
+
+	def forget(self, channel_id):
+		""" Queues deleting a room's saved state. """
+		self.saved_states.pop(channel_id, None)
+		if not self.is_open:
+			return
+		self.writer.add(None, key=channel_id)
+
+	def take_saved_state(self, channel_id):
+		""" Returns the state saved for this channel when the store was opened, or None. Each state is only handed out once. """
+		data = self.saved_states.pop(channel_id, None)
+		if data is None:
+			return None
+		return state_from_json(data)
+
+	def write_batch(self, pending):
+		# Opened here rather than in open, since SQLite connections belong to the thread that made them.
+		if self.connection is None:
+			self.connection = self.connect()
+
+		now = time.time()
+		upserts = []
+		deletes = []
+		for (channel_id, entry) in pending.items():
+			if entry is None:
+				deletes.append((channel_id,))
+			else:
+				guild_id, data = entry
+				upserts.append((channel_id, guild_id, data, now))
+
+		with self.connection:
+			self.connection.executemany("INSERT OR REPLACE INTO rooms (channel_id, guild_id, state, updated_at) VALUES (?, ?, ?, ?)", upserts)
+			self.connection.executemany("DELETE FROM rooms WHERE channel_id = ?", deletes)
+
+	def close_connection(self):
+		if self.connection is not None:
+			self.connection.close()
+			self.connection = None
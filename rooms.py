@@ -1,10 +1,20 @@
-import discord
-import re
+import time
+from collections import OrderedDict
 
 import config
+from player_index import PlayerIndex
+from role_cache import playing_role_name, RoleCache
 from room import Room
+from room_store import RoomStore
+from serialization import state_from_bytes, state_to_bytes, StateFormatError
 from util import Singleton
 
+from sys import stderr
+
+
+# Options of a room nobody has changed anything in, which don't need to be kept when it's evicted
+DEFAULT_OPTIONS = Room(None, None, None).options
+
 
 class MissingChannelError(Exception):
 	pass
@@ -12,7 +22,16 @@ class MissingChannelError(Exception):
 @Singleton
 class Rooms:
 	def __init__(self):
-		self.rooms = {}
+		# Channel id -> room, least recently used first, and when each was last used
+		self.rooms = OrderedDict()
+		self.last_used = {}
+
+		# Channel id -> serialized options of rooms evicted for being idle, least recently evicted first
+		self.idle_rooms = OrderedDict()
+
+		# Guild id -> playing role id -> member id -> member, for recovering players after a restart.
+		# Built with one pass over a guild's members when its first room is made, then kept up to date as roles change.
+		self.playing_members = {}
 
 	def get_channel(self, channel):
 		return self.rooms[channel.id]
@@ -21,6 +40,8 @@ class Rooms:
 		if channel.id not in self.rooms:
 			self.add_channel(channel)
 
+		self.rooms.move_to_end(channel.id)
+		self.last_used[channel.id] = time.monotonic()
 		return self.get_channel(channel)
 
 	def add_channel(self, channel):
@@ -28,32 +49,126 @@ class Rooms:
 			print(f"\tInitializing {channel} in {channel.guild}")
 			room = Room(channel.name, playing_role_in_channel(channel), channel)
 			self.rooms[channel.id] = room
-			room.sync_players()
+			self.last_used[channel.id] = time.monotonic()
+
+			# An evicted room only had options to keep.
+			idle_state = self.idle_rooms.pop(channel.id, None)
+			if idle_state is not None:
+				room.restore_state(state_from_bytes(idle_state), channel.guild.get_member)
+				return
+
+			# Pick up where the room left off before a restart if it was saved, and otherwise recover players from the playing role.
+			try:
+				saved_state = RoomStore.get().take_saved_state(channel.id)
+				if saved_state is not None:
+					room.restore_state(saved_state, channel.guild.get_member)
+					return
+			except StateFormatError as e:
+				print(f"\tDiscarding saved state for {channel} in {channel.guild}: {e}", file=stderr)
+
+			room.sync_players(self.members_with_playing_role(room.playing_role))
 
 	def remove_channel(self, channel):
 		if channel.id in self.rooms:
 			print(f"\tRemoving {channel} in {channel.guild}")
-			del self.rooms[channel.id]
+			PlayerIndex.get().remove_room(self.rooms.pop(channel.id))
+			del self.last_used[channel.id]
+		self.idle_rooms.pop(channel.id, None)
+		RoomStore.get().forget(channel.id)
+
+	def evict_idle_rooms(self, now=None):
+		"""
+		Evicts rooms that have been idle for config.idle_room_timeout seconds, keeping only their options, if they aren't the defaults.
+		They're made again from those options next time their channel is used. Returns the number of rooms evicted.
+		"""
+		if now is None:
+			now = time.monotonic()
+
+		num_evicted = 0
+		while self.rooms:
+			channel_id, room = next(iter(self.rooms.items()))
+			if now - self.last_used[channel_id] < config.idle_room_timeout:
+				break
+
+			if not room.is_idle:
+				# Players are still waiting on something here, so check again later.
+				self.rooms.move_to_end(channel_id)
+				self.last_used[channel_id] = now
+				continue
+
+			del self.rooms[channel_id]
+			del self.last_used[channel_id]
+			if room.options != DEFAULT_OPTIONS:
+				self.idle_rooms[channel_id] = state_to_bytes(room.to_state())
+			num_evicted += 1
+
+		while len(self.idle_rooms) > config.max_idle_rooms:
+			self.idle_rooms.popitem(last=False)
+
+		return num_evicted
+
+	def index_guild(self, guild):
+		""" Indexes the members of every playing role in the guild in a single pass over its members. """
+		playing_role_ids = set()
+		for channel in guild.text_channels:
+			role = playing_role_in_channel(channel)
+			if role is not None:
+				playing_role_ids.add(role.id)
+
+		index = {role_id: {} for role_id in playing_role_ids}
+		# Enumerating the guild's members requires the members intent
+		for member in guild.members:
+			for role in member.roles:
+				if role.id in index:
+					index[role.id][member.id] = member
+
+		self.playing_members[guild.id] = index
+		return index
+
+	def members_with_playing_role(self, role):
+		if role is None:
+			return []
+
+		index = self.playing_members.get(role.guild.id)
+		if index is None:
+			index = self.index_guild(role.guild)
+
+		members = index.get(role.id)
+		if members is None:
+			# A role made after the guild was indexed, so start tracking it.
+			members = {member.id: member for member in role.members}
+			index[role.id] = members
+
+		return list(members.values())
+
+	def member_roles_changed(self, before, after):
+		index = self.playing_members.get(after.guild.id)
+		if index is None:
+			return
+
+		before_role_ids = {role.id for role in before.roles}
+		after_role_ids = {role.id for role in after.roles}
+		for role_id in before_role_ids - after_role_ids:
+			if role_id in index:
+				index[role_id].pop(after.id, None)
+		for role_id in after_role_ids - before_role_ids:
+			if role_id in index:
+				index[role_id][after.id] = after
+
+	def member_removed(self, member):
+		index = self.playing_members.get(member.guild.id)
+		if index is None:
+			return
+
+		for members in index.values():
+			members.pop(member.id, None)
 
 def here(ctx):
 	return Rooms.get().get_channel_adding_if_missing(ctx.channel)
 
 def playing_role_in_channel(channel):
 	""" Returns the role for players in the given channel. May return None if no role is configured on the server or for this bot instance. """
-	channel_name = channel.name
-
-	# To extend the map like "shibboleth-game2" -> "Playing2", chop off a  numerical suffix.
-	channel_name_split = re.match(r"(?P<prefix>[^0-9]*)(?P<suffix>.*)$", channel_name)
-
-	channel_name_prefix = channel_name_split.group('prefix')
-	suffix = channel_name_split.group('suffix')
-
-	role_prefix = config.playing_roles_in_channels.get(channel_name_prefix, config.misc_playing_role)
-	role_name = role_prefix + suffix
-
-	role = discord.utils.get(channel.guild.roles, name=role_name) if role_name else None
-
-	return role
+	return RoleCache.get().get_role(channel.guild, playing_role_name(channel.name))
 
 def link_to_channel(channel):
 	return f"<https://discord.com/channels/{channel.guild.id}/{channel.id}>"
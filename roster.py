@@ -0,0 +1,61 @@
+from itertools import count
+
+# Shared by all rosters so that a version number identifies one state of one roster.
+roster_versions = count()
+
+
+class Roster:
+	"""
+	An insertion-ordered set of members keyed by user ID, for constant-time membership checks, additions and removals.
+	Iterating gives members in the order they were added. The version changes whenever the members do.
+	"""
+	__slots__ = ("members_by_id", "version")
+
+	def __init__(self, members=()):
+		self.members_by_id = {}
+		self.version = next(roster_versions)
+		self.add_all(members)
+
+	def add(self, member):
+		""" Adds the member at the end if not already present. Returns whether they were added. """
+		if member.id in self.members_by_id:
+			return False
+		self.members_by_id[member.id] = member
+		self.version = next(roster_versions)
+		return True
+
+	def discard(self, member):
+		""" Removes the member if present. Returns whether they were removed. """
+		if self.members_by_id.pop(member.id, None) is None:
+			return False
+		self.version = next(roster_versions)
+		return True
+
+	def add_all(self, members):
+		for member in members:
+			self.add(member)
+
+	def discard_all(self, members):
+		for member in members:
+			self.discard(member)
+
+	def clear(self):
+		self.members_by_id.clear()
+		self.version = next(roster_versions)
+
+	def __contains__(self, member):
+		return member.id in self.members_by_id
+
+	def __iter__(self):
+		return iter(self.members_by_id.values())
+
+	def __len__(self):
+		return len(self.members_by_id)
+
+	def __eq__(self, other):
+		if not isinstance(other, Roster):
+			return NotImplemented
+		return list(self.members_by_id.items()) == list(other.members_by_id.items())
+
+	def __repr__(self):
+		return f"Roster({list(self)})"
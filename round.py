@@ -1,67 +1,79 @@
-import asyncio
+import time
 
 import discord
 from discord.ext import commands
 
 from check import no_dm_predicate, during_round, by_player
+from dm_dispatcher import DMDispatcher
+from event_log import EventLog
+import mailbox
+from metrics import Metrics
 from name_utils import names_list_string, names_string
+from outbox import post, send
+from pin_manager import PinManager
+from room_store import RoomStore
 from rooms import here
+from word_lookup import did_you_mean_string
 
 
 class Round(commands.Cog):
 	def __init__(self, bot):
 		self.bot = bot
+		self.dm_dispatcher = DMDispatcher()
+		self.pin_manager = PinManager(bot)
 
 	def cog_check(self, ctx):
 		return no_dm_predicate(ctx)
 
+	def log_event(self, ctx, event_type, players=(), **fields):
+		""" Records a round event in the event log, tagged with the room and round number. """
+		EventLog.get().record(event_type, ctx.channel.id, [player.id for player in players], round=here(ctx).round_num, **fields)
+
 	async def start_round(self, ctx):
-		here(ctx).start_round()
+		start_time = time.monotonic()
+		room = here(ctx)
+		room.start_round()
+
+		game = room.game
+		teams = {word: [player.id for player in team] for (word, team) in game.teams.items()}
+		self.log_event(ctx, "start", game.players, words=list(game.words), teams=teams)
 
 		await self.display_round_intro(ctx)
 		await self.display_and_pin_wordlist(ctx)
+		await self.message_secret_words(ctx)
 
-		for player in here(ctx).game.players:
-			await self.message_player_secret_word(ctx, player)
+		Metrics.get().record_time("!start to last secret word DM", time.monotonic() - start_time)
 
 	async def display_round_intro(self, ctx):
 		room = here(ctx)
 		assert room.in_round, "Can't display intro with no round ongoing."
 
-		await ctx.send(f"__Round {room.round_num}__")
+		post(ctx.channel, f"__Round {room.round_num}__")
 		await self.bot.get_cog("Status").players(ctx)
 
 		start_message = "You've been messaged your secret word -- to see it, click the Home icon in the very top left. Use `!howguess` to show the commands to guess. Clue away!"
-		await ctx.send(start_message)
+		post(ctx.channel, start_message)
 
 	def wordlist_formatted_string(self, ctx):
-		return f"```{here(ctx).game.word_list_string_columns()}```"
-
-	async def reset_pins(self, ctx):
-		pinned_messages = await ctx.channel.pins()
-
-		# Remove all pinned messages that we're the author of
-		for pinned_message in pinned_messages:
-			if pinned_message.author == self.bot.user:
-				try:
-					await pinned_message.unpin()
-				except discord.errors.Forbidden:
-					pass
+		return here(ctx).game.word_list_code_block
 
 	async def display_and_pin_wordlist(self, ctx):
-		await self.reset_pins(ctx)
-		msg = await ctx.send(self.wordlist_formatted_string(ctx))
-
-		# Pin the message, but if we can't due to not having permissions, don't do anything.
-		try:
-			await msg.pin()
-		except discord.errors.Forbidden:
-			pass
+		msg = await send(ctx.channel, self.wordlist_formatted_string(ctx))
+		await self.pin_manager.pin_word_list(here(ctx), msg)
 
-	async def message_player_secret_word(self, ctx, player):
+	def secret_word_message(self, ctx, player):
 		secret_word = here(ctx).game.get_secret_word(player)
+		return f"Round {here(ctx).round_num}: Your secret word is **{secret_word}** (back to {ctx.channel.mention})"
+
+	async def message_secret_words(self, ctx):
+		# Message everyone at once, so nobody gets a head start from getting their word first.
+		messages = [(player, self.secret_word_message(ctx, player)) for player in here(ctx).game.players]
+		(closed, failed) = await self.dm_dispatcher.send_all(messages)
 
-		await player.send(f"Round {here(ctx).round_num}: Your secret word is **{secret_word}** (back to {ctx.channel.mention})")
+		if closed:
+			post(ctx.channel, f"Couldn't message {names_string(closed)} their secret word because they don't allow direct messages from server members. They can allow them in this server's Privacy Settings, then `!abandon` and `!start` again.")
+		if failed:
+			post(ctx.channel, f"Failed to message {names_string(failed)} their secret word because of a Discord error. You may need to `!abandon` and `!start` again.")
 
 	@commands.command(
 		brief="Guess the opposing team's word",
@@ -76,19 +88,23 @@ class Round(commands.Cog):
 		room = here(ctx)
 		game = room.game
 
-		if word not in game.words:
-			raise commands.CheckFailure(f"`{word}` not in word list. Check spelling and capitalization. You can edit your message or enter a new one.")
+		resolved_word = game.resolve_word(word)
+		if resolved_word is None:
+			did_you_mean = did_you_mean_string(game.word_suggestions(word))
+			raise commands.CheckFailure(f"`{word}` not in word list.{did_you_mean} You can edit your message or enter a new one.")
+		word = resolved_word
 
 		correct = room.resolve_word_guess(guesser, word)
+		self.log_event(ctx, "word guess", [guesser], guesser=guesser.id, word=word, correct=correct, overrode_veto=game.in_veto_phase)
 		correct_string = {True: "right", False: "wrong"}[correct]
-		await ctx.send(f"**{guesser.display_name}** (team **{game.get_secret_word(guesser)}**) guessed **{word}** for the opposing word, which is __{correct_string}__. Winning team: **{game.winning_word}**")
+		post(ctx.channel, f"**{guesser.display_name}** (team **{game.get_secret_word(guesser)}**) guessed **{word}** for the opposing word, which is __{correct_string}__. Winning team: **{game.winning_word}**")
 
 		# If this overrode a veto, say whether it would have succeeded
 		if game.in_veto_phase:
 			orig_guesser, orig_guessed_players = game.vetoable_team_guess
 			correctness_message = self.team_guess_correctness_message(ctx, orig_guesser, orig_guessed_players, is_hypothetical=True)
 
-			await ctx.send(correctness_message)
+			post(ctx.channel, correctness_message)
 
 		await self.reveal_teams(ctx)
 		await self.end_round_and_clean_up(ctx)
@@ -105,7 +121,7 @@ class Round(commands.Cog):
 		guessed_players = list(guessed_players)
 
 		guesser = ctx.author
-		players_set = set(here(ctx).game.players)
+		players_set = here(ctx).game.player_set
 
 		if not set(guessed_players) <= players_set:
 			extra_players = list(set(guessed_players) - players_set)
@@ -123,18 +139,18 @@ class Round(commands.Cog):
 	def team_guess_correctness_message(self, ctx, guesser, guessed_players, is_hypothetical=False):
 		game = here(ctx).game
 		guesser_word = game.get_secret_word(guesser)
-		correct_team = game.players_with_word(guesser_word)
+		correct_team_set = game.team_set_of(guesser)
 
 		def player_name_formatted_by_correctness(player):
 
-			if player in correct_team:
+			if player in correct_team_set:
 				# Bold
 				return f"**{player.display_name}**"
 			else:
 				# Bold italics
 				return f"***{player.display_name}***"
 
-		missing_players = set(correct_team) - set(guessed_players)
+		missing_players = correct_team_set - set(guessed_players)
 		if bool(missing_players):
 			must_guess_exact = game.team_guess_size is None
 			if must_guess_exact:
@@ -162,51 +178,75 @@ class Round(commands.Cog):
 		room = here(ctx)
 		game = room.game
 
-		room.resolve_team_guess(guesser, guessed_players, veto_timeout_override=veto_timeout_override)
+		correct = room.resolve_team_guess(guesser, guessed_players, veto_timeout_override=veto_timeout_override)
 
 		if (not game.include_veto_phase) or veto_timeout_override:
 			# Full resolve
+			if not veto_timeout_override:
+				self.log_event(ctx, "team guess", guessed_players, guesser=guesser.id, guessed=[player.id for player in guessed_players], correct=correct)
 
 			correctness_message = self.team_guess_correctness_message(ctx, guesser, guessed_players)
 
-			await ctx.send(correctness_message)
+			post(ctx.channel, correctness_message)
 			await self.reveal_teams(ctx)
 			await self.end_round_and_clean_up(ctx)
 
 		else:
 			# Enter veto phase
+			self.log_event(ctx, "veto", guessed_players, guesser=guesser.id, guessed=[player.id for player in guessed_players], correct=correct, duration=room.veto_duration)
 			guessed_players_string = names_list_string(guessed_players)
-			await ctx.send(f"**{guesser.display_name}** guessed {guessed_players_string} for their team. Entering veto phase.")
+			post(ctx.channel, f"**{guesser.display_name}** guessed {guessed_players_string} for their team. Entering veto phase.")
 			await self.enter_veto_phase(ctx)
 
 	async def enter_veto_phase(self, ctx):
-		assert here(ctx).game.include_veto_phase
-
-		veto_time = here(ctx).veto_duration
-		await ctx.send(f"You have **{veto_time} seconds** to guess a word and override this team guess, or it will resolve.")
+		room = here(ctx)
+		assert room.game.include_veto_phase
 
-		warning_time = 10
+		veto_time = room.veto_duration
+		post(ctx.channel, f"You have **{veto_time} seconds** to guess a word and override this team guess, or it will resolve.")
 
-		# The below probably be better done with `bot.wait_for`.
-		# We track if the same round is still ongoing by whether the round number hasn't changed.
+		self.schedule_veto_timers(ctx, veto_time)
 
-		initial_round_num = here(ctx).round_num
+	def schedule_veto_timers(self, ctx, veto_time):
+		room = here(ctx)
+		warning_time = 10
 
+		# Both timers are cancelled if the round ends some other way first, like a word guess or !abandon.
 		if veto_time > warning_time:
-			await asyncio.sleep(veto_time - warning_time)
-
-			if (here(ctx).game is not None) and (initial_round_num == here(ctx).round_num):
-				await ctx.send(f"**{warning_time} seconds** to guess!")
-
-		await asyncio.sleep(min(warning_time, veto_time))
-		if (here(ctx).game is not None) and (initial_round_num == here(ctx).round_num):
+			room.set_timer("veto warning", veto_time - warning_time, lambda: self.warn_veto_ending(ctx, warning_time))
+		# Resolving the guess changes the room, so it waits its turn behind any commands already queued.
+		round_num = room.round_num
+		room.set_timer("veto deadline", veto_time, lambda: mailbox.run_serially(ctx.channel.id, lambda: self.veto_timed_out(ctx, round_num)))
+
+	def resume_restored_veto(self, ctx):
+		""" Schedules the veto deadline again for a round restored mid-veto after a restart, resolving it soon if it has passed. """
+		veto_time_left = here(ctx).take_restored_veto_deadline()
+		if veto_time_left is not None:
+			self.schedule_veto_timers(ctx, veto_time_left)
+
+	async def warn_veto_ending(self, ctx, warning_time):
+		post(ctx.channel, f"**{warning_time} seconds** to guess!")
+
+	async def veto_timed_out(self, ctx, round_num):
+		# A guess queued ahead of this may have ended the veto phase already.
+		room = here(ctx)
+		if room.in_round and (room.round_num == round_num) and room.game.in_veto_phase:
+			if room.paused:
+				# Paused after the deadline passed but before this got its turn, so the guess resolves once unpaused.
+				room.paused_veto_time_left = 0.0
+				return
+			(guesser, guessed_players) = room.game.vetoable_team_guess
+			self.log_event(ctx, "veto timeout", guessed_players, guesser=guesser.id)
 			await self.end_veto_round(ctx)
 
 	async def end_veto_round(self, ctx):
-		await ctx.send("Veto phase over. Original guess goes through.")
+		post(ctx.channel, "Veto phase over. Original guess goes through.")
 		(guesser, guessed_players) = here(ctx).game.vetoable_team_guess
 		await self.guess_team_helper(ctx, guesser, guessed_players, veto_timeout_override=True)
 
+		# This doesn't run as part of a command, so nothing else saves the room.
+		RoomStore.get().record(here(ctx))
+
 	async def reveal_teams(self, ctx):
 		words = here(ctx).game.teams.keys()
 
@@ -215,13 +255,17 @@ class Round(commands.Cog):
 
 		words_with_winner_first = sorted(words, key=is_winning_word, reverse=True)
 		team_strings = [f"**{word}**: {names_string(here(ctx).game.teams[word])}" for word in words_with_winner_first]
-		await ctx.send("   ||   ".join(team_strings))
+		post(ctx.channel, "   ||   ".join(team_strings))
 
 	async def end_round_and_clean_up(self, ctx):
+		game = here(ctx).game
+		# No winner if the round was abandoned
+		self.log_event(ctx, "end", game.players, winning_word=game.winning_word)
 		here(ctx).end_round()
 		lobby_cog = self.bot.get_cog("Lobby")
 		await lobby_cog.resolve_joiner_queue(ctx)
 		await lobby_cog.resolve_leaver_queue(ctx)
+		here(ctx).schedule_next_round_preparation()
 
 	@commands.command(
 		brief="Pause the round, preventing guessing",
@@ -232,7 +276,7 @@ class Round(commands.Cog):
 	@during_round()
 	async def pause(self, ctx):
 		here(ctx).pause()
-		await ctx.send(f"{ctx.author.mention} Paused the round. Use `!unpause` to resume.")
+		post(ctx.channel, f"{ctx.author.mention} Paused the round. Use `!unpause` to resume.")
 
 	@commands.command(
 		brief="Unpause the round, allowing guessing once again",
@@ -242,8 +286,14 @@ class Round(commands.Cog):
 	)
 	@during_round()
 	async def unpause(self, ctx):
-		here(ctx).unpause()
-		await ctx.send(f"{ctx.author.mention} Resumed the round.")
+		room = here(ctx)
+		room.unpause()
+		post(ctx.channel, f"{ctx.author.mention} Resumed the round.")
+
+		veto_time_left = room.take_paused_veto_time_left()
+		if veto_time_left is not None:
+			post(ctx.channel, f"You have **{round(veto_time_left)} seconds** left to guess a word and override the team guess, or it will resolve.")
+			self.schedule_veto_timers(ctx, veto_time_left)
 
 	@commands.command(
 		brief="End the round without a result",
@@ -253,5 +303,6 @@ class Round(commands.Cog):
 	@during_round()
 	async def abandon(self, ctx):
 		message = f"Terminated Round {here(ctx).round_num}"
-		await ctx.send(message)
+		post(ctx.channel, message)
+		self.log_event(ctx, "abandon", [ctx.author], by=ctx.author.id)
 		await self.end_round_and_clean_up(ctx)
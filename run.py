@@ -1,24 +1,54 @@
 import argparse
 import config
 import discord
+import os
 
+from event_log import EventLog
 from my_bot import MyBot
+from room_store import RoomStore
+from sharding import ShardSupervisor
 
-if __name__ == "__main__":
-	print(f"Running discord.py version {discord.__version__}")
+def run_bot(config_name, shard_id=None, shard_count=None, heartbeat=None):
+	""" Runs the bot, or one shard of it. """
+	config.init(config_name)
 
-	parser = argparse.ArgumentParser(description='Run the Shibboleth Discord bot.')
-	parser.add_argument('--config', dest="config", default="shib",
-		help="yaml configuration file to use, e.g. --config=dev uses ./config/dev.yaml (default: shib)")
-	args = parser.parse_args()
+	if shard_count is not None:
+		print(f"Running shard {shard_id}/{shard_count}")
 
-	config.init(args.config)
+	if config.state_db_path is not None:
+		print(f"Opening room state database {config.state_db_path}")
+		RoomStore.get().open(config.state_db_path, shard_id=shard_id, shard_count=shard_count)
+
+	if config.event_log_directory is not None:
+		# Shards each append to their own log.
+		event_log_directory = config.event_log_directory if (shard_count is None) else os.path.join(config.event_log_directory, f"shard-{shard_id}")
+		print(f"Logging round events to {event_log_directory}")
+		EventLog.get().open(event_log_directory, segment_size=config.event_log_segment_size, max_segments=config.event_log_max_segments)
 
 	print("Making bot...")
-	bot = MyBot()
+	bot = MyBot(shard_id=shard_id, shard_count=shard_count, heartbeat=heartbeat)
 
 	# Reads the token from a file that's not committed on GitHub for security.
 	with open("config/token.txt", "r") as f:
 		token = f.readline()
 
-	bot.run(token)
\ No newline at end of file
+	try:
+		bot.run(token)
+	finally:
+		RoomStore.get().close()
+		EventLog.get().close()
+
+if __name__ == "__main__":
+	print(f"Running discord.py version {discord.__version__}")
+
+	parser = argparse.ArgumentParser(description='Run the Shibboleth Discord bot.')
+	parser.add_argument('--config', dest="config", default="shib",
+		help="yaml configuration file to use, e.g. --config=dev uses ./config/dev.yaml (default: shib)")
+	parser.add_argument('--shards', dest="shards", type=int, default=None,
+		help="run this many shards, each in its own process, restarting any that fail (default: run unsharded in this process)")
+	args = parser.parse_args()
+
+	if args.shards is None:
+		run_bot(args.config)
+	else:
+		ShardSupervisor(run_bot, (args.config,), args.shards).run()
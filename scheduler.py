@@ -0,0 +1,185 @@
+import asyncio
+import time
+import traceback
+
+from util import Singleton
+
+from sys import stderr
+
+
+class Timer:
+	""" A scheduled callback. Keeps its position in the scheduler's heap so it can be cancelled without searching for it. """
+	__slots__ = ("deadline", "sequence", "callback", "name", "index")
+
+	def __init__(self, deadline, sequence, callback, name):
+		self.deadline = deadline
+		self.sequence = sequence
+		self.callback = callback
+		self.name = name
+		# Position in the heap, or None once it has fired or been cancelled
+		self.index = None
+
+	@property
+	def pending(self):
+		return self.index is not None
+
+	def remaining(self, now=None):
+		if now is None:
+			now = time.monotonic()
+		return max(self.deadline - now, 0.0)
+
+	def __lt__(self, other):
+		# Timers with the same deadline fire in the order they were scheduled.
+		return (self.deadline, self.sequence) < (other.deadline, other.sequence)
+
+	def __repr__(self):
+		return f"Timer({self.name!r}, in {self.remaining():.1f}s)"
+
+@Singleton
+class Scheduler:
+	"""
+	Runs callbacks after a delay, using one task for every timer rather than a sleeping coroutine per timer.
+	Timers are kept in a binary heap that tracks each timer's position, so scheduling and cancelling are both O(log n).
+	Callbacks may be plain functions or coroutine functions, which are run as their own tasks.
+	"""
+	def __init__(self):
+		self.heap = []
+		self.sequence = 0
+		self.changed = None
+		self.driver = None
+
+	def schedule(self, delay, callback, name=None, now=None):
+		if now is None:
+			now = time.monotonic()
+
+		self.sequence += 1
+		timer = Timer(now + delay, self.sequence, callback, name)
+		timer.index = len(self.heap)
+		self.heap.append(timer)
+		self.sift_up(timer.index)
+
+		if self.heap[0] is timer:
+			self.wake()
+		return timer
+
+	def cancel(self, timer):
+		""" Cancels the timer if it hasn't fired yet. Returns whether it was cancelled. """
+		index = timer.index
+		if index is None:
+			return False
+
+		self.remove_at(index)
+		return True
+
+	def __len__(self):
+		return len(self.heap)
+
+	@property
+	def timers(self):
+		""" Pending timers, soonest first. """
+		return sorted(self.heap)
+
+	def pop_due(self, now):
+		""" Removes and returns the timers whose deadlines have passed, soonest first. """
+		due = []
+		while self.heap and self.heap[0].deadline <= now:
+			due.append(self.remove_at(0))
+		return due
+
+	def run_due(self, now=None):
+		if now is None:
+			now = time.monotonic()
+		for timer in self.pop_due(now):
+			self.run_callback(timer)
+
+	def run_callback(self, timer):
+		try:
+			result = timer.callback()
+			if asyncio.iscoroutine(result):
+				asyncio.get_running_loop().create_task(self.await_callback(timer, result))
+		except Exception:
+			print(f"Timer {timer.name!r} failed:", file=stderr)
+			traceback.print_exc()
+
+	async def await_callback(self, timer, coroutine):
+		try:
+			await coroutine
+		except Exception:
+			print(f"Timer {timer.name!r} failed:", file=stderr)
+			traceback.print_exc()
+
+	def wake(self):
+		""" Makes sure the driver task is running and looks at the soonest deadline again. """
+		try:
+			loop = asyncio.get_running_loop()
+		except RuntimeError:
+			# Nothing to drive timers outside an event loop, as in tests, which call run_due themselves.
+			return
+
+		if (self.driver is None) or self.driver.done():
+			self.changed = asyncio.Event()
+			self.driver = loop.create_task(self.drive())
+		self.changed.set()
+
+	async def drive(self):
+		while True:
+			self.changed.clear()
+			if not self.heap:
+				await self.changed.wait()
+				continue
+
+			delay = self.heap[0].deadline - time.monotonic()
+			if delay > 0:
+				try:
+					await asyncio.wait_for(self.changed.wait(), delay)
+				except asyncio.TimeoutError:
+					pass
+				continue
+
+			self.run_due()
+
+	def remove_at(self, index):
+		heap = self.heap
+		timer = heap[index]
+		last = heap.pop()
+		if last is not timer:
+			heap[index] = last
+			last.index = index
+			self.sift_down(index)
+			self.sift_up(last.index)
+		timer.index = None
+		return timer
+
+	def sift_up(self, index):
+		heap = self.heap
+		timer = heap[index]
+		while index > 0:
+			parent_index = (index - 1) // 2
+			parent = heap[parent_index]
+			if not (timer < parent):
+				break
+			heap[index] = parent
+			parent.index = index
+			index = parent_index
+		heap[index] = timer
+		timer.index = index
+
+	def sift_down(self, index):
+		heap = self.heap
+		timer = heap[index]
+		size = len(heap)
+		while True:
+			child_index = 2 * index + 1
+			if child_index >= size:
+				break
+			right_index = child_index + 1
+			if (right_index < size) and (heap[right_index] < heap[child_index]):
+				child_index = right_index
+			child = heap[child_index]
+			if not (child < timer):
+				break
+			heap[index] = child
+			child.index = index
+			index = child_index
+		heap[index] = timer
+		timer.index = index
@@ -0,0 +1,32 @@
+import json
+import marshal
+
+# Bump when the shape of Room.to_state() changes incompatibly.
+STATE_FORMAT_VERSION = 1
+
+
+class StateFormatError(Exception):
+	pass
+
+def state_to_json(state):
+	""" Stable text encoding of state, for anything saved to disk. """
+	return json.dumps(state, separators=(",", ":"), ensure_ascii=False)
+
+def state_from_json(text):
+	try:
+		return json.loads(text)
+	except (ValueError, TypeError) as e:
+		raise StateFormatError(f"Can't decode state: {e}")
+
+def state_to_bytes(state):
+	"""
+	Faster binary encoding of state built from dicts, lists, strings, numbers and None, for snapshots kept in memory.
+	marshal's format can change between Python versions, so never write these to disk.
+	"""
+	return marshal.dumps(state)
+
+def state_from_bytes(data):
+	try:
+		return marshal.loads(data)
+	except (EOFError, ValueError, TypeError) as e:
+		raise StateFormatError(f"Can't decode state: {e}")
@@ -1,8 +1,9 @@
-import discord
 from discord.ext import commands
 
 from check import no_dm_predicate
 import config
+from outbox import post
+from role_cache import RoleCache
 
 class Server(commands.Cog):
 	def __init__(self, bot):
@@ -13,7 +14,7 @@ class Server(commands.Cog):
 
 	def get_notify_role(self, ctx):
 		""" Returns role for players who wish to be notified of a game. May be None if one is not configured on the server or for this instance of the bot. """
-		notify_role = discord.utils.get(ctx.guild.roles, name=config.notify_role)
+		notify_role = RoleCache.get().get_role(ctx.guild, config.notify_role)
 		return notify_role
 
 	@commands.command(
@@ -25,16 +26,16 @@ class Server(commands.Cog):
 		member = ctx.author
 		notify_role = self.get_notify_role(ctx)
 		if notify_role is None:
-			await ctx.send(f"Can't give you notification role because this server doesn't have one. It's named \"Notify of Shibboleth games\" by default.")
+			post(ctx.channel, f"Can't give you notification role because this server doesn't have one. It's named \"Notify of Shibboleth games\" by default.")
 			return
 
 		notify_role_name = notify_role.name
 
 		if notify_role in member.roles:
-			await ctx.send(f"{member.mention} already has `{notify_role_name}` role.")
+			post(ctx.channel, f"{member.mention} already has `{notify_role_name}` role.")
 		else:
 			await member.add_roles(notify_role)
-			await ctx.send(f"{member.mention} granted `{notify_role_name}` role.")
+			post(ctx.channel, f"{member.mention} granted `{notify_role_name}` role.")
 
 	@commands.command(
 		brief="Remove yourself from being notified",
@@ -45,16 +46,16 @@ class Server(commands.Cog):
 		member = ctx.author
 		notify_role = self.get_notify_role(ctx)
 		if notify_role is None:
-			await ctx.send(f"Can't remove notification role because this server doesn't have one. It's named \"Notify of Shibboleth games\" by default.")
+			post(ctx.channel, f"Can't remove notification role because this server doesn't have one. It's named \"Notify of Shibboleth games\" by default.")
 			return
 
 		notify_role_name = notify_role.name
 
 		if notify_role not in member.roles:
-			await ctx.send(f"{member.mention} already doesn't have `{notify_role_name}` role.")
+			post(ctx.channel, f"{member.mention} already doesn't have `{notify_role_name}` role.")
 		else:
 			await member.remove_roles(notify_role)
-			await ctx.send(f"{member.mention} removed from `{notify_role_name}` role.")
+			post(ctx.channel, f"{member.mention} removed from `{notify_role_name}` role.")
 
 	@commands.command(
 		brief="Show invite link to this server channel",
@@ -63,4 +64,4 @@ class Server(commands.Cog):
 	)
 	async def invite(self, ctx):
 		link = await ctx.channel.create_invite()
-		await ctx.send(f"Invite link: {link}")
+		post(ctx.channel, f"Invite link: {link}")
@@ -0,0 +1,118 @@
+import multiprocessing
+import time
+
+
+def shard_for_guild(guild_id, shard_count):
+	""" Returns the shard Discord sends a guild's events to. Every channel, and so every room, in a guild is on the same shard. """
+	return (guild_id >> 22) % shard_count
+
+class ShardSupervisor:
+	"""
+	Runs each shard of the bot in its own process, restarting any that exit or stop sending heartbeats.
+	target(*target_args, shard_id, shard_count, heartbeat) runs one shard, setting heartbeat.value to time.time() while healthy.
+	"""
+	def __init__(self, target, target_args, shard_count, heartbeat_timeout=120.0, startup_grace=300.0, check_interval=10.0,
+			launch_interval=5.0, min_restart_delay=5.0, max_restart_delay=300.0):
+		self.target = target
+		self.target_args = tuple(target_args)
+		self.shard_count = shard_count
+		self.heartbeat_timeout = heartbeat_timeout
+		self.startup_grace = startup_grace
+		self.check_interval = check_interval
+		self.launch_interval = launch_interval
+		self.min_restart_delay = min_restart_delay
+		self.max_restart_delay = max_restart_delay
+
+		# Spawn rather than fork so each shard starts from a clean interpreter with no inherited event loop or open database.
+		self.context = multiprocessing.get_context("spawn")
+
+		self.processes = [None] * shard_count
+		self.heartbeats = [None] * shard_count
+		self.started_at = [0.0] * shard_count
+		self.restart_delays = [min_restart_delay] * shard_count
+		# Shard id -> time to start it again
+		self.pending_restarts = {}
+
+	def start_shard(self, shard_id):
+		heartbeat = self.context.Value("d", 0.0, lock=False)
+		process = self.context.Process(
+			target=self.target,
+			args=self.target_args,
+			kwargs={"shard_id": shard_id, "shard_count": self.shard_count, "heartbeat": heartbeat},
+			name=f"shard-{shard_id}",
+		)
+		process.start()
+		print(f"Started shard {shard_id}/{self.shard_count} (pid {process.pid})")
+
+		self.processes[shard_id] = process
+		self.heartbeats[shard_id] = heartbeat
+		self.started_at[shard_id] = time.monotonic()
+
+	def stop_shard(self, shard_id, timeout=10.0):
+		process = self.processes[shard_id]
+		if process is None:
+			return
+		if process.is_alive():
+			process.terminate()
+			process.join(timeout)
+			if process.is_alive():
+				process.kill()
+				process.join()
+		self.processes[shard_id] = None
+
+	def unhealthy_reason(self, shard_id):
+		""" Returns why the shard needs restarting, or None if it's healthy. """
+		process = self.processes[shard_id]
+		if not process.is_alive():
+			return f"exited with code {process.exitcode}"
+
+		# Heartbeats use wall-clock time since they're set in another process.
+		last_heartbeat = self.heartbeats[shard_id].value
+		running_time = time.monotonic() - self.started_at[shard_id]
+		if last_heartbeat == 0.0:
+			if running_time > self.startup_grace:
+				return f"not ready after {running_time:.0f}s"
+		elif time.time() - last_heartbeat > self.heartbeat_timeout:
+			return f"no heartbeat for {time.time() - last_heartbeat:.0f}s"
+
+		return None
+
+	def check_shards(self):
+		now = time.monotonic()
+
+		for (shard_id, restart_time) in list(self.pending_restarts.items()):
+			if now >= restart_time:
+				del self.pending_restarts[shard_id]
+				self.start_shard(shard_id)
+
+		for shard_id in range(self.shard_count):
+			if (self.processes[shard_id] is None) or (shard_id in self.pending_restarts):
+				continue
+
+			reason = self.unhealthy_reason(shard_id)
+			if reason is None:
+				# Once a shard has run for a while, let it restart quickly again next time.
+				if now - self.started_at[shard_id] > self.startup_grace:
+					self.restart_delays[shard_id] = self.min_restart_delay
+				continue
+
+			delay = self.restart_delays[shard_id]
+			print(f"Shard {shard_id} {reason}, restarting in {delay:.0f}s")
+			self.stop_shard(shard_id)
+			self.pending_restarts[shard_id] = now + delay
+			self.restart_delays[shard_id] = min(2 * delay, self.max_restart_delay)
+
+	def run(self):
+		try:
+			for shard_id in range(self.shard_count):
+				if shard_id > 0:
+					# Discord rate limits how quickly shards can connect.
+					time.sleep(self.launch_interval)
+				self.start_shard(shard_id)
+
+			while True:
+				time.sleep(self.check_interval)
+				self.check_shards()
+		finally:
+			for shard_id in range(self.shard_count):
+				self.stop_shard(shard_id)
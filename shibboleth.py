@@ -1,7 +1,11 @@
 import random
 
 import config
+from corpus import CorpusStore
 from name_utils import names_of, names_string_formatted
+from render_cache import RenderCache
+from word_layout import WordListLayout
+from word_lookup import WordLookup, did_you_mean_string
 
 
 class GameActionError(Exception):
@@ -10,8 +14,24 @@ class GameActionError(Exception):
 class GameInitializationError(Exception):
 	pass
 
+def team_sizes_for(num_players, skew):
+	""" Returns the smaller and larger team sizes, where a skew moves one more player to the larger team. Also works elementwise on NumPy arrays. """
+	return [num_players//2 - skew, (num_players+1)//2 + skew]
+
+def possible_team_sizes_for(num_players, might_skew):
+	min_possible_team_size = num_players // 2 - might_skew
+	max_possible_team_size = (num_players+1)//2 + might_skew
+	return list(range(min_possible_team_size, max_possible_team_size + 1))
+
 class Shibboleth:
-	def __init__(self, players, num_words, include_veto_phase=True, team_guess_size=None, skew_chance=0.0):
+	__slots__ = (
+		"players", "player_names", "corpus", "include_veto_phase", "team_guess_size", "vetoable_team_guess", "num_words",
+		"words", "word_indices", "word_list_layout", "word_lookup", "secret_words", "skew_chance", "might_skew", "team_sizes", "possible_team_sizes",
+		"player_words", "player_set", "player_bits", "team_masks", "team_dict",
+		"winning_word", "render_cache",
+	)
+
+	def __init__(self, players, num_words, include_veto_phase=True, team_guess_size=None, skew_chance=0.0, word_history=None):
 		self.players = players
 		try:
 			self.player_names = names_of(players)
@@ -31,9 +51,16 @@ class Shibboleth:
 			raise GameInitializationError(f"Invalid number of words {num_words}")
 		self.num_words = num_words
 
-		self.words = random.sample(self.corpus, self.num_words)
+		if word_history is None:
+			self.word_indices = None
+			self.words = random.sample(self.corpus, self.num_words)
+		else:
+			# Avoid words from the room's recent rounds. The indices are kept so the room can record them once the round starts.
+			self.word_indices = word_history.sample_indices(self.corpus, self.num_words)
+			self.words = [self.corpus[index] for index in self.word_indices]
+		self.build_word_index()
 		self.secret_words = random.sample(self.words, 2)
-		# TODO(#7): Uniqueness should be enforced on corpus instead. (Which will imply uniqueness of secret words.)
+		# The corpus store deduplicates word lists, so this only catches corpora provided some other way.
 		num_distinct_secret_words = len(set(self.secret_words))
 		if num_distinct_secret_words != 2:
 			raise GameInitializationError(f"Number of secret words should be 2, but is {num_distinct_secret_words}. The corpus contained repeats.")
@@ -52,13 +79,10 @@ class Shibboleth:
 				raise GameInitializationError("Cannot make game with skew chance and <2 players.")
 
 		skew = random.random() < skew_chance
-		self.team_sizes = [num_players//2 - skew, (num_players+1)//2 + skew]
+		self.team_sizes = team_sizes_for(num_players, skew)
 		assert sum(self.team_sizes) == num_players, "Sum of team sizes doesn't match number of players"
 
-		min_possible_team_size = num_players // 2 - self.might_skew
-		max_possible_team_size = (num_players+1)//2 + self.might_skew
-
-		self.possible_team_sizes = list(range(min_possible_team_size, max_possible_team_size + 1))
+		self.possible_team_sizes = possible_team_sizes_for(num_players, self.might_skew)
 
 		if (team_guess_size is not None) and (team_guess_size > min(self.possible_team_sizes)):
 			raise GameInitializationError(f"Team guess size {team_guess_size} is too large for {len(players)} players.")
@@ -67,51 +91,144 @@ class Shibboleth:
 		random.shuffle(secret_words_list)
 		assert len(secret_words_list) == num_players, "Failure in assigning secret words"
 		self.player_words = dict(zip(players, secret_words_list))
+		self.build_team_index()
 
 		self.winning_word = None
+		self.render_cache = RenderCache()
 
 	def __repr__(self):
 		return self.status_string
 
 	@classmethod
 	def get_corpus(cls):
-		# TODO(#7): Uniqueness should be asserted here, or can just return a set.
-		with open(config.word_list_path, "r") as f:
-			words = [line.strip() for line in f.readlines()]
-			return words
+		# Shared across rounds and rooms, and only reread if the file changes.
+		return CorpusStore.get().get_corpus(config.word_list_path).words
+
+	def to_state(self):
+		""" Returns the game as plain data for serialization, with players as user IDs. Team ids index into secret_words. """
+		if self.vetoable_team_guess is None:
+			vetoable_team_guess = None
+		else:
+			veto_guesser, veto_team = self.vetoable_team_guess
+			vetoable_team_guess = [veto_guesser.id, [player.id for player in veto_team]]
+
+		return {
+			"players": [player.id for player in self.players],
+			"team_ids": [self.team_id_of(player) for player in self.players],
+			"words": list(self.words),
+			"secret_words": list(self.secret_words),
+			"team_sizes": list(self.team_sizes),
+			"include_veto_phase": self.include_veto_phase,
+			"team_guess_size": self.team_guess_size,
+			"skew_chance": self.skew_chance,
+			"vetoable_team_guess": vetoable_team_guess,
+			"winning_word": self.winning_word,
+			"phase": self.phase,
+		}
+
+	@classmethod
+	def from_state(cls, state, get_member):
+		""" Rebuilds a game from to_state() data, looking up players by user ID with get_member, which returns None for anyone who can't be found. """
+		def get_members(player_ids):
+			members = [get_member(player_id) for player_id in player_ids]
+			if None in members:
+				raise GameInitializationError("Can't restore game because some players can no longer be found.")
+			return members
+
+		game = cls.__new__(cls)
+		game.players = get_members(state["players"])
+		game.player_names = names_of(game.players)
+		game.corpus = cls.get_corpus()
+		game.include_veto_phase = state["include_veto_phase"]
+		game.team_guess_size = state["team_guess_size"]
+
+		game.words = list(state["words"])
+		game.word_indices = None
+		game.num_words = len(game.words)
+		game.build_word_index()
+		game.secret_words = list(state["secret_words"])
+
+		num_players = len(game.players)
+		game.skew_chance = state["skew_chance"]
+		game.might_skew = game.skew_chance > 0
+		game.team_sizes = list(state["team_sizes"])
+		game.possible_team_sizes = possible_team_sizes_for(num_players, game.might_skew)
+
+		game.player_words = {player: game.secret_words[team_id] for (player, team_id) in zip(game.players, state["team_ids"])}
+		game.build_team_index()
+
+		if state["vetoable_team_guess"] is None:
+			game.vetoable_team_guess = None
+		else:
+			veto_guesser_id, veto_team_ids = state["vetoable_team_guess"]
+			[veto_guesser] = get_members([veto_guesser_id])
+			game.vetoable_team_guess = (veto_guesser, get_members(veto_team_ids))
+		game.winning_word = state["winning_word"]
+		game.render_cache = RenderCache()
+
+		return game
+
+	def build_word_index(self):
+		""" Precomputes the word list rendering and guess lookup, since the word list is fixed for the rest of the game. """
+		self.word_list_layout = WordListLayout(self.words)
+		self.word_lookup = WordLookup(self.words)
+
+	def build_team_index(self):
+		""" Precomputes team lookups from the word assignment, which is fixed for the rest of the game. """
+		self.player_set = frozenset(self.players)
+		self.player_bits = {player: 1 << i for (i, player) in enumerate(self.players)}
+
+		# Team ids are indices into secret_words. Everything else about the teams is derived from these on demand.
+		team_lists = tuple([player for player in self.players if self.player_words[player] == word] for word in self.secret_words)
+		self.team_masks = tuple(self.players_mask(team) for team in team_lists)
+		self.team_dict = dict(zip(self.secret_words, team_lists))
+
+	def team_id_of(self, player):
+		return 0 if (self.player_bits[player] & self.team_masks[0]) else 1
+
+	def players_mask(self, players):
+		""" Returns the bitmask with a bit set for each of the given players, who must be in the game. """
+		mask = 0
+		for player in players:
+			mask |= self.player_bits[player]
+		return mask
 
 	def get_secret_word(self, player):
-		assert player in self.players, "Player not in player list"
+		assert player in self.player_set, "Player not in player list"
 		return self.player_words[player]
 
 	@property
 	def word_list_string(self):
 		return "\n".join(self.words)
 
-	def word_list_string_columns(self, num_columns=2, column_space=20):
-		word_list = self.words
-		lines = []
-		assert num_columns >= 1, "Invalid number of columns"
+	def word_list_string_columns(self, num_columns=2, column_space=None):
+		""" Returns the word list in columns, which are as wide as the longest word plus a gap unless column_space is given. """
+		return self.word_list_layout.render(num_columns, column_space)
 
-		while word_list:
-			column_words = word_list[:num_columns]
-			lines.append("".join(word.ljust(column_space) for word in column_words[:-1]) + column_words[-1])
-			word_list = word_list[num_columns:]
+	def word_list_string_fitting(self, max_length, num_columns=2):
+		""" Returns the word list in up to num_columns columns, using fewer if needed to fit in max_length characters. """
+		return self.word_list_layout.render_fitting(max_length, num_columns)
 
-		return "\n".join(lines)
+	@property
+	def word_list_code_block(self):
+		""" The word list as a code block that fits in a Discord message. """
+		return self.word_list_layout.render_code_block()
 
 	def players_with_word(self, word):
-		assert word in self.secret_words, "Nobody has this secret word"
-		return [player for player in self.players if self.get_secret_word(player) == word]
+		assert word in self.team_dict, "Nobody has this secret word"
+		return self.team_dict[word]
+
+	def team_set_of(self, player):
+		""" Returns the frozenset of players sharing the given player's secret word, including them. """
+		return frozenset(self.team_dict[self.player_words[player]])
 
 	@property
 	def teams(self):
-		return {word: self.players_with_word(word) for word in self.secret_words}
+		return self.team_dict
 
 	def opposing_word(self, word):
-		assert word in self.secret_words, "Nobody has this secret word"
-		[other_word] = set(self.secret_words) - {word}
-		return other_word
+		assert word in self.team_dict, "Nobody has this secret word"
+		return self.secret_words[1 - self.secret_words.index(word)]
 
 	def declare_winner(self, guesser, correct):
 		""" Sets the winning word (and ends the game) based on the guesser and correctness of the game-ending guess. """
@@ -119,12 +236,22 @@ class Shibboleth:
 		opposing_word = self.opposing_word(guesser_word)
 		self.winning_word = guesser_word if correct else opposing_word
 
+	def resolve_word(self, guessed_word):
+		""" Returns the word on the word list that the guess matches, ignoring case, accents and extra whitespace, or None if there is none. """
+		return self.word_lookup.resolve(guessed_word)
+
+	def word_suggestions(self, guessed_word):
+		""" Returns words on the word list that are a close misspelling of the guess. """
+		return self.word_lookup.suggestions(guessed_word)
+
 	def check_word_guess(self, player, word):
-		if player not in self.players:
+		if player not in self.player_set:
 			raise GameActionError("Player not in player list")
 
-		if word not in self.words:
-			raise GameActionError(f"{repr(word)} not on word list. Check spelling and capitalization.")
+		resolved_word = self.resolve_word(word)
+		if resolved_word is None:
+			raise GameActionError(f"{repr(word)} not on word list.{did_you_mean_string(self.word_suggestions(word))} Check spelling.")
+		word = resolved_word
 
 		if word == self.get_secret_word(player):
 			raise GameActionError("Cannot guess own word")
@@ -151,15 +278,15 @@ class Shibboleth:
 		return " or ".join(str(num) for num in sorted(set(self.valid_team_guess_sizes)))
 
 	def check_team_guess(self, player, guessed_team):
-		if player not in self.players:
+		if player not in self.player_set:
 			raise GameActionError("Player not in player list")
 
 		guessed_team_set = set(guessed_team)
 
 		if len(guessed_team_set) != len(guessed_team):
 			raise GameActionError("Duplicate players guessed")
-		if not (guessed_team_set <= set(self.players)):
-			extra_players = guessed_team_set - set(self.players)
+		if not (guessed_team_set <= self.player_set):
+			extra_players = guessed_team_set - self.player_set
 			extra_player_names = names_string_formatted(extra_players)
 			raise GameActionError(f"Non-players guessed in {extra_player_names}")
 		if player not in guessed_team_set:
@@ -168,12 +295,13 @@ class Shibboleth:
 		if len(guessed_team_set) not in self.valid_team_guess_sizes:
 			raise GameActionError(f"Invalid guessed team size {len(guessed_team_set)}. Must be {self.valid_guess_sizes_string}.")
 
-		actual_team_set = set(self.players_with_word(self.get_secret_word(player)))
+		guessed_team_mask = self.players_mask(guessed_team_set)
+		actual_team_mask = self.team_masks[self.team_id_of(player)]
 
 		if self.team_guess_size is not None:
-			return guessed_team_set <= actual_team_set
+			return (guessed_team_mask & ~actual_team_mask) == 0
 		else:
-			return guessed_team_set == actual_team_set
+			return guessed_team_mask == actual_team_mask
 
 	def resolve_team_guess(self, player, team, veto_timeout_override=False):
 		""" Called when a team has been guessed, or when a veto phase times out. """
@@ -212,13 +340,21 @@ class Shibboleth:
 		else:
 			return "main"
 
+	@property
+	def formatted_player_names(self):
+		return self.render_cache.get("formatted player names", self.render_cache.names_version, lambda: names_string_formatted(self.players))
+
 	@property
 	def player_name_string(self):
-		player_names = names_string_formatted(self.players)
-		return f"Players ({len(self.players)}): {player_names}"
+		return f"Players ({len(self.players)}): {self.formatted_player_names}"
 
 	@property
 	def info_strings(self):
+		# Everything shown depends only on names and the phase, since the words and players are fixed.
+		cached_info_strings = self.render_cache.get("info strings", (self.render_cache.names_version, self.phase), self.render_info_strings)
+		return list(cached_info_strings)
+
+	def render_info_strings(self):
 		info_strings = []
 		wordlist_abbreviated = ", ".join(self.words[:2] + ["..."])
 		info_strings.append(self.player_name_string)
@@ -235,4 +371,4 @@ class Shibboleth:
 
 	@property
 	def status_string(self):
-		return "\n".join(self.info_strings)
+		return self.render_cache.get("status", (self.render_cache.names_version, self.phase), lambda: "\n".join(self.info_strings))
@@ -0,0 +1,147 @@
+import argparse
+import json
+
+import numpy as np
+
+from room import team_guess_size_for
+from shibboleth import GameInitializationError, possible_team_sizes_for, team_sizes_for
+
+
+class SimulationResult:
+	""" Empirical distributions from a batch of simulated rounds with fixed settings. """
+	def __init__(self, num_players, skew_chance, max_guess, team_guess_size, num_rounds, smaller_team_size_counts, guess_success_counts):
+		self.num_players = num_players
+		self.skew_chance = skew_chance
+		self.max_guess = max_guess
+		self.team_guess_size = team_guess_size
+		self.num_rounds = num_rounds
+		self.smaller_team_size_counts = smaller_team_size_counts
+		self.guess_success_counts = guess_success_counts
+
+	@property
+	def team_size_distribution(self):
+		""" Maps team size splits like "1v2" to the fraction of rounds with that split. """
+		return {f"{size}v{self.num_players - size}": count / self.num_rounds for (size, count) in sorted(self.smaller_team_size_counts.items())}
+
+	@property
+	def zero_team_chance(self):
+		""" Fraction of rounds skewed to 0vN, where everyone shares a secret word. """
+		return self.smaller_team_size_counts.get(0, 0) / self.num_rounds
+
+	@property
+	def random_guess_success_rates(self):
+		""" Maps each valid team guess size to the chance that a random player guessing a random team of that size is right. """
+		return {size: count / self.num_rounds for (size, count) in sorted(self.guess_success_counts.items())}
+
+	def as_dict(self):
+		return {
+			"num_players": self.num_players,
+			"skew_chance": self.skew_chance,
+			"max_guess": self.max_guess,
+			"team_guess_size": self.team_guess_size,
+			"num_rounds": self.num_rounds,
+			"team_size_distribution": self.team_size_distribution,
+			"zero_team_chance": self.zero_team_chance,
+			"random_guess_success_rates": self.random_guess_success_rates,
+		}
+
+	def __repr__(self):
+		return f"SimulationResult({self.as_dict()})"
+
+def simulate(num_players, skew_chance=0.0, max_guess=3, num_rounds=1_000_000, batch_size=1_000_000, rng=None):
+	"""
+	Simulates many rounds of team assignment as a room with these options would set them up, all at once as NumPy arrays.
+	Raises GameInitializationError for settings a room couldn't start a round with.
+	"""
+	if rng is None:
+		rng = np.random.default_rng()
+
+	team_guess_size = team_guess_size_for(num_players, max_guess)
+	might_skew = skew_chance > 0
+
+	# Same restrictions as Shibboleth
+	if might_skew and (team_guess_size is not None):
+		raise GameInitializationError("Cannot make game with both skew chance and max_guess active.")
+	if might_skew and num_players < 2:
+		raise GameInitializationError("Cannot make game with skew chance and <2 players.")
+	possible_team_sizes = possible_team_sizes_for(num_players, might_skew)
+	if (team_guess_size is not None) and (team_guess_size > min(possible_team_sizes)):
+		raise GameInitializationError(f"Team guess size {team_guess_size} is too large for {num_players} players.")
+
+	valid_team_guess_sizes = [team_guess_size] if (team_guess_size is not None) else possible_team_sizes
+	# Guesses always include the guesser, and can't include more than everyone.
+	valid_team_guess_sizes = [size for size in valid_team_guess_sizes if 1 <= size <= num_players]
+
+	smaller_team_size_counts = np.zeros(num_players + 1, dtype=np.int64)
+	guess_success_counts = dict.fromkeys(valid_team_guess_sizes, 0)
+
+	rounds_left = num_rounds
+	while rounds_left > 0:
+		batch = min(batch_size, rounds_left)
+		rounds_left -= batch
+
+		skew = rng.random(batch) < skew_chance
+		smaller_team_sizes, larger_team_sizes = team_sizes_for(num_players, skew.astype(np.int64))
+		smaller_team_size_counts += np.bincount(smaller_team_sizes, minlength=num_players + 1)
+
+		if num_players == 0:
+			continue
+
+		# A uniformly random guesser is on the smaller team with chance proportional to its size.
+		guesser_on_smaller_team = rng.integers(0, num_players, size=batch) < smaller_team_sizes
+		guesser_team_sizes = np.where(guesser_on_smaller_team, smaller_team_sizes, larger_team_sizes)
+
+		for size in valid_team_guess_sizes:
+			num_others = size - 1
+			if num_others == 0:
+				correct = np.ones(batch, dtype=bool)
+			else:
+				# How many of the randomly picked other players are teammates
+				num_teammates_guessed = rng.hypergeometric(guesser_team_sizes - 1, num_players - guesser_team_sizes, num_others)
+				correct = num_teammates_guessed == num_others
+
+			if team_guess_size is None:
+				correct &= guesser_team_sizes == size
+
+			guess_success_counts[size] += int(np.count_nonzero(correct))
+
+	smaller_team_size_counts = {size: int(count) for (size, count) in enumerate(smaller_team_size_counts) if count}
+	return SimulationResult(num_players, skew_chance, max_guess, team_guess_size, num_rounds, smaller_team_size_counts, guess_success_counts)
+
+def sweep(player_counts, skew_chances, max_guesses, num_rounds=1_000_000, rng=None):
+	""" Simulates every combination of settings, skipping those a room couldn't start a round with. """
+	if rng is None:
+		rng = np.random.default_rng()
+
+	results = []
+	for num_players in player_counts:
+		for skew_chance in skew_chances:
+			for max_guess in max_guesses:
+				try:
+					results.append(simulate(num_players, skew_chance, max_guess, num_rounds=num_rounds, rng=rng))
+				except GameInitializationError:
+					continue
+	return results
+
+def result_line(result):
+	team_sizes = ", ".join(f"{split} {fraction:.1%}" for (split, fraction) in result.team_size_distribution.items())
+	guess_rates = ", ".join(f"{size}: {rate:.2%}" for (size, rate) in result.random_guess_success_rates.items())
+	return f"{result.num_players:>3} players  skew {result.skew_chance:<5}  max_guess {result.max_guess:<3}  teams [{team_sizes}]  0vN {result.zero_team_chance:.1%}  random guess [{guess_rates}]"
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Simulate Shibboleth team assignment to tune skew chance and max guess.")
+	parser.add_argument("--players", type=int, nargs="+", default=list(range(2, 13)), help="player counts to simulate (default: 2 to 12)")
+	parser.add_argument("--skew", type=float, nargs="+", default=[0.0, 0.1, 0.2, 0.3, 0.5], help="skew chances to simulate")
+	parser.add_argument("--max-guess", dest="max_guess", type=int, nargs="+", default=[3], help="max guess values to simulate (default: 3)")
+	parser.add_argument("--rounds", type=int, default=1_000_000, help="rounds to simulate per combination (default: 1000000)")
+	parser.add_argument("--seed", type=int, default=None, help="random seed, for reproducible runs")
+	parser.add_argument("--json", action="store_true", help="print results as JSON")
+	args = parser.parse_args()
+
+	results = sweep(args.players, args.skew, args.max_guess, num_rounds=args.rounds, rng=np.random.default_rng(args.seed))
+
+	if args.json:
+		print(json.dumps([result.as_dict() for result in results], indent=2))
+	else:
+		for result in results:
+			print(result_line(result))
@@ -2,7 +2,9 @@ import discord
 from discord.ext import commands
 
 from check import no_dm_predicate, during_round
-from name_utils import names_string_formatted
+import mailbox
+from metrics import Metrics
+from outbox import post
 from rooms import here
 
 
@@ -30,7 +32,7 @@ class Status(commands.Cog):
 			skew_comment = ""
 
 		team_sizes_message = f"Teams are of **size {team_sizes_string}**{skew_comment}{team_guess_size_comment}."
-		await ctx.send(team_sizes_message)
+		post(ctx.channel, team_sizes_message)
 
 	@commands.command(
 		brief="Show list of players",
@@ -42,19 +44,14 @@ class Status(commands.Cog):
 
 		if room.in_round:
 			game = room.game
-			players = game.players
-
-			player_mention_string = names_string_formatted(players)
-			num_players = len(players)
-			await ctx.send(f"__Players__ ({num_players}): {player_mention_string}")
+			num_players = len(game.players)
+			post(ctx.channel, f"__Players__ ({num_players}): {game.formatted_player_names}")
 
 			await self.show_team_sizes_message(ctx)
 
 		else:
-			players = room.room_players
-			player_mention_string = names_string_formatted(players)
-			num_players = len(players)
-			await ctx.send(f"Players ({num_players}): {player_mention_string}")
+			num_players = len(room.room_players)
+			post(ctx.channel, f"Players ({num_players}): {room.formatted_player_names}")
 
 	@commands.command(
 		brief="Show public wordlist for this round",
@@ -68,7 +65,7 @@ class Status(commands.Cog):
 
 		# By default, send to the whole channel
 		if not members:
-			await ctx.send(wordlist_string)
+			post(ctx.channel, wordlist_string)
 		else:
 			for member in members:
 				await member.send(wordlist_string)
@@ -79,7 +76,7 @@ class Status(commands.Cog):
 		aliases=["rn"],
 	)
 	async def roundnum(self, ctx):
-		await ctx.send(f"Round: {here(ctx).round_num}")
+		post(ctx.channel, f"Round: {here(ctx).round_num}")
 
 	@commands.command(
 		brief="Show public gamestate and other info",
@@ -87,4 +84,13 @@ class Status(commands.Cog):
 		aliases=["st"],
 	)
 	async def status(self, ctx):
-		await ctx.send(here(ctx).status_string)
+		post(ctx.channel, here(ctx).status_string)
+
+	@commands.command(
+		brief="Show bot performance metrics",
+		description="Show timings and counters the bot has recorded since it started, for debugging.",
+		aliases=[],
+		hidden=True,
+	)
+	async def metrics(self, ctx):
+		post(ctx.channel, f"```\n{Metrics.get().summary_string()}\nCommands queued in this room: {mailbox.queue_depth(ctx.channel.id)}\n```")
@@ -0,0 +1,12 @@
+from unittest.mock import MagicMock
+
+
+def mock_members(n):
+	""" Returns objects with display_name and id properties, like Discord members. """
+	return [MagicMock(name="Member", display_name=str(i), id=1000 + i) for i in range(n)]
+
+
+def member_lookup(members):
+	""" Returns a function finding members by id, like Guild.get_member. """
+	members_by_id = {member.id: member for member in members}
+	return members_by_id.get
@@ -0,0 +1,56 @@
+import io
+import threading
+import unittest
+from unittest.mock import patch
+
+from batch_writer import BatchWriter
+
+
+class TestBatchWriter(unittest.TestCase):
+
+	def test_batches(self):
+		""" Test that items are written in order, with keyed items replaced by later ones with the same key. """
+		batches = []
+		writer = BatchWriter("test", lambda batch: batches.append(list(batch.values())), flush_interval=0.01)
+		writer.add("a")
+		writer.add("b", key=1)
+		writer.add("c")
+		writer.add("d", key=1)
+		writer.add("c")
+		writer.start()
+		writer.stop()
+		self.assertEqual([["a", "d", "c", "c"]], batches)
+
+	def test_retry(self):
+		""" Test that a failed batch is retried ahead of newer items, and that the oldest are dropped past max_pending. """
+		batches = []
+		failed = threading.Event()
+
+		def write_batch(batch):
+			if not failed.is_set():
+				failed.set()
+				raise OSError("disk full")
+			batches.append(list(batch.values()))
+
+		writer = BatchWriter("test", write_batch, flush_interval=0.01, max_pending=3)
+		with patch("batch_writer.stderr", io.StringIO()) as log, patch("sys.stderr", io.StringIO()):
+			writer.add(1)
+			writer.add(2)
+			self.assertFalse(writer.flush())
+			for item in (3, 4):
+				writer.add(item)
+			self.assertTrue(writer.flush())
+		self.assertEqual([[2, 3, 4]], batches)
+		self.assertIn("test: failed to write 2 queued items", log.getvalue())
+		self.assertIn("test: dropped 1 queued items", log.getvalue())
+
+		# Stopping runs on_stop even without anything to write
+		stopped = []
+		writer = BatchWriter("test", write_batch, flush_interval=0.01, on_stop=lambda: stopped.append(True))
+		writer.start()
+		writer.stop()
+		self.assertEqual([True], stopped)
+
+
+if __name__ == '__main__':
+	unittest.main()
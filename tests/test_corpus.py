@@ -0,0 +1,110 @@
+import os
+import random
+import tempfile
+import unittest
+
+from corpus import COMPILED_MAGIC, Corpus, CorpusFormatError, CorpusStore, MappedCorpus, compile_word_list, read_word_list
+
+
+class TestCorpus(unittest.TestCase):
+
+	def setUp(self):
+		self.directory = tempfile.TemporaryDirectory()
+		self.path = os.path.join(self.directory.name, "words.txt")
+		CorpusStore.get().clear()
+
+	def tearDown(self):
+		CorpusStore.get().clear()
+		self.directory.cleanup()
+
+	def write_words(self, lines, mtime_ns=None):
+		with open(self.path, "w") as f:
+			f.write("\n".join(lines) + "\n")
+		if mtime_ns is not None:
+			os.utime(self.path, ns=(mtime_ns, mtime_ns))
+
+	def test_read_word_list(self):
+		""" Test that blank lines and repeats are dropped, keeping first-seen order. """
+		self.write_words(["apple", " banana ", "", "apple", "cherry", "banana"])
+		self.assertEqual(("apple", "banana", "cherry"), read_word_list(self.path))
+
+	def test_corpus(self):
+		""" Test the immutable corpus and its membership index. """
+		corpus = Corpus(self.path, ["a", "b", "c"], 0)
+		self.assertEqual(("a", "b", "c"), corpus.words)
+		self.assertEqual(frozenset("abc"), corpus.word_set)
+		self.assertEqual(3, len(corpus))
+		self.assertIn("b", corpus)
+		self.assertNotIn("d", corpus)
+		self.assertEqual("c", corpus[2])
+
+	def test_store_caches(self):
+		""" Test that an unchanged file is only read once. """
+		self.write_words(["a", "b"], mtime_ns=10**18)
+		first = CorpusStore.get().get_corpus(self.path)
+		second = CorpusStore.get().get_corpus(self.path)
+		self.assertIs(first, second)
+
+	def test_store_reloads_on_change(self):
+		""" Test that a file is reread when its mtime changes. """
+		self.write_words(["a", "b"], mtime_ns=10**18)
+		first = CorpusStore.get().get_corpus(self.path)
+		self.write_words(["c", "d", "c"], mtime_ns=10**18 + 1)
+		second = CorpusStore.get().get_corpus(self.path)
+		self.assertIsNot(first, second)
+		self.assertEqual(("c", "d"), second.words)
+
+	def test_default_word_lists_unique(self):
+		""" Test that the shipped word lists load without repeats. """
+		for path in ("wordlists/wordlist2000.txt", "wordlists/wordlist_a.txt"):
+			with self.subTest(path=path):
+				corpus = CorpusStore.get().get_corpus(path)
+				self.assertEqual(len(corpus.words), len(corpus.word_set))
+				self.assertGreater(len(corpus), 1000)
+
+	def test_compiled_round_trip(self):
+		""" Test that a compiled word list maps back to the same words, including non-ASCII ones. """
+		words = ["apple", "café", "", "日本語", "apple", "zebra"]
+		self.write_words(words)
+		compiled_path = os.path.join(self.directory.name, "words.wlc")
+		self.assertEqual(4, compile_word_list(self.path, compiled_path))
+
+		corpus = CorpusStore.get().get_corpus(compiled_path)
+		self.assertIsInstance(corpus, MappedCorpus)
+		self.assertEqual(4, len(corpus))
+		self.assertEqual(["apple", "café", "日本語", "zebra"], list(corpus))
+		self.assertEqual("zebra", corpus[-1])
+		self.assertEqual(["café", "日本語"], corpus[1:3])
+		with self.assertRaises(IndexError):
+			_ = corpus[4]
+
+		sample = random.sample(corpus, 3)
+		self.assertEqual(3, len(set(sample)))
+		for word in sample: self.assertIn(word, corpus)
+		self.assertNotIn("appl", corpus)
+		self.assertNotIn("", corpus)
+
+		# Recompiling swaps in the new list and unmaps the old one.
+		self.write_words(["kiwi", "lime"])
+		compile_word_list(self.path, compiled_path)
+		os.utime(compiled_path, ns=(10**18, 10**18))
+		new_corpus = CorpusStore.get().get_corpus(compiled_path)
+		self.assertEqual(["kiwi", "lime"], list(new_corpus))
+		self.assertTrue(corpus.buffer.closed)
+
+	def test_compiled_invalid(self):
+		""" Test that files that aren't compiled word lists are rejected. """
+		self.write_words(["not", "compiled"])
+		with self.assertRaises(CorpusFormatError):
+			MappedCorpus(self.path, 0)
+
+		for contents in (b"", COMPILED_MAGIC + b"\xff" * 8):
+			with self.subTest(contents=contents):
+				with open(self.path, "wb") as f:
+					f.write(contents)
+				with self.assertRaises(CorpusFormatError):
+					MappedCorpus(self.path, 0)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,52 @@
+import asyncio
+import importlib.util
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+# discord.py is only needed to run the bot, so these tests are skipped without it.
+discord_installed = importlib.util.find_spec("discord") is not None
+if discord_installed:
+	import discord
+
+	from dm_dispatcher import DMDispatcher
+
+
+def http_error(exception_class, status):
+	return exception_class(MagicMock(status=status, reason="error"), "error")
+
+
+@unittest.skipUnless(discord_installed, "discord.py is not installed")
+class TestDMDispatcher(unittest.TestCase):
+
+	def test_outcomes(self):
+		""" Test that members are sorted into sent, closed and failed by how their sends go. """
+		sent_member = MagicMock(name="Member", send=AsyncMock())
+		closed_member = MagicMock(name="Member", send=AsyncMock(side_effect=http_error(discord.Forbidden, 403)))
+		failed_member = MagicMock(name="Member", send=AsyncMock(side_effect=http_error(discord.HTTPException, 400)))
+		timed_out_member = MagicMock(name="Member", send=AsyncMock(side_effect=asyncio.TimeoutError))
+		messages = [(sent_member, "a"), (closed_member, "b"), (failed_member, "c"), (timed_out_member, "d")]
+
+		dispatcher = DMDispatcher(retry_delay=0)
+		(closed, failed) = asyncio.run(dispatcher.send_all(messages))
+		self.assertEqual([closed_member], closed)
+		self.assertEqual([failed_member, timed_out_member], failed)
+		sent_member.send.assert_awaited_once_with("a")
+
+		# Only server errors are retried, since other failures might have posted the message anyway.
+		for member in (closed_member, failed_member, timed_out_member):
+			self.assertEqual(1, member.send.await_count)
+
+	def test_server_error_retried(self):
+		""" Test that server errors are retried until a send works or the attempts run out. """
+		recovering_member = MagicMock(name="Member", send=AsyncMock(side_effect=[http_error(discord.DiscordServerError, 503), None]))
+		down_member = MagicMock(name="Member", send=AsyncMock(side_effect=http_error(discord.DiscordServerError, 500)))
+
+		dispatcher = DMDispatcher(max_attempts=3, retry_delay=0)
+		self.assertEqual("sent", asyncio.run(dispatcher.send(recovering_member, "a")))
+		self.assertEqual(2, recovering_member.send.await_count)
+		self.assertEqual("failed", asyncio.run(dispatcher.send(down_member, "b")))
+		self.assertEqual(3, down_member.send.await_count)
+
+
+if __name__ == '__main__':
+	unittest.main()
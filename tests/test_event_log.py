@@ -0,0 +1,114 @@
+import io
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from event_log import EventLog, index_path, read_events, segment_paths
+
+
+class TestEventLog(unittest.TestCase):
+
+	def setUp(self):
+		self.directory = tempfile.TemporaryDirectory()
+		self.path = os.path.join(self.directory.name, "events")
+
+	def tearDown(self):
+		self.directory.cleanup()
+
+	def open_log(self, segment_size=1024 * 1024, max_segments=None):
+		log = EventLog.cls()
+		log.open(self.path, segment_size=segment_size, flush_interval=0.01, max_segments=max_segments)
+		return log
+
+	def test_not_open(self):
+		""" Test that recording does nothing until the log is opened. """
+		log = EventLog.cls()
+		log.record("start", 1, [10])
+		self.assertIsNone(log.writer)
+
+	def test_query(self):
+		""" Test that events come back in order, filtered by room and player, across segments and restarts. """
+		log = self.open_log(segment_size=200)
+		for round_num in range(1, 6):
+			log.record("start", 1, [10, 11, 12], round=round_num, words=["apple", "banana"])
+			log.record("word guess", 1, [10 + round_num % 3], round=round_num, word="apple", correct=True)
+			log.record("start", 2, [12, 13], round=round_num)
+		log.close()
+
+		log = self.open_log(segment_size=200)
+		log.record("abandon", 2, [13], round=6)
+		log.close()
+
+		self.assertGreater(len(segment_paths(self.path)), 1)
+		self.assertTrue(all(os.path.exists(index_path(segment)) for segment in segment_paths(self.path)))
+
+		events = list(read_events(self.path))
+		self.assertEqual(16, len(events))
+		self.assertEqual(["start", "word guess", "start"], [event["type"] for event in events[:3]])
+		self.assertEqual({"type": "abandon", "room": 2, "players": [13], "round": 6}, {key: value for (key, value) in events[-1].items() if key != "time"})
+
+		room_events = list(read_events(self.path, room_id=1))
+		self.assertEqual(10, len(room_events))
+		self.assertEqual(list(range(1, 6)), [event["round"] for event in room_events if event["type"] == "start"])
+
+		player_events = list(read_events(self.path, player_id=11))
+		self.assertEqual(["start", "word guess", "start", "start", "start", "word guess", "start"], [event["type"] for event in player_events])
+
+		self.assertEqual(["start"] * 5 + ["abandon"], [event["type"] for event in read_events(self.path, room_id=2, player_id=13)])
+		self.assertEqual([], list(read_events(self.path, room_id=2, player_id=10)))
+
+	def test_unfinished_segment(self):
+		""" Test that a segment left without an up-to-date index, or with a half-written event, is still read and appended to cleanly. """
+		log = self.open_log()
+		log.record("start", 1, [10], round=1)
+		log.close()
+
+		segment = segment_paths(self.path)[-1]
+		os.remove(index_path(segment))
+		with open(segment, "ab") as f:
+			f.write(b'{"time":1,"type":"sta')
+
+		self.assertEqual(1, len(list(read_events(self.path, player_id=10))))
+
+		log = self.open_log()
+		log.record("end", 1, [10], round=1)
+		log.close()
+		self.assertEqual(["start", "end"], [event["type"] for event in read_events(self.path, room_id=1)])
+
+	def test_old_segments_deleted(self):
+		""" Test that only the newest segments and their indexes are kept, and that the events in them can still be read. """
+		log = self.open_log(segment_size=100, max_segments=2)
+		for round_num in range(20):
+			log.record("start", 1, [10], round=round_num)
+		log.close()
+
+		segments = segment_paths(self.path)
+		self.assertEqual(2, len(segments))
+		self.assertEqual(sorted(segments + [index_path(segment) for segment in segments]), sorted(os.path.join(self.path, name) for name in os.listdir(self.path)))
+		rounds = [event["round"] for event in read_events(self.path, room_id=1)]
+		self.assertEqual(list(range(20 - len(rounds), 20)), rounds)
+
+	def test_write_retried(self):
+		""" Test that events that fail to write are written on a later try, and the log keeps going. """
+		log = self.open_log()
+		write_events = log.write_events
+		failures = []
+
+		def flaky_write_events(events):
+			if not failures:
+				failures.append(True)
+				raise OSError("disk full")
+			write_events(events)
+
+		log.write_events = flaky_write_events
+		with patch("batch_writer.stderr", io.StringIO()), patch("sys.stderr", io.StringIO()):
+			log.record("start", 1, [10], round=1)
+			log.record("end", 1, [10], round=1)
+			log.close()
+		self.assertEqual([True], failures)
+		self.assertEqual(["start", "end"], [event["type"] for event in read_events(self.path)])
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,63 @@
+import asyncio
+import unittest
+
+import mailbox
+
+
+class TestMailbox(unittest.TestCase):
+
+	def test_serial_per_room(self):
+		""" Test that jobs for one room run one at a time in order, while another room's jobs run alongside them. """
+		events = []
+
+		def job(room, name):
+			async def run():
+				events.append(f"{room} {name} start")
+				await asyncio.sleep(0.01)
+				events.append(f"{room} {name} end")
+				return name
+			return run
+
+		async def run():
+			results = await asyncio.gather(
+				mailbox.run_serially("a", job("a", "first")),
+				mailbox.run_serially("a", job("a", "second")),
+				mailbox.run_serially("b", job("b", "first")),
+			)
+			return results
+
+		results = asyncio.run(run())
+		self.assertEqual(["first", "second", "first"], results)
+		self.assertEqual(["a first start", "b first start"], events[:2])
+		room_a_events = [event for event in events if event.startswith("a")]
+		self.assertEqual(["a first start", "a first end", "a second start", "a second end"], room_a_events)
+		self.assertEqual({}, mailbox.mailboxes)
+
+	def test_queue_depth_and_errors(self):
+		""" Test that queue depth counts waiting and running jobs, and that a failing job doesn't stop the ones after it. """
+		async def fail():
+			raise ValueError("failed")
+
+		async def run():
+			release = asyncio.Event()
+			blocker = mailbox.mailbox_for("room").submit(release.wait)
+			failing = mailbox.mailbox_for("room").submit(fail)
+			last = mailbox.mailbox_for("room").submit(lambda: asyncio.sleep(0, "done"))
+			await asyncio.sleep(0)
+			depth = mailbox.queue_depth("room")
+			release.set()
+
+			await blocker
+			result = await last
+			return depth, failing.exception(), result
+
+		depth, exception, result = asyncio.run(run())
+		self.assertEqual(3, depth)
+		self.assertIsInstance(exception, ValueError)
+		self.assertEqual("done", result)
+		self.assertEqual(0, mailbox.queue_depth("room"))
+		self.assertEqual({}, mailbox.queue_depths())
+
+
+if __name__ == '__main__':
+	unittest.main()
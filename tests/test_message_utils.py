@@ -0,0 +1,30 @@
+import unittest
+
+from message_utils import command_starts, might_be_command, preprocess_command_content
+
+
+class TestMessageUtils(unittest.TestCase):
+
+	def test_might_be_command(self):
+		""" Test that the prefilter lets through everything that could be a command and turns away ordinary chatter. """
+		starts = command_starts("!")
+		for content in ["!gw banana", "  !status", "<@1234> join", "<@!1234> join", "(nac) !gt @Alice", "\n!s", "!!!"]:
+			with self.subTest(content=content):
+				self.assertTrue(might_be_command(content, starts))
+
+		for content in ["it's something you'd find in a kitchen", "  hmm", "", "   ", "<:emoji:123> nice", "wait !gw"]:
+			with self.subTest(content=content):
+				self.assertFalse(might_be_command(content, starts))
+
+	def test_prefilter_agrees(self):
+		""" Test that nothing the prefilter turns away would have been scanned for commands. """
+		starts = command_starts("!")
+		for content in ["clue (!gw apple)", "x !gw apple", "? !gw", "a(b)!c"]:
+			with self.subTest(content=content):
+				processed = preprocess_command_content(content)
+				self.assertFalse(might_be_command(content, starts))
+				self.assertFalse((processed is not None) and processed.startswith("!"))
+
+
+if __name__ == '__main__':
+	unittest.main()
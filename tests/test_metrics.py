@@ -0,0 +1,32 @@
+import unittest
+
+from metrics import Metrics
+
+
+class TestMetrics(unittest.TestCase):
+
+	def test_timings(self):
+		""" Test that timings keep their count, extremes and percentiles. """
+		metrics = Metrics.cls()
+		for seconds in [0.4, 0.1, 0.3, 0.2, 1.0]:
+			metrics.record_time("latency", seconds)
+		metrics.increment("skipped", 3)
+		metrics.increment("skipped")
+
+		summary = metrics.summary()
+		latency = summary["timings"]["latency"]
+		self.assertEqual(5, latency["count"])
+		self.assertAlmostEqual(0.4, latency["mean"])
+		self.assertEqual(0.1, latency["min"])
+		self.assertEqual(0.3, latency["p50"])
+		self.assertEqual(1.0, latency["p95"])
+		self.assertEqual(1.0, latency["max"])
+		self.assertEqual({"skipped": 4}, summary["counters"])
+
+		self.assertIn("latency: 5 times", metrics.summary_string())
+		metrics.clear()
+		self.assertEqual("No metrics recorded yet.", metrics.summary_string())
+
+
+if __name__ == '__main__':
+	unittest.main()
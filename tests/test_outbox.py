@@ -0,0 +1,81 @@
+import asyncio
+import unittest
+
+import outbox
+from word_layout import MESSAGE_LENGTH_LIMIT
+
+
+class FakeChannel:
+	""" Records sent messages, taking a moment per send like a rate limited request. """
+	def __init__(self, channel_id):
+		self.id = channel_id
+		self.sent = []
+
+	async def send(self, content):
+		await asyncio.sleep(0.01)
+		self.sent.append(content)
+		return f"message {len(self.sent)}"
+
+
+class TestOutbox(unittest.TestCase):
+
+	def test_posts_joined(self):
+		""" Test that a burst of posts goes out as one message, in order. """
+		channel = FakeChannel(1)
+
+		async def run():
+			for line in ["__Round 1__", "Players (3): a, b, c", "Clue away!"]:
+				outbox.post(channel, line)
+			await outbox.flush(channel)
+
+		asyncio.run(run())
+		self.assertEqual(["__Round 1__\nPlayers (3): a, b, c\nClue away!"], channel.sent)
+		self.assertNotIn(channel.id, outbox.outboxes)
+
+	def test_length_limit(self):
+		""" Test that joined posts are split to stay under the message length limit, without splitting any post. """
+		channel = FakeChannel(2)
+		posts = [str(i) * 700 for i in range(5)]
+
+		async def run():
+			for content in posts:
+				outbox.post(channel, content)
+			await outbox.flush(channel)
+
+		asyncio.run(run())
+		self.assertEqual(["\n".join(posts[0:2]), "\n".join(posts[2:4]), posts[4]], channel.sent)
+		self.assertTrue(all(len(content) <= MESSAGE_LENGTH_LIMIT for content in channel.sent))
+
+	def test_send_keeps_order(self):
+		""" Test that a standalone send goes out on its own between the posts before and after it, returning the sent message. """
+		channel = FakeChannel(3)
+
+		async def run():
+			outbox.post(channel, "intro")
+			outbox.post(channel, "players")
+			message = await outbox.send(channel, "word list")
+			outbox.post(channel, "after")
+			await outbox.flush(channel)
+			return message
+
+		message = asyncio.run(run())
+		self.assertEqual(["intro\nplayers", "word list", "after"], channel.sent)
+		self.assertEqual("message 2", message)
+
+	def test_posted_during_send(self):
+		""" Test that posts made while a send is in flight are joined into the next send. """
+		channel = FakeChannel(4)
+
+		async def run():
+			outbox.post(channel, "first")
+			await asyncio.sleep(0.005)
+			outbox.post(channel, "second")
+			outbox.post(channel, "third")
+			await outbox.flush(channel)
+
+		asyncio.run(run())
+		self.assertEqual(["first", "second\nthird"], channel.sent)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+import config
+from role_cache import playing_role_name, RoleCache
+
+
+def mock_role(role_id, name):
+	role = MagicMock(name="Role", id=role_id)
+	role.name = name
+	return role
+
+
+class TestRoleCache(unittest.TestCase):
+
+	def test_playing_role_name(self):
+		""" Test that channel names map to their configured playing role, carrying over a numerical suffix. """
+		roles_in_channels = {"shibboleth-game": "Playing Shibboleth", "bot-testing": "Testing Shibboleth"}
+		for misc_playing_role in ["Playing", None]:
+			with patch.object(config, "playing_roles_in_channels", roles_in_channels, create=True), patch.object(config, "misc_playing_role", misc_playing_role, create=True):
+				playing_role_name.cache_clear()
+				self.assertEqual("Playing Shibboleth", playing_role_name("shibboleth-game"))
+				self.assertEqual("Playing Shibboleth2", playing_role_name("shibboleth-game2"))
+				self.assertEqual("Testing Shibboleth", playing_role_name("bot-testing"))
+				self.assertEqual(misc_playing_role, playing_role_name("general"))
+		playing_role_name.cache_clear()
+
+	def test_get_role(self):
+		""" Test that roles are found by name, keeping the first of duplicate names, and that changes show up once reported. """
+		guild = MagicMock(name="Guild", id=1)
+		guild.roles = [mock_role(10, "@everyone"), mock_role(11, "Playing"), mock_role(12, "Playing")]
+		cache = RoleCache.cls()
+
+		self.assertIs(guild.roles[1], cache.get_role(guild, "Playing"))
+		self.assertIsNone(cache.get_role(guild, "Notify"))
+		self.assertIsNone(cache.get_role(guild, None))
+
+		guild.roles.append(mock_role(13, "Notify"))
+		self.assertIsNone(cache.get_role(guild, "Notify"))
+		cache.roles_changed(guild)
+		self.assertIs(guild.roles[3], cache.get_role(guild, "Notify"))
+
+		del guild.roles[1]
+		cache.roles_changed(guild)
+		self.assertEqual(12, cache.get_role(guild, "Playing").id)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,222 @@
+import unittest
+from unittest.mock import MagicMock
+
+from player_index import PlayerIndex
+from room import Room
+from tests.mocks import mock_members
+
+
+class TestRoom(unittest.TestCase):
+
+	def make_room(self, num_players):
+		room = Room("room", None, None)
+		for member in mock_members(num_players):
+			room.add_player(member)
+		return room
+
+	def test_prepared_game_used(self):
+		""" Test that starting a round commits the prepared game. """
+		room = self.make_room(5)
+		room.prepare_next_round()
+		prepared_game = room.prepared_game
+		self.assertIsNotNone(prepared_game)
+		self.assertEqual(list(room.room_players), prepared_game.players)
+
+		room.start_round()
+		self.assertIs(prepared_game, room.game)
+		self.assertIsNone(room.prepared_game)
+
+	def test_prepared_game_discarded(self):
+		""" Test that a prepared game isn't used after the roster or an option it depends on changes. """
+		def change_roster(room):
+			room.add_player(mock_members(10)[-1])
+
+		def change_num_words(room):
+			room.num_words = 12
+
+		def change_max_guess(room):
+			room.max_guess = 2
+
+		def change_skew_chance(room):
+			room.skew_chance = 0.5
+
+		def change_veto_duration(room):
+			room.veto_duration = 0
+
+		for change in (change_roster, change_num_words, change_max_guess, change_skew_chance, change_veto_duration):
+			with self.subTest(change=change.__name__):
+				room = self.make_room(4)
+				room.prepare_next_round()
+				prepared_game = room.prepared_game
+				change(room)
+				room.start_round()
+				self.assertIsNot(prepared_game, room.game)
+				self.assertEqual(list(room.room_players), room.game.players)
+
+	def test_words_not_repeated(self):
+		""" Test that a room's word lists don't repeat words from its recent rounds. """
+		room = self.make_room(4)
+		room.recent_rounds = 3
+		recent_word_lists = []
+		for _ in range(10):
+			room.start_round()
+			for words in recent_word_lists[-3:]:
+				self.assertFalse(set(words) & set(room.game.words))
+			recent_word_lists.append(room.game.words)
+			room.end_round()
+
+	def test_status_string_cached(self):
+		""" Test that the status is reused until something it shows changes. """
+		room = self.make_room(3)
+		status = room.status_string
+		self.assertIs(status, room.status_string)
+
+		def changes():
+			yield lambda: room.add_player(mock_members(5)[-1])
+			yield lambda: room.start_round()
+			yield lambda: room.pause()
+			yield lambda: room.add_member_to_joiner_queue(mock_members(6)[-1])
+			yield lambda: room.unpause()
+			guesser = room.game.players[0]
+			yield lambda: room.resolve_team_guess(guesser, room.game.players_with_word(room.game.get_secret_word(guesser)))
+			yield lambda: room.end_round()
+
+		for change in changes():
+			change()
+			new_status = room.status_string
+			self.assertNotEqual(status, new_status)
+			self.assertIs(new_status, room.status_string)
+			status = new_status
+
+	def test_status_string_names_changed(self):
+		""" Test that cached names are re-rendered after a display name changes. """
+		room = self.make_room(2)
+		status = room.status_string
+		next(iter(room.room_players)).display_name = "renamed"
+		self.assertIs(status, room.status_string)
+		room.names_changed()
+		self.assertIn("renamed", room.status_string)
+		self.assertIn("renamed", room.formatted_player_names)
+
+		# Only the room told about the change renders names again, along with its game
+		other_room = self.make_room(2)
+		other_status = other_room.status_string
+		room.start_round()
+		game_status = room.game.status_string
+		room.game.players[0].display_name = "renamed again"
+		room.names_changed()
+		self.assertIs(other_status, other_room.status_string)
+		self.assertIn("renamed again", room.game.status_string)
+		self.assertIsNot(game_status, room.game.status_string)
+
+	def test_prepare_during_round(self):
+		""" Test that nothing is prepared while a round is ongoing, or for settings that can't make a game. """
+		room = self.make_room(4)
+		room.start_round()
+		room.prepare_next_round()
+		self.assertIsNone(room.prepared_game)
+
+		room = self.make_room(1)
+		room.skew_chance = 0.5
+		room.prepare_next_round()
+		self.assertIsNone(room.prepared_game)
+
+	def test_sync_players(self):
+		""" Test that syncing makes players of those with the playing role who can see the channel, in place of the current players. """
+		members = mock_members(5)
+		hidden_member = members[3]
+		channel = MagicMock(name="Channel")
+		channel.permissions_for.side_effect = lambda member: MagicMock(read_messages=(member is not hidden_member))
+
+		room = Room("room", MagicMock(name="Role"), channel)
+		room.add_player(members[4])
+		room.sync_players(members[:4])
+		self.assertEqual(members[:3], list(room.room_players))
+
+		room = Room("room", None, channel)
+		room.sync_players(members)
+		self.assertEqual([], list(room.room_players))
+
+	def test_player_index(self):
+		""" Test that the player index tracks which rooms in a guild each member is playing or queued in. """
+		guild = MagicMock(name="Guild", id=42)
+		first_room = Room("first", None, MagicMock(name="Channel", guild=guild))
+		second_room = Room("second", None, MagicMock(name="Channel", guild=guild))
+		member, other_member = mock_members(2)
+		index = PlayerIndex.get()
+
+		def rooms_of(member):
+			return index.rooms_of(guild.id, member.id)
+
+		first_room.add_player(member)
+		second_room.add_players([member, other_member])
+		self.assertEqual([first_room, second_room], rooms_of(member))
+
+		second_room.remove_player(member)
+		self.assertEqual([first_room], rooms_of(member))
+
+		first_room.start_round()
+		first_room.add_member_to_joiner_queue(other_member)
+		self.assertEqual([second_room, first_room], rooms_of(other_member))
+		first_room.remove_member_from_joiner_queue(other_member)
+		self.assertEqual([second_room], rooms_of(other_member))
+		self.assertEqual([], index.rooms_of(guild.id + 1, other_member.id))
+
+		first_room.end_round()
+		first_room.remove_all_players()
+		second_room.remove_all_players()
+		self.assertEqual([], rooms_of(member))
+		self.assertEqual([], rooms_of(other_member))
+
+	def test_timers_cancelled_at_round_end(self):
+		""" Test that the round's timers are cancelled when it ends, and that setting a timer replaces one with the same name. """
+		room = self.make_room(4)
+		room.start_round()
+		room.set_timer("veto deadline", 60, lambda: None)
+		first_timer = room.timers["veto deadline"]
+		room.set_timer("veto deadline", 60, lambda: None)
+		second_timer = room.timers["veto deadline"]
+		self.assertFalse(first_timer.pending)
+		self.assertTrue(second_timer.pending)
+
+		room.end_round()
+		self.assertFalse(second_timer.pending)
+		self.assertEqual({}, room.timers)
+
+	def test_pause_during_veto(self):
+		""" Test that pausing in the veto phase stops its timers and keeps the time left for unpausing, even across a restart. """
+		room = self.make_room(4)
+		room.start_round()
+		guesser = room.game.players[0]
+		room.resolve_team_guess(guesser, room.game.players_with_word(room.game.get_secret_word(guesser)))
+		room.set_timer("veto warning", 20, lambda: None)
+		room.set_timer("veto deadline", 30, lambda: None)
+		deadline_timer = room.timers["veto deadline"]
+
+		room.pause()
+		self.assertFalse(deadline_timer.pending)
+		self.assertEqual({}, room.timers)
+		self.assertIsNone(room.veto_deadline)
+		self.assertAlmostEqual(30, room.paused_veto_time_left, delta=5)
+
+		members_by_id = {member.id: member for member in room.room_players}
+		restored = Room("room", None, None)
+		restored.restore_state(room.to_state(), members_by_id.get)
+		self.assertTrue(restored.paused)
+		self.assertIsNone(restored.take_restored_veto_deadline())
+		self.assertAlmostEqual(30, restored.take_paused_veto_time_left(), delta=5)
+		self.assertIsNone(restored.take_paused_veto_time_left())
+
+		room.unpause()
+		self.assertAlmostEqual(30, room.take_paused_veto_time_left(), delta=5)
+
+		# Pausing outside the veto phase leaves nothing to pick up
+		room.end_round()
+		room.start_round()
+		room.pause()
+		room.unpause()
+		self.assertIsNone(room.take_paused_veto_time_left())
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,156 @@
+import io
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from room import Room
+from room_store import RoomStore
+from serialization import StateFormatError
+from tests.mocks import member_lookup, mock_members
+
+
+def mock_room(channel_id, members):
+	channel = MagicMock(name="Channel", id=channel_id, guild=MagicMock(name="Guild", id=1))
+	room = Room(f"room{channel_id}", None, channel)
+	room.add_players(members)
+	return room
+
+
+class TestRoomStore(unittest.TestCase):
+
+	def setUp(self):
+		self.directory = tempfile.TemporaryDirectory()
+		self.path = os.path.join(self.directory.name, "state", "rooms.sqlite3")
+
+	def tearDown(self):
+		self.directory.cleanup()
+
+	def open_store(self):
+		# A fresh instance rather than the process-wide one, to simulate a restart
+		store = RoomStore.cls()
+		store.open(self.path, flush_interval=0.01)
+		return store
+
+	def test_not_open(self):
+		""" Test that recording does nothing until the store is opened. """
+		store = RoomStore.cls()
+		members = mock_members(2)
+		store.record(mock_room(1, members))
+		self.assertIsNone(store.writer)
+		self.assertIsNone(store.take_saved_state(1))
+		store.close()
+
+	def test_survives_restart(self):
+		""" Test that the latest state of each room is saved and handed out once after reopening. """
+		members = mock_members(6)
+		get_member = member_lookup(members)
+		store = self.open_store()
+		room = mock_room(10, members[:4])
+		other_room = mock_room(20, members[4:])
+		store.record(room)
+		room.num_words = 12
+		room.start_round()
+		store.record(room)
+		store.record(other_room)
+		store.close()
+
+		store = self.open_store()
+		restored = Room("room10", None, room.channel)
+		restored.restore_state(store.take_saved_state(10), get_member)
+		self.assertEqual(12, restored.num_words)
+		self.assertEqual(list(room.room_players), list(restored.room_players))
+		self.assertEqual(room.game.words, restored.game.words)
+		self.assertIsNone(store.take_saved_state(10))
+		self.assertIsNotNone(store.take_saved_state(20))
+		store.close()
+
+	def test_forget(self):
+		""" Test that forgotten rooms aren't restored. """
+		members = mock_members(2)
+		store = self.open_store()
+		store.record(mock_room(10, members))
+		store.record(mock_room(20, members))
+		store.close()
+
+		store = self.open_store()
+		store.forget(10)
+		self.assertIsNone(store.take_saved_state(10))
+		store.close()
+
+		store = self.open_store()
+		self.assertIsNone(store.take_saved_state(10))
+		self.assertIsNotNone(store.take_saved_state(20))
+		store.close()
+
+	def test_saved_as_json(self):
+		""" Test that states are written as JSON text, and that undecodable ones are reported. """
+		members = mock_members(2)
+		room = mock_room(10, members)
+		store = self.open_store()
+		store.record(room)
+		store.close()
+
+		connection = sqlite3.connect(self.path)
+		try:
+			(data,) = connection.execute("SELECT state FROM rooms WHERE channel_id = 10").fetchone()
+			self.assertIsInstance(data, str)
+			with connection:
+				connection.execute("INSERT INTO rooms VALUES (30, 1, ?, 0)", ("{",))
+		finally:
+			connection.close()
+
+		store = self.open_store()
+		self.assertEqual(room.to_state(), store.take_saved_state(10))
+		with self.assertRaises(StateFormatError):
+			store.take_saved_state(30)
+		store.close()
+
+	def test_write_retried(self):
+		""" Test that a batch that fails to write, like when another shard has the database locked, is written later. """
+		class FlakyConnection(sqlite3.Connection):
+			failures_left = 1
+
+			def executemany(self, *args):
+				if FlakyConnection.failures_left > 0:
+					FlakyConnection.failures_left -= 1
+					raise sqlite3.OperationalError("database is locked")
+				return super().executemany(*args)
+
+		members = mock_members(2)
+		connect = sqlite3.connect
+		with patch("room_store.sqlite3.connect", lambda *args, **kwargs: connect(*args, factory=FlakyConnection, **kwargs)), patch("batch_writer.stderr", io.StringIO()) as log, patch("sys.stderr", io.StringIO()):
+			store = self.open_store()
+			store.record(mock_room(10, members))
+			while FlakyConnection.failures_left:
+				time.sleep(0.01)
+			store.record(mock_room(20, members))
+			store.close()
+		self.assertIn("RoomStore: failed to write 1 queued items", log.getvalue())
+
+		store = self.open_store()
+		self.assertIsNotNone(store.take_saved_state(10))
+		self.assertIsNotNone(store.take_saved_state(20))
+		store.close()
+
+	def test_sharded(self):
+		""" Test that each shard only loads the rooms in guilds on that shard. """
+		members = mock_members(2)
+		store = self.open_store()
+		for (channel_id, guild_id) in [(10, 0), (11, 1 << 22), (12, 2 << 22), (13, 3 << 22)]:
+			room = mock_room(channel_id, members)
+			room.channel.guild.id = guild_id
+			store.record(room)
+		store.close()
+
+		for (shard_id, channel_ids) in [(0, {10, 12}), (1, {11, 13})]:
+			store = RoomStore.cls()
+			store.open(self.path, shard_id=shard_id, shard_count=2)
+			self.assertEqual(channel_ids, set(store.saved_states))
+			store.close()
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,66 @@
+import io
+import unittest
+from unittest.mock import MagicMock, patch
+
+import config
+from room_store import RoomStore
+from rooms import Rooms
+
+
+def mock_channel(channel_id):
+	channel = MagicMock(name="Channel", id=channel_id)
+	channel.name = f"channel{channel_id}"
+	channel.guild.get_member.return_value = None
+	return channel
+
+
+@patch.object(config, "idle_room_timeout", 100)
+@patch.object(config, "max_idle_rooms", 2)
+@patch("rooms.playing_role_in_channel", lambda channel: None)
+class TestRooms(unittest.TestCase):
+
+	def test_evict_idle_rooms(self):
+		""" Test that rooms idle past the timeout are evicted, keeping only options that were changed, and come back with them. """
+		rooms = Rooms.cls()
+		channels = [mock_channel(channel_id) for channel_id in range(3)]
+		for channel in channels:
+			rooms.get_channel_adding_if_missing(channel)
+		rooms.get_channel(channels[1]).num_words = 12
+		rooms.get_channel(channels[2]).add_player(MagicMock(name="Member", id=1000))
+
+		now = max(rooms.last_used.values())
+		self.assertEqual(0, rooms.evict_idle_rooms(now + 50))
+		self.assertEqual(2, rooms.evict_idle_rooms(now + 150))
+		self.assertEqual([2], list(rooms.rooms))
+		self.assertEqual([1], list(rooms.idle_rooms))
+
+		room = rooms.get_channel_adding_if_missing(channels[1])
+		self.assertEqual(12, room.num_words)
+		self.assertEqual({}, rooms.idle_rooms)
+		self.assertEqual(0, rooms.get_channel_adding_if_missing(channels[0]).num_words)
+
+	def test_max_idle_rooms(self):
+		""" Test that only the most recently evicted rooms' options are kept. """
+		rooms = Rooms.cls()
+		channels = [mock_channel(channel_id) for channel_id in range(4)]
+		for channel in channels:
+			rooms.get_channel_adding_if_missing(channel).num_words = 12
+
+		now = max(rooms.last_used.values())
+		self.assertEqual(4, rooms.evict_idle_rooms(now + 150))
+		self.assertEqual([2, 3], list(rooms.idle_rooms))
+
+	def test_malformed_saved_state(self):
+		""" Test that a saved state that decodes but doesn't make sense is discarded, leaving a fresh room. """
+		rooms = Rooms.cls()
+		channel = mock_channel(5)
+		saved_states = {5: '{"version":1,"round_num":3,"players":7}'}
+		with patch.object(RoomStore.get(), "saved_states", saved_states), patch("rooms.stderr", io.StringIO()) as log:
+			room = rooms.get_channel_adding_if_missing(channel)
+		self.assertEqual(1, room.round_num)
+		self.assertIn("Discarding saved state", log.getvalue())
+		self.assertEqual({}, saved_states)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+from unittest.mock import MagicMock
+
+from roster import Roster
+from tests.mocks import mock_members
+
+
+class TestRoster(unittest.TestCase):
+
+	def test_add_discard(self):
+		""" Test membership, keeping join order, and ignoring repeated adds and removals. """
+		members = mock_members(4)
+		roster = Roster()
+		self.assertFalse(roster)
+
+		self.assertTrue(roster.add(members[2]))
+		self.assertTrue(roster.add(members[0]))
+		self.assertFalse(roster.add(members[2]))
+		self.assertTrue(roster.add(members[1]))
+		self.assertEqual([members[2], members[0], members[1]], list(roster))
+		self.assertEqual(3, len(roster))
+		self.assertIn(members[0], roster)
+		self.assertNotIn(members[3], roster)
+
+		self.assertTrue(roster.discard(members[0]))
+		self.assertFalse(roster.discard(members[0]))
+		self.assertEqual([members[2], members[1]], list(roster))
+
+		# Rejoining goes to the back.
+		roster.add(members[0])
+		self.assertEqual([members[2], members[1], members[0]], list(roster))
+
+	def test_keyed_by_id(self):
+		""" Test that a different object for the same user counts as the same member. """
+		member = mock_members(1)[0]
+		same_user = MagicMock(name="Member", display_name="renamed", id=member.id)
+		roster = Roster([member])
+		self.assertIn(same_user, roster)
+		self.assertFalse(roster.add(same_user))
+		self.assertTrue(roster.discard(same_user))
+		self.assertFalse(roster)
+
+	def test_bulk(self):
+		""" Test adding and removing many members at once. """
+		members = mock_members(50)
+		roster = Roster(members[:30])
+		roster.add_all(members[20:])
+		self.assertEqual(members, list(roster))
+		roster.discard_all(members[::2])
+		self.assertEqual(members[1::2], list(roster))
+		self.assertEqual(Roster(members[1::2]), roster)
+		roster.clear()
+		self.assertEqual(0, len(roster))
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,65 @@
+import asyncio
+import random
+import unittest
+
+from scheduler import Scheduler
+
+
+class TestScheduler(unittest.TestCase):
+
+	def test_fire_in_order(self):
+		""" Test that due timers fire soonest first, with ties in the order they were scheduled, and later ones wait. """
+		scheduler = Scheduler.cls()
+		fired = []
+		for (name, delay) in [("c", 3), ("a", 1), ("b", 2), ("a2", 1), ("late", 10)]:
+			scheduler.schedule(delay, lambda name=name: fired.append(name), name=name, now=0)
+
+		scheduler.run_due(now=5)
+		self.assertEqual(["a", "a2", "b", "c"], fired)
+		self.assertEqual(["late"], [timer.name for timer in scheduler.timers])
+
+	def test_cancel(self):
+		""" Test that cancelled timers never fire, wherever they are in the heap, and that cancelling twice does nothing. """
+		rng = random.Random(0)
+		scheduler = Scheduler.cls()
+		fired = []
+		timers = [scheduler.schedule(rng.random(), lambda i=i: fired.append(i), now=0) for i in range(200)]
+
+		cancelled = set(rng.sample(range(200), 80))
+		for i in cancelled:
+			self.assertTrue(scheduler.cancel(timers[i]))
+			self.assertFalse(scheduler.cancel(timers[i]))
+			self.assertFalse(timers[i].pending)
+		self.assertEqual(120, len(scheduler))
+
+		# The heap positions timers track must stay right through removals.
+		for (index, timer) in enumerate(scheduler.heap):
+			self.assertEqual(index, timer.index)
+
+		scheduler.run_due(now=1)
+		expected = sorted(set(range(200)) - cancelled, key=lambda i: timers[i].deadline)
+		self.assertEqual(expected, fired)
+		self.assertEqual(0, len(scheduler))
+
+	def test_driver(self):
+		""" Test that the driver task runs coroutine callbacks when they're due, including ones scheduled sooner than it was waiting for. """
+		scheduler = Scheduler.cls()
+		fired = []
+
+		async def record(name):
+			fired.append(name)
+
+		async def run():
+			scheduler.schedule(0.2, lambda: record("slow"))
+			cancelled = scheduler.schedule(0.1, lambda: record("cancelled"))
+			scheduler.schedule(0.05, lambda: record("fast"))
+			scheduler.cancel(cancelled)
+			await asyncio.sleep(0.3)
+			scheduler.driver.cancel()
+
+		asyncio.run(run())
+		self.assertEqual(["fast", "slow"], fired)
+
+
+if __name__ == '__main__':
+	unittest.main()
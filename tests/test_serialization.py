@@ -0,0 +1,147 @@
+import unittest
+
+from room import Room
+from serialization import StateFormatError, state_from_bytes, state_from_json, state_to_bytes, state_to_json
+from shibboleth import Shibboleth
+from tests.mocks import member_lookup, mock_members
+
+
+class TestSerialization(unittest.TestCase):
+
+	def assert_same_game(self, game, restored):
+		self.assertEqual(game.players, restored.players)
+		self.assertEqual(game.words, restored.words)
+		self.assertEqual(game.secret_words, restored.secret_words)
+		self.assertEqual(game.player_words, restored.player_words)
+		self.assertEqual(game.teams, restored.teams)
+		self.assertEqual(game.team_masks, restored.team_masks)
+		self.assertEqual(game.team_sizes, restored.team_sizes)
+		self.assertEqual(game.possible_team_sizes, restored.possible_team_sizes)
+		self.assertEqual(game.vetoable_team_guess, restored.vetoable_team_guess)
+		self.assertEqual(game.winning_word, restored.winning_word)
+		self.assertEqual(game.phase, restored.phase)
+		self.assertEqual(game.word_list_string_columns(), restored.word_list_string_columns())
+
+	def test_game_round_trip(self):
+		""" Test that a game survives JSON and binary round trips in each phase. """
+		players = mock_members(6)
+		get_member = member_lookup(players)
+		game = Shibboleth(players, 12)
+		guesser = players[0]
+		team = game.players_with_word(game.get_secret_word(guesser))
+
+		for phase in ("main", "veto", "over"):
+			if phase == "veto":
+				game.resolve_team_guess(guesser, team)
+			if phase == "over":
+				game.resolve_team_guess(guesser, team, veto_timeout_override=True)
+			self.assertEqual(phase, game.phase)
+
+			state = game.to_state()
+			for encode, decode in ((state_to_json, state_from_json), (state_to_bytes, state_from_bytes)):
+				with self.subTest(phase=phase, encoding=encode.__name__):
+					restored = Shibboleth.from_state(decode(encode(state)), get_member)
+					self.assert_same_game(game, restored)
+
+	def test_restored_game_playable(self):
+		""" Test that a game restored in the veto phase can still resolve its team guess. """
+		players = mock_members(4)
+		get_member = member_lookup(players)
+		game = Shibboleth(players, 10)
+		guesser = players[1]
+		game.resolve_team_guess(guesser, game.players_with_word(game.get_secret_word(guesser)))
+
+		restored = Shibboleth.from_state(state_from_bytes(state_to_bytes(game.to_state())), get_member)
+		self.assertTrue(restored.resolve_team_guess(*restored.vetoable_team_guess, veto_timeout_override=True))
+		self.assertEqual(game.get_secret_word(guesser), restored.winning_word)
+
+	def test_room_round_trip(self):
+		""" Test saving and restoring a room's options, roster, queues and game. """
+		members = mock_members(8)
+		get_member = member_lookup(members)
+		room = Room("room", None, None)
+		for member in members[:5]:
+			room.add_player(member)
+		room.num_words = 12
+		room.skew_chance = 0.25
+		room.start_round()
+		room.add_member_to_joiner_queue(members[6])
+		room.add_member_to_leaver_queue(members[2])
+		room.pause()
+		room.pinned_word_list_id = 123456789012345678
+
+		restored = Room("room", None, None)
+		restored.restore_state(state_from_json(state_to_json(room.to_state())), get_member)
+		self.assertEqual(room.round_num, restored.round_num)
+		self.assertEqual(12, restored.num_words)
+		self.assertEqual(0.25, restored.skew_chance)
+		self.assertEqual(room.room_players, restored.room_players)
+		self.assertEqual([members[6]], list(restored.queued_joiners))
+		self.assertEqual([members[2]], list(restored.queued_leavers))
+		self.assertTrue(restored.paused)
+		self.assertEqual(123456789012345678, restored.pinned_word_list_id)
+		self.assert_same_game(room.game, restored.game)
+
+		# States saved before pinned word lists were tracked
+		state = room.to_state()
+		del state["pinned_word_list_id"]
+		restored.restore_state(state, get_member)
+		self.assertIsNone(restored.pinned_word_list_id)
+
+	def test_room_veto_deadline(self):
+		""" Test that a room restored mid-veto keeps the time left on its veto deadline, so it can be scheduled again. """
+		members = mock_members(4)
+		get_member = member_lookup(members)
+		room = Room("room", None, None)
+		for member in members:
+			room.add_player(member)
+		room.start_round()
+		guesser = members[0]
+		room.resolve_team_guess(guesser, room.game.players_with_word(room.game.get_secret_word(guesser)))
+		room.set_timer("veto deadline", 30, lambda: None)
+		state = state_from_json(state_to_json(room.to_state()))
+		room.end_round()
+
+		restored = Room("room", None, None)
+		restored.restore_state(state, get_member)
+		self.assertTrue(restored.game.in_veto_phase)
+		self.assertAlmostEqual(30, restored.take_restored_veto_deadline(), delta=5)
+		self.assertIsNone(restored.take_restored_veto_deadline())
+
+		# A state saved without a timer pending, or before deadlines were kept, resolves right away
+		for deadline_state in (dict(state, veto_deadline=None), {key: value for key, value in state.items() if key != "veto_deadline"}):
+			restored.restore_state(deadline_state, get_member)
+			self.assertEqual(0, restored.take_restored_veto_deadline())
+
+		# Rounds not in their veto phase have nothing to schedule
+		restored.end_round()
+		restored.restore_state(restored.to_state(), get_member)
+		self.assertIsNone(restored.take_restored_veto_deadline())
+
+	def test_room_missing_members(self):
+		""" Test that members who can't be found are dropped, along with a game they were in. """
+		members = mock_members(4)
+		get_member = member_lookup(members)
+		room = Room("room", None, None)
+		for member in members:
+			room.add_player(member)
+		room.start_round()
+		state = room.to_state()
+
+		restored = Room("room", None, None)
+		restored.restore_state(state, lambda member_id: None if member_id == members[0].id else get_member(member_id))
+		self.assertEqual(members[1:], list(restored.room_players))
+		self.assertFalse(restored.in_round)
+
+		with self.assertRaises(StateFormatError):
+			restored.restore_state(dict(state, version=-1), get_member)
+
+		# States that decode but are missing parts or have the wrong types leave the room as it was
+		for malformed_state in ({key: value for (key, value) in state.items() if key != "players"}, dict(state, queued_joiners=5), dict(state, game={"players": []}), []):
+			with self.subTest(state=malformed_state), self.assertRaises(StateFormatError):
+				restored.restore_state(malformed_state, get_member)
+			self.assertEqual(members[1:], list(restored.room_players))
+
+
+if __name__ == '__main__':
+	unittest.main()
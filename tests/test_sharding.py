@@ -0,0 +1,68 @@
+import time
+import unittest
+
+from sharding import shard_for_guild, ShardSupervisor
+
+
+def exit_right_away(shard_id, shard_count, heartbeat):
+	pass
+
+def sleep_without_heartbeat(shard_id, shard_count, heartbeat):
+	time.sleep(60)
+
+
+class TestSharding(unittest.TestCase):
+
+	def test_shard_for_guild(self):
+		""" Test that guilds are assigned to shards by the timestamp bits of their ID, like Discord does. """
+		self.assertEqual(0, shard_for_guild(0, 4))
+		self.assertEqual(1, shard_for_guild(1 << 22, 4))
+		self.assertEqual(1, shard_for_guild((5 << 22) + 12345, 4))
+		self.assertEqual(0, shard_for_guild(81384788765712384, 1))
+
+	def wait_for_exit(self, supervisor, shard_id):
+		supervisor.processes[shard_id].join(30)
+
+	def test_restart_exited_shard(self):
+		""" Test that a shard that exits is started again after its restart delay, which grows if it keeps failing. """
+		supervisor = ShardSupervisor(exit_right_away, (), 1, min_restart_delay=0.0)
+		try:
+			supervisor.start_shard(0)
+			first_process = supervisor.processes[0]
+			self.wait_for_exit(supervisor, 0)
+			self.assertEqual("exited with code 0", supervisor.unhealthy_reason(0))
+
+			supervisor.check_shards()
+			self.assertIsNone(supervisor.processes[0])
+			self.assertIn(0, supervisor.pending_restarts)
+
+			supervisor.check_shards()
+			self.assertIsNotNone(supervisor.processes[0])
+			self.assertIsNot(first_process, supervisor.processes[0])
+			self.assertEqual({}, supervisor.pending_restarts)
+		finally:
+			supervisor.stop_shard(0)
+
+	def test_restart_unresponsive_shard(self):
+		""" Test that a running shard that never sends a heartbeat is restarted once its startup grace period is over. """
+		supervisor = ShardSupervisor(sleep_without_heartbeat, (), 1, startup_grace=0.0, min_restart_delay=60.0)
+		try:
+			supervisor.start_shard(0)
+			process = supervisor.processes[0]
+			self.assertTrue(supervisor.unhealthy_reason(0).startswith("not ready"))
+
+			supervisor.heartbeats[0].value = time.time()
+			self.assertIsNone(supervisor.unhealthy_reason(0))
+			supervisor.heartbeats[0].value = time.time() - 1000
+			self.assertTrue(supervisor.unhealthy_reason(0).startswith("no heartbeat"))
+
+			supervisor.check_shards()
+			self.assertFalse(process.is_alive())
+			self.assertIn(0, supervisor.pending_restarts)
+			self.assertEqual(120.0, supervisor.restart_delays[0])
+		finally:
+			supervisor.stop_shard(0)
+
+
+if __name__ == '__main__':
+	unittest.main()
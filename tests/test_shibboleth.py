@@ -205,6 +205,32 @@ class TestShibboleth(unittest.TestCase):
 		self.assertEqual("1", s.opposing_word("0"))
 		self.assertEqual("0", s.opposing_word("1"))
 
+		# Precomputed team index
+		self.assertEqual(frozenset(players), s.player_set)
+		for p in players[:3]: self.assertEqual(frozenset(players[:3]), s.team_set_of(p))
+		for p in players[3:]: self.assertEqual(frozenset(players[3:]), s.team_set_of(p))
+		self.assertEqual((0b000111, 0b111000), s.team_masks)
+		self.assertEqual(0b100001, s.players_mask([players[0], players[5]]))
+
+	@deterministic_sample()
+	@provide_corpus(["a", "bbbbb", "cc", "ddd", "e"])
+	def test_word_list_string_columns(self):
+		""" Test laying out the word list in columns. """
+		s = Shibboleth(mock_players(2), 5)
+		# Columns are as wide as the longest word plus a gap of 3
+		self.assertEqual("a       bbbbb\ncc      ddd\ne", s.word_list_string_columns())
+		self.assertEqual("a       bbbbb   cc\nddd     e", s.word_list_string_columns(3))
+		self.assertEqual("a\nbbbbb\ncc\nddd\ne", s.word_list_string_columns(1))
+		self.assertEqual("a  bbbbb\ncc ddd\ne", s.word_list_string_columns(2, column_space=3))
+		self.assertIs(s.word_list_string_columns(), s.word_list_string_columns())
+
+		# Fewer columns are used only when needed to fit
+		self.assertEqual(s.word_list_string_columns(2), s.word_list_string_fitting(2000))
+		self.assertEqual(s.word_list_string_columns(3), s.word_list_string_fitting(28, num_columns=3))
+		self.assertEqual(s.word_list_string_columns(2), s.word_list_string_fitting(27, num_columns=3))
+		self.assertEqual(s.word_list_string_columns(1), s.word_list_string_fitting(26))
+		self.assertEqual(s.word_list_string_columns(1), s.word_list_string_fitting(1))
+
 	@deterministic_sample()
 	@deterministic_shuffle()
 	@provide_corpus(unique_words(16))
@@ -242,6 +268,12 @@ class TestShibboleth(unittest.TestCase):
 		for player in players[3:]:
 			self.assertTrue(s.check_word_guess(player, "0"))
 
+		# Guesses are matched ignoring surrounding whitespace
+		self.assertTrue(s.check_word_guess(players[0], " 1 "))
+		self.assertEqual("1", s.resolve_word(" 1 "))
+		self.assertIsNone(s.resolve_word("1234"))
+		self.assertEqual(["1", "10", "11"], s.word_suggestions("1x"))
+
 		# Invalid guesses
 		for guesser, word in (
 				(players[0], "0"),
@@ -0,0 +1,49 @@
+import unittest
+
+import numpy as np
+
+from shibboleth import GameInitializationError
+from simulation import simulate, sweep
+
+
+class TestSimulation(unittest.TestCase):
+
+	def test_whole_team_guess_rates(self):
+		""" Test that with 3 players split 1v2, a random guess of either size finds the guesser's team a third of the time. """
+		result = simulate(3, num_rounds=100_000, rng=np.random.default_rng(1))
+		self.assertIsNone(result.team_guess_size)
+		self.assertEqual({"1v2": 1.0}, result.team_size_distribution)
+		self.assertEqual([1, 2], list(result.random_guess_success_rates))
+		for rate in result.random_guess_success_rates.values():
+			self.assertAlmostEqual(1 / 3, rate, delta=0.01)
+
+	def test_partial_team_guess_rate(self):
+		""" Test that with 7 players and max_guess 3, a random 3-player guess is all teammates 1/7 of the time. """
+		result = simulate(7, max_guess=3, num_rounds=100_000, rng=np.random.default_rng(2))
+		self.assertEqual(3, result.team_guess_size)
+		self.assertEqual({"3v4": 1.0}, result.team_size_distribution)
+		self.assertAlmostEqual(1 / 7, result.random_guess_success_rates[3], delta=0.01)
+
+	def test_zero_team_chance(self):
+		""" Test that skewed rounds give everyone the same secret word. """
+		for num_players in (2, 3):
+			with self.subTest(num_players=num_players):
+				result = simulate(num_players, skew_chance=0.3, num_rounds=100_000, rng=np.random.default_rng(3))
+				self.assertAlmostEqual(0.3, result.zero_team_chance, delta=0.01)
+
+	def test_invalid_settings(self):
+		""" Test that simulate rejects settings a room couldn't start a round with, and that sweep skips them. """
+		with self.assertRaises(GameInitializationError):
+			simulate(7, skew_chance=0.3, max_guess=3, num_rounds=10)
+
+		results = sweep([2, 3, 7], [0.0, 0.3], [1, 3], num_rounds=10, rng=np.random.default_rng(4))
+		settings = [(result.num_players, result.skew_chance, result.max_guess) for result in results]
+		self.assertEqual([
+			(2, 0.0, 1), (2, 0.0, 3), (2, 0.3, 1), (2, 0.3, 3),
+			(3, 0.0, 1), (3, 0.0, 3), (3, 0.3, 3),
+			(7, 0.0, 1), (7, 0.0, 3),
+		], settings)
+
+
+if __name__ == '__main__':
+	unittest.main()
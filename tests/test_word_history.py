@@ -0,0 +1,64 @@
+import unittest
+
+from word_history import WordHistory
+
+
+class TestWordHistory(unittest.TestCase):
+
+	def test_excludes_recent_words(self):
+		""" Test that words from the last few rounds aren't sampled again. """
+		corpus = tuple(str(i) for i in range(100))
+		history = WordHistory(3)
+		recent_rounds = []
+
+		for _ in range(20):
+			indices = history.sample_indices(corpus, 10)
+			self.assertEqual(10, len(set(indices)))
+			for recent_indices in recent_rounds[-3:]:
+				self.assertFalse(set(indices) & set(recent_indices))
+			history.record(corpus, indices)
+			recent_rounds.append(indices)
+
+		# Only the last 3 rounds are remembered.
+		self.assertEqual(3, len(history.rounds))
+		self.assertEqual(set(index for indices in recent_rounds[-3:] for index in indices), set(history.recent_counts))
+
+	def test_small_corpus(self):
+		""" Test sampling when recent words cover most or all of the corpus. """
+		corpus = tuple(str(i) for i in range(12))
+		history = WordHistory(10)
+
+		history.record(corpus, range(5))
+		indices = history.sample_indices(corpus, 7)
+		self.assertEqual(set(range(5, 12)), set(indices))
+
+		# Too few fresh words left, so repeats are allowed.
+		history.record(corpus, range(5, 12))
+		indices = history.sample_indices(corpus, 7)
+		self.assertEqual(7, len(set(indices)))
+
+	def test_num_rounds_changes(self):
+		""" Test shrinking the history and resetting it for a new corpus. """
+		corpus = tuple(str(i) for i in range(100))
+		history = WordHistory(5)
+		for start in range(0, 50, 10):
+			history.record(corpus, range(start, start + 10))
+		self.assertEqual(50, len(history.recent_counts))
+
+		history.set_num_rounds(2)
+		self.assertEqual(set(range(30, 50)), set(history.recent_counts))
+
+		history.set_num_rounds(0)
+		self.assertEqual({}, history.recent_counts)
+		history.record(corpus, range(10))
+		self.assertEqual({}, history.recent_counts)
+
+		history.set_num_rounds(5)
+		history.record(corpus, range(10))
+		other_corpus = tuple(corpus)[::-1]
+		history.sample_indices(other_corpus, 10)
+		self.assertEqual({}, history.recent_counts)
+
+
+if __name__ == '__main__':
+	unittest.main()
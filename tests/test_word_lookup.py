@@ -0,0 +1,87 @@
+import unittest
+from unittest.mock import patch
+
+from word_lookup import WordLookup, deletion_variants, did_you_mean_string, edit_distance, normalize_word
+
+
+class TestWordLookup(unittest.TestCase):
+
+	def test_normalize_word(self):
+		""" Test that case, accents and whitespace are normalized away. """
+		for word, key in (
+				("apple", "apple"),
+				("APPLE", "apple"),
+				("  Apple ", "apple"),
+				("café", "cafe"),
+				("CAFÉ", "cafe"),
+				("ice  cream", "ice cream"),
+				("Straße", "strasse"),
+		):
+			with self.subTest(word=word):
+				self.assertEqual(key, normalize_word(word))
+
+	def test_edit_distance(self):
+		""" Test edit distance, counting adjacent swaps as one edit. """
+		for a, b, distance in (
+				("", "", 0),
+				("apple", "apple", 0),
+				("apple", "aple", 1),
+				("apple", "applet", 1),
+				("apple", "ample", 1),
+				("apple", "paple", 1),
+				("apple", "pale", 2),
+				("", "abc", 3),
+		):
+			with self.subTest(a=a, b=b):
+				self.assertEqual(distance, edit_distance(a, b))
+				self.assertEqual(distance, edit_distance(b, a))
+
+	def test_deletion_variants(self):
+		""" Test generating strings with characters deleted. """
+		self.assertEqual({"abc"}, deletion_variants("abc", 0))
+		self.assertEqual({"abc", "bc", "ac", "ab"}, deletion_variants("abc", 1))
+		self.assertEqual({"ab", "a", "b", ""}, deletion_variants("ab", 5))
+
+	def test_resolve(self):
+		""" Test exact and normalized lookups. """
+		lookup = WordLookup(["Apple", "café", "ice cream", "Polish", "polish"])
+		self.assertEqual("Apple", lookup.resolve("Apple"))
+		self.assertEqual("Apple", lookup.resolve("apple"))
+		self.assertEqual("café", lookup.resolve("CAFE"))
+		self.assertEqual("ice cream", lookup.resolve(" Ice   Cream "))
+		self.assertIsNone(lookup.resolve("banana"))
+
+		# Words that only differ by normalization need an exact match.
+		self.assertEqual("Polish", lookup.resolve("Polish"))
+		self.assertEqual("polish", lookup.resolve("polish"))
+		self.assertIsNone(lookup.resolve("POLISH"))
+
+	def test_suggestions(self):
+		""" Test suggesting close misspellings, closest first. """
+		lookup = WordLookup(["apple", "ample", "maple", "banana", "café"])
+		self.assertEqual(["apple", "ample"], lookup.suggestions("appel"))
+		self.assertEqual(["apple", "ample", "maple"], lookup.suggestions("aple"))
+		self.assertEqual(["apple"], lookup.suggestions("aple", limit=1))
+		self.assertEqual(["banana"], lookup.suggestions("bananana"))
+		self.assertEqual(["café"], lookup.suggestions("caffe"))
+		self.assertEqual([], lookup.suggestions("zebra"))
+
+	def test_suggestions_long_guess(self):
+		""" Test that guesses too long to be near any word get no suggestions, without listing their deletion variants. """
+		lookup = WordLookup(["apple", "banana"])
+		self.assertEqual(["banana"], lookup.suggestions("bananaaa"))
+		self.assertEqual([], lookup.suggestions("bananaaaa"))
+
+		with patch("word_lookup.deletion_variants", wraps=deletion_variants) as variants:
+			self.assertEqual([], lookup.suggestions("banana" * 300))
+			variants.assert_not_called()
+			lookup.suggestions("bananaaa")
+			variants.assert_called_once_with("bananaaa", 2)
+
+	def test_did_you_mean_string(self):
+		self.assertEqual("", did_you_mean_string([]))
+		self.assertEqual(" Did you mean `a` or `b`?", did_you_mean_string(["a", "b"]))
+
+
+if __name__ == '__main__':
+	unittest.main()
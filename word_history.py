@@ -0,0 +1,68 @@
+import random
+from collections import deque
+
+
+class WordHistory:
+	"""
+	Remembers which corpus words a room put on its word lists in its last few rounds, by index into the corpus.
+	Sampling leaves those words out, at a cost proportional to the number of words sampled rather than the corpus size.
+	"""
+	def __init__(self, num_rounds):
+		self.num_rounds = num_rounds
+		self.corpus = None
+		self.rounds = deque()
+		self.recent_counts = {}
+
+	def reset(self, corpus=None):
+		self.corpus = corpus
+		self.rounds.clear()
+		self.recent_counts = {}
+
+	def set_num_rounds(self, num_rounds):
+		self.num_rounds = num_rounds
+		self.forget_old_rounds()
+
+	def forget_old_rounds(self):
+		while len(self.rounds) > self.num_rounds:
+			for index in self.rounds.popleft():
+				self.recent_counts[index] -= 1
+				if self.recent_counts[index] == 0:
+					del self.recent_counts[index]
+
+	def record(self, corpus, indices):
+		""" Records the corpus indices of a round's words. """
+		if corpus is not self.corpus:
+			self.reset(corpus)
+		if self.num_rounds == 0:
+			return
+
+		self.rounds.append(tuple(indices))
+		for index in indices:
+			self.recent_counts[index] = self.recent_counts.get(index, 0) + 1
+		self.forget_old_rounds()
+
+	def sample_indices(self, corpus, k):
+		""" Returns k distinct random corpus indices, leaving out recently used ones unless too few other words remain. """
+		if corpus is not self.corpus:
+			self.reset(corpus)
+
+		num_words = len(corpus)
+		if k > num_words:
+			raise ValueError("Sample larger than corpus")
+		num_available = num_words - len(self.recent_counts)
+
+		if num_available < k:
+			# Not enough fresh words, so allow repeats.
+			return random.sample(range(num_words), k)
+
+		if num_available - k < num_words // 2:
+			# Rejection sampling would mostly hit recent words, so list the fresh ones instead.
+			fresh_indices = [index for index in range(num_words) if index not in self.recent_counts]
+			return random.sample(fresh_indices, k)
+
+		chosen = {}
+		while len(chosen) < k:
+			index = random.randrange(num_words)
+			if (index not in self.recent_counts) and (index not in chosen):
+				chosen[index] = None
+		return list(chosen)
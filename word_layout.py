@@ -0,0 +1,54 @@
+# Discord rejects messages longer than this many characters.
+MESSAGE_LENGTH_LIMIT = 2000
+
+CODE_BLOCK_FENCE = "```"
+
+# Spaces between the longest word in a column and the start of the next column
+COLUMN_GAP = 3
+
+
+def render_columns(words, num_columns, column_width):
+	""" Lays out words left to right in rows of num_columns, padding each column except the last to column_width. """
+	assert num_columns >= 1, "Invalid number of columns"
+
+	lines = []
+	for row_start in range(0, len(words), num_columns):
+		row = words[row_start:row_start + num_columns]
+		lines.append("".join(word.ljust(column_width) for word in row[:-1]) + row[-1])
+
+	return "\n".join(lines)
+
+class WordListLayout:
+	""" Renders a fixed word list in columns, caching each rendering since a round's word list never changes. """
+	def __init__(self, words):
+		self.words = list(words)
+		self.column_width = max((len(word) for word in self.words), default=0) + COLUMN_GAP
+		self.renderings = {}
+
+	def render(self, num_columns=2, column_width=None):
+		""" Returns the words in num_columns columns, sized to the longest word unless column_width is given. """
+		if column_width is None:
+			column_width = self.column_width
+
+		key = (num_columns, column_width)
+		if key not in self.renderings:
+			self.renderings[key] = render_columns(self.words, num_columns, column_width)
+		return self.renderings[key]
+
+	def render_fitting(self, max_length=MESSAGE_LENGTH_LIMIT, num_columns=2):
+		""" Returns the rendering with the most columns, up to num_columns, that is at most max_length characters, or the single column one if none fit. """
+		# Fewer columns are shorter, since the last column in each row isn't padded.
+		for columns in range(num_columns, 1, -1):
+			rendering = self.render(columns)
+			if len(rendering) <= max_length:
+				return rendering
+
+		return self.render(1)
+
+	def render_code_block(self, max_length=MESSAGE_LENGTH_LIMIT):
+		""" Returns the fitting rendering wrapped in a code block, which together are at most max_length characters if possible. """
+		key = ("code block", max_length)
+		if key not in self.renderings:
+			fitting = self.render_fitting(max_length - 2 * len(CODE_BLOCK_FENCE))
+			self.renderings[key] = f"{CODE_BLOCK_FENCE}{fitting}{CODE_BLOCK_FENCE}"
+		return self.renderings[key]
@@ -0,0 +1,89 @@
+import unicodedata
+from itertools import combinations
+
+
+def normalize_word(word):
+	""" Returns the lookup key for a word: case-folded, with accents removed and runs of whitespace collapsed to single spaces. """
+	decomposed = unicodedata.normalize("NFKD", word)
+	without_accents = "".join(char for char in decomposed if not unicodedata.combining(char))
+	return " ".join(without_accents.casefold().split())
+
+def deletion_variants(key, max_deletions):
+	""" Returns every string obtained by deleting up to max_deletions characters from key, including key itself. """
+	variants = {key}
+	for num_deletions in range(1, min(max_deletions, len(key)) + 1):
+		for deleted_positions in combinations(range(len(key)), num_deletions):
+			variants.add("".join(char for (i, char) in enumerate(key) if i not in deleted_positions))
+	return variants
+
+def edit_distance(a, b):
+	""" Returns the optimal string alignment distance: the number of insertions, deletions, substitutions and adjacent swaps to turn a into b. """
+	previous_previous_row = None
+	previous_row = list(range(len(b) + 1))
+
+	for i in range(1, len(a) + 1):
+		row = [i] + [0] * len(b)
+		for j in range(1, len(b) + 1):
+			cost = 0 if a[i - 1] == b[j - 1] else 1
+			row[j] = min(previous_row[j] + 1, row[j - 1] + 1, previous_row[j - 1] + cost)
+			if (i > 1) and (j > 1) and (a[i - 1] == b[j - 2]) and (a[i - 2] == b[j - 1]):
+				row[j] = min(row[j], previous_previous_row[j - 2] + 1)
+		previous_previous_row, previous_row = previous_row, row
+
+	return previous_row[len(b)]
+
+def did_you_mean_string(suggestions):
+	if not suggestions:
+		return ""
+	suggestion_string = " or ".join(f"`{suggestion}`" for suggestion in suggestions)
+	return f" Did you mean {suggestion_string}?"
+
+class WordLookup:
+	"""
+	Looks up guesses against a fixed word list, ignoring case, accents and extra whitespace.
+	Near misses are found through an index of the words with up to max_distance characters deleted, built the first time it's needed.
+	"""
+	def __init__(self, words, max_distance=2):
+		self.words = list(words)
+		self.word_set = frozenset(self.words)
+		self.max_distance = max_distance
+
+		# Keys shared by more than one word map to None, so only exact matches resolve to them.
+		self.words_by_key = {}
+		for word in self.words:
+			key = normalize_word(word)
+			self.words_by_key[key] = None if (key in self.words_by_key) else word
+		self.max_key_length = max(map(len, self.words_by_key), default=0)
+
+		self.deletion_index = None
+
+	def resolve(self, guess):
+		""" Returns the word on the list that the guess matches, or None. """
+		if guess in self.word_set:
+			return guess
+		return self.words_by_key.get(normalize_word(guess))
+
+	def build_deletion_index(self):
+		self.deletion_index = {}
+		for key in self.words_by_key:
+			for variant in deletion_variants(key, self.max_distance):
+				self.deletion_index.setdefault(variant, set()).add(key)
+
+	def suggestions(self, guess, limit=3):
+		""" Returns up to limit words within max_distance edits of the guess, closest first, then in word list order. """
+		guess_key = normalize_word(guess)
+		# Nothing is in range of a guess this long, and its deletion variants would take ages to list.
+		if len(guess_key) > self.max_key_length + self.max_distance:
+			return []
+
+		if self.deletion_index is None:
+			self.build_deletion_index()
+
+		candidate_keys = set()
+		for variant in deletion_variants(guess_key, self.max_distance):
+			candidate_keys |= self.deletion_index.get(variant, set())
+
+		distances = {key: edit_distance(guess_key, key) for key in candidate_keys}
+		close_words = [word for word in self.words if distances.get(normalize_word(word), self.max_distance + 1) <= self.max_distance]
+		close_words.sort(key=lambda word: distances[normalize_word(word)])
+		return close_words[:limit]